@@ -20,27 +20,28 @@ import scipy.signal
 import numpy as np
 from scipy import ndimage
 import cv2
+from imgproc import convolution, spectrum
+from imgproc.images import imread
 
 """## Some convenience functions"""
 
 def imread_gray(filename):
     """Read grayscale image from our data directory."""
-    return cv2.imread(f'../data/{filename}',
-                      cv2.IMREAD_GRAYSCALE).astype(np.float32)
+    # Decoded once per file and mode, see imgproc.images
+    return imread(f'../data/{filename}', 'gray').astype(np.float32)
 
 def convolve_with_two(image, kernel1, kernel2):
     """Apply two filters, one after the other."""
-    image = ndimage.convolve(image, kernel1, mode='wrap')
-    image = ndimage.convolve(image, kernel2, mode='wrap')
-    return image
+    # direct, separable or FFT convolution, whichever is cheapest
+    return convolution.convolve_with_two(image, kernel1, kernel2, mode='wrap')
 
 def fourier_spectrum(im):
-    normalized_im = im / np.sum(im)
-    f = np.fft.fft2(normalized_im)  #compute 2-dimensional discrete fourier transform
-    return np.fft.fftshift(f)
+    # Real-input FFT in float32, mirrored to the full shifted spectrum and
+    # cached per image, see imgproc/spectrum.py
+    return spectrum.fourier_spectrum(im)
 
 def log_magnitude_spectrum(im):
-    return np.log(np.abs(fourier_spectrum(im))+1e-8)
+    return spectrum.log_magnitude_spectrum(im)
 
 def plot_with_spectra(images, titles):
     """Plots a list of images in the first column and the logarithm of their
@@ -55,15 +56,15 @@ def plot_with_spectra(images, titles):
 
     spectra = [log_magnitude_spectrum(im) for im in images]
 
-    lower = min(np.percentile(s, 0.1) for s in spectra)
-    upper = min(np.percentile(s, 99.999) for s in spectra)
+    # Smallest 0.1 and 99.999 percentiles, estimated from histograms
+    lower, upper = spectrum.display_range(spectra, 0.1, 99.999)
     normalizer = mpl.colors.Normalize(vmin=lower, vmax=upper)
     
-    for ax, image, spectrum, title in zip(axes, images, spectra, titles):
+    for ax, image, log_spectrum, title in zip(axes, images, spectra, titles):
         ax[0].imshow(image, cmap='gray')
         ax[0].set_title(title)
         ax[0].set_axis_off()
-        c = ax[1].imshow(spectrum, norm=normalizer, cmap='viridis')
+        c = ax[1].imshow(log_spectrum, norm=normalizer, cmap='viridis')
         ax[1].set_title('Log magnitude spectrum')
         ax[1].set_axis_off()
         
@@ -105,25 +106,8 @@ Vary the size of the box filter. What do you observe? For the Gaussian, change s
 """
 
 
-def filter_gauss(image, kernel_factor, sigma):
-    # gauss_1d = np.linspace(-kernel_factor, kernel_factor, 2*kernel_factor)
-    # gauss_1d = 1 / (np.sqrt(2 * np.pi) * sigma) * np.power(np.e, (-np.square(gauss_1d) / (2 * np.square(sigma))))
-    # image[:] = convolve_with_two(image[:], gauss_1d, gauss_1d)
-
-    #generate gaussian kernel
-    x, y = np.meshgrid(np.linspace(-1, 1, 2*kernel_factor), np.linspace(-1, 1, 2*kernel_factor))
-    d = np.sqrt(x * x + y * y)
-    #flt_gauss = ndimage.gaussian_filter(d, sigma)
-    mean = 0
-    flt_gauss = np.exp(-((d - mean) ** 2 / (2.0 * sigma ** 2)))
-    image = convolve_with_two(image, flt_gauss, flt_gauss)
-    return image
-
-
-def filter_box(image, size):
-    flt_box = (1/np.square(size))*np.ones((size, size))
-    image = convolve_with_two(image, flt_box, flt_box)
-    return image
+# Importable without running this notebook, see imgproc/filters.py
+from imgproc.filters import filter_gauss, filter_box
 
 im = im_grass
 box_filtered = filter_box(im, 3)  # Change this
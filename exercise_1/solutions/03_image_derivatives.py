@@ -16,46 +16,22 @@ import matplotlib.pyplot as plt
 import matplotlib.image as mpimg
 import cv2
 from scipy import ndimage
+from imgproc import convolution
+from imgproc.batch import map_batched
+from imgproc.images import imread
+from imgproc.plotting import plot_multiple
 
 """## Some Convenience Functions."""
 
 def convolve_with_two(image, kernel1, kernel2):
     """Apply two filters, one after the other."""
-    image = ndimage.convolve(image, kernel1)
-    image = ndimage.convolve(image, kernel2)   
-    return image
+    # direct, separable or FFT convolution, whichever is cheapest
+    return convolution.convolve_with_two(image, kernel1, kernel2)
 
 def imread_gray(filename):
     """Read grayscale image from our data directory."""
-    return cv2.imread(f'../data/{filename}',
-                      cv2.IMREAD_GRAYSCALE).astype(np.float32)
-
-def plot_multiple(images, titles, colormap='gray',
-                  max_columns=np.inf, share_axes=True):
-    """Plot multiple images as subplots on a grid."""
-    assert len(images) == len(titles)
-    n_images = len(images)
-    n_cols = min(max_columns, n_images)
-    n_rows = int(np.ceil(n_images / n_cols))
-    fig, axes = plt.subplots(
-        n_rows, n_cols, figsize=(n_cols * 4, n_rows * 4),
-        squeeze=False, sharex=share_axes, sharey=share_axes)
-
-    axes = axes.flat
-    # Hide subplots without content
-    for ax in axes[n_images:]:
-        ax.axis('off')
-        
-    if not isinstance(colormap, (list,tuple)):
-        colormaps = [colormap]*n_images
-    else:
-        colormaps = colormap
-
-    for ax, image, title, cmap in zip(axes, images, titles, colormaps):
-        ax.imshow(image, cmap=cmap)
-        ax.set_title(title)
-        
-    fig.tight_layout()
+    # Decoded once per file and mode, see imgproc.images
+    return imread(f'../data/{filename}', 'gray').astype(np.float32)
 
 # From Question 1: Gaussian Filtering
 def gauss(x, sigma):
@@ -148,18 +124,8 @@ Use the functions ``gauss`` and ``gaussdx`` directly in order to create a new fu
 """
 
 
-def gauss_derivs(image, sigma):
-    # Your code here.
-    kernel_size = int(3.0 * sigma)
-    x = np.arange(-kernel_size, kernel_size + 1)[np.newaxis]
-    G = gauss(x, sigma)
-    G = np.flip(G, 0)
-
-    D = gaussdx(x, sigma)
-    D = np.flip(D, 0)
-
-    image_dx, image_dy = convolve_with_two(image, np.transpose(G), D), convolve_with_two(image, G, np.transpose(D))
-    return image_dx, image_dy
+# Importable without running this notebook, see imgproc/gradients.py
+from imgproc.gradients import gauss_derivs
 
 """Try the function on the given example images and describe your results."""
 
@@ -171,42 +137,18 @@ plt.show()
 
 """In a similar manner, create a new function ``gauss_second_derivs`` that returns the 2D second Gaussian derivatives $\frac{d^2}{dx^2}$, $\frac{d^2}{dx dy}$ and $\frac{d^2}{dy^2}$ of an input image."""
 
-def gauss_second_derivs(image, sigma):
-    # Your code here
-    diff = np.array([[1, 0, -1]])
-    diff = np.flip(diff, 0)
-    # diffrentiation filter
-    kernel_size = int(3.0 * sigma)
-    x = np.arange(-kernel_size, kernel_size + 1)[np.newaxis]
-
-    G = gauss(x, sigma)
-    G = np.flip(G, 0)
-    D = gaussdx(x, sigma)
-    D = np.flip(D, 0)
-
-    image_dx = convolve_with_two(image, np.transpose(G), D)
-    image_dy = convolve_with_two(image, G, np.transpose(D))
-    image_dxx = ndimage.convolve(image_dx, diff)
-    image_dyy = ndimage.convolve(image_dy, np.transpose(diff))
-    image_dxy = ndimage.convolve(image_dx, np.transpose(diff))
-    # image_dxx, image_dxy, image_dyy = image, image, image
-    return image_dxx, image_dxy, image_dyy
+from imgproc.gradients import gauss_second_derivs
 
 """Try the function on the given example images and describe your results."""
 
-image = imread_gray('coins1.jpg')
-grad_dxx, grad_dxy, grad_dyy = gauss_second_derivs(image, sigma=2.0)
-plot_multiple([image, grad_dxx, grad_dxy, grad_dyy],
-              ['Image', 'Dxx', 'Dxy','Dyy'])
-
-plt.show()
-
-image = imread_gray('circuit.png')
-grad_dxx, grad_dxy, grad_dyy = gauss_second_derivs(image, sigma=2.0)
-plot_multiple([image, grad_dxx, grad_dxy, grad_dyy],
-              ['Image', 'Dxx', 'Dxy','Dyy'])
+# One call per group of same-sized images, the results come back in order
+images = [imread_gray('coins1.jpg'), imread_gray('circuit.png')]
+second_derivs = map_batched(gauss_second_derivs, images, sigma=2.0)
+for image, (grad_dxx, grad_dxy, grad_dyy) in zip(images, second_derivs):
+    plot_multiple([image, grad_dxx, grad_dxy, grad_dyy],
+                  ['Image', 'Dxx', 'Dxy','Dyy'])
 
-plt.show()
+    plt.show()
 
 """**Briefly describe the results here:**
 
@@ -216,41 +158,18 @@ plt.show()
 Create a new function ``image_gradients_polar`` that returns two images with the magnitude and orientation of the gradient for each pixel of the input image.
 """
 
-def image_gradients_polar(image, sigma):
-    # Your code here
-    kernel_size = int(3.0 * sigma)
-    x = np.arange(-kernel_size, kernel_size + 1)[np.newaxis]
-    #get 1d gaussian kernel and 1d dritive of gaussian
-    G = gauss(x, sigma)
-    G = np.flip(G, 0)
-    D = gaussdx(x, sigma)
-    D = np.flip(D, 0)
-
-    #get x,y component of the gradient
-    image_dx = convolve_with_two(image, np.transpose(G), D)
-    image_dy = convolve_with_two(image, G, np.transpose(D))
-
-    magnitude = np.sqrt(np.square(image_dx) + np.square(image_dy))
-    direction = np.arctan2(image_dy, image_dx)
-
-    return magnitude, direction
+from imgproc.gradients import image_gradients_polar
 
 """Try the function on the given example images and describe your results."""
 
-image = imread_gray('coins1.jpg')
-grad_mag, grad_dir = image_gradients_polar(image, sigma=2.0)
+gradients = map_batched(image_gradients_polar, images, sigma=2.0)
 
 # Note: the twilight colormap only works since Matplotlib 3.0, use 'gray' in earlier versions.
-plot_multiple([image, grad_mag, grad_dir], 
-              ['Image', 'Magnitude', 'Direction'], 
-              colormap=['gray', 'gray', 'twilight'])
-plt.show()
-image = imread_gray('circuit.png')
-grad_mag, grad_theta = image_gradients_polar(image, sigma=2.0)
-plot_multiple([image, grad_mag, grad_theta], 
-              ['Image', 'Magnitude', 'Direction'],
-              colormap=['gray', 'gray', 'twilight'])
-plt.show()
+for image, (grad_mag, grad_dir) in zip(images, gradients):
+    plot_multiple([image, grad_mag, grad_dir], 
+                  ['Image', 'Magnitude', 'Direction'], 
+                  colormap=['gray', 'gray', 'twilight'])
+    plt.show()
 """**Briefly describe your results here:**
     
 ----
@@ -259,22 +178,13 @@ plt.show()
 Create a new function ``laplace`` that returns an image with the Laplacian-of-Gaussian for each pixel of the input image.
 """
 
-def laplace(image, sigma):
-    # Your code here
-    image_dxx, _, image_dyy = gauss_second_derivs(image, sigma)
-    lap = image_dxx + image_dyy
-    return lap
+from imgproc.gradients import laplace
 
 """Try the function on the given example images and describe your results."""
 
-image = imread_gray('coins1.jpg')
-lap = laplace(image, sigma=2.0)
-plot_multiple([image, lap], ['Image', 'Laplace'])
-plt.show()
-image = imread_gray('circuit.png')
-lap = laplace(image, sigma=2.0)
-plot_multiple([image, lap], ['Image', 'Laplace'])
-plt.show()
+for image, lap in zip(images, map_batched(laplace, images, sigma=2.0)):
+    plot_multiple([image, lap], ['Image', 'Laplace'])
+    plt.show()
 """**Briefly describe your results here:**
     
 ----
@@ -11,73 +11,32 @@ In this exercise we will create a simple edge detector.
 """
 
 # %matplotlib notebook
+import time
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.image as mpimg
 import cv2
 from scipy import ndimage
+from imgproc import convolution
+from imgproc.kernels import cache_info
+from imgproc.scale_space import GaussianScaleSpace
+from imgproc.images import imread, load_images
+from imgproc.plotting import plot_multiple
 
 """## Some convenience functions."""
 
 def convolve_with_two(image, kernel1, kernel2):
     """Apply two filters, one after the other."""
-    image = ndimage.convolve(image, kernel1)
-    image = ndimage.convolve(image, kernel2)   
-    return image
+    # direct, separable or FFT convolution, whichever is cheapest
+    return convolution.convolve_with_two(image, kernel1, kernel2)
 
 def imread_gray(filename):
     """Read grayscale image from our data directory."""
-    return cv2.imread(f'../data/{filename}', 
-                      cv2.IMREAD_GRAYSCALE).astype(np.float32)
-
-def plot_multiple(images, titles, colormap='gray', 
-                  max_columns=np.inf, imsize=4, share_axes=True):
-    """Plot multiple images as subplots on a grid."""
-    assert len(images) == len(titles)
-    n_images = len(images)
-    n_cols = min(max_columns, n_images)
-    n_rows = int(np.ceil(n_images / n_cols))
-    fig, axes = plt.subplots(
-        n_rows, n_cols, figsize=(n_cols * imsize, n_rows * imsize),
-        squeeze=False, sharex=share_axes, sharey=share_axes)
-
-    axes = axes.flat
-    # Hide subplots without content
-    for ax in axes[n_images:]:
-        ax.axis('off')
-        
-    if not isinstance(colormap, (list,tuple)):
-        colormaps = [colormap]*n_images
-    else:
-        colormaps = colormap
-
-    for ax, image, title, cmap in zip(axes, images, titles, colormaps):
-        ax.imshow(image, cmap=cmap)
-        ax.set_title(title)
-        
-    fig.tight_layout()
+    # Decoded once per file and mode, see imgproc.images
+    return imread(f'../data/{filename}', 'gray').astype(np.float32)
 
 # From Question 2: Image Derivatives
-def gauss_derivs(image, sigma):
-    kernel_radius = int(3.0 * sigma)
-    x = np.arange(-kernel_radius, kernel_radius + 1)[np.newaxis]
-    
-    # Compute 1D Gaussian kernel 
-    gaussderiv_kernel1d = (
-        -1 / np.sqrt(2 * np.pi) / sigma**3 * x * np.exp(-x**2.0 / 2 / sigma**2))
-    # Compute 1D Derivative-of-Gaussian kernel
-    gauss_kernel1d = (
-        1 / np.sqrt(2 * np.pi) / sigma * np.exp(-x**2 / 2 / sigma**2))
-    
-    image_dx = convolve_with_two(image, gaussderiv_kernel1d, gauss_kernel1d.T)
-    image_dy = convolve_with_two(image, gauss_kernel1d, gaussderiv_kernel1d.T)
-    return image_dx, image_dy
-
-def image_gradients_polar(image, sigma):
-    dx, dy = gauss_derivs(image, sigma)
-    magnitude = np.sqrt(dx**2 + dy**2)
-    direction = np.arctan2(dy, dx)  # between -pi and +pi
-    return magnitude, direction
+from imgproc.gradients import gauss_derivs, image_gradients_polar
 
 """## Part a
 Write a function ``get_edges`` that returns a binary image ``edge`` from an input image where the color of each pixel $p$ is selected as follows (for a given threshold ``theta``):
@@ -91,11 +50,8 @@ p =
 $$
 """
 
-def get_edges(image, sigma, theta):
-    # Your code here
-    edge, _ = image_gradients_polar(image, sigma)
-    edge = np.where(edge >= theta, 1, 0)
-    return edge
+# Importable without running this notebook, see imgproc/edges.py
+from imgproc.edges import get_edges
 
 """Experiment with the function ``get_edges`` on the example images.
 Try to get good edge images for different values of ``sigma``.
@@ -113,14 +69,18 @@ thetas = [1, 2, 5, 10, 20, 40, 60]
 
 images = []
 titles = []
+# Blurs shared between all sigmas and thetas
+scale_space = GaussianScaleSpace(image)
 for sigma in sigmas:
     for theta in thetas:
-        edges = get_edges(image, sigma, theta)    
+        edges = get_edges(image, sigma, theta, scale_space)    
         images.append(edges)
         titles.append(f'sigma={sigma}, theta={theta}')
 
 plot_multiple(images, titles, max_columns=7, imsize=2)
 plt.show()
+# The same few kernels are reused for every theta
+print(f'kernel bank: {cache_info()}')
 """**What difficulties do you observe? Type your answer here:**
     
 ----
@@ -131,30 +91,14 @@ In practice, this is often not desired.
 Create a function ``get_edges_with_nms`` that extends ``get_edges`` by using the following function to suppress non-maximum points along the gradient direction.
 """
 
+from imgproc.nms import non_maximum_suppression
+
 def nms_for_canny(grad_mag, grad_dir):
-    result = np.zeros_like(grad_mag)
-        
-    # Pre-define pixel index offset along different orientation
-    offsets_x = [-1, -1, 0, 1, 1, 1, 0, -1, -1]
-    offsets_y = [0, -1, -1, -1, 0, 1, 1, 1, 0]
-    height, width = grad_mag.shape
-    for y in range(1, height-1):
-        for x in range(1, width-1):
-            d = grad_dir[y, x]
-            # Find neighboring pixels in direction of the gradient
-            # `d` is in radians, ranging from -pi to +pi
-            # make `idx` range from 0 to 8, quantized
-            idx = int(round((d + np.pi) / (2*np.pi) * 8))
-            ox, oy = offsets_x[idx], offsets_y[idx]
-            
-            # Suppress all non-maximum points
-            # Note: this simplified code does not 
-            # interpolate between neighboring pixels!
-            if ((grad_mag[y, x] > grad_mag[y + oy, x + ox]) and
-                (grad_mag[y, x] > grad_mag[y - oy, x - ox])):
-                result[y, x] = grad_mag[y, x]
-    
-    return result
+    # The per-pixel loop of the exercise, with whole-array shifted views: the
+    # direction `d` (radians, from -pi to +pi) is quantized to the same 8
+    # neighbours, so the result is exactly the loop's, zero border included.
+    # See imgproc/nms.py; imgproc/tests/test_nms.py keeps the loop
+    return non_maximum_suppression(grad_mag, grad_dir, 'fast')
 
 """Note that this simplified code does not interpolate between the neighboring pixel values in order to look up the real magnitude samples along the gradient direction.
 This interpolation is crucial to obtain the necessary robustness for an actual implementation.
@@ -165,12 +109,7 @@ Another problem is that suitable values for ``theta`` may vary substantially bet
 Extend the function ``get_edges_with_nms`` such that the threshold $\theta \in [0,1]$ is defined relative to the maximal gradient magnitude value in the image.
 """
 
-def get_edges_with_nms(image, sigma, theta):
-    # Your code here
-    magnitude, direction = image_gradients_polar(image, sigma)
-    # theta = np.min(magnitude) / np.max(magnitude)
-    edge = nms_for_canny(magnitude, direction)
-    return edge
+from imgproc.edges import get_edges_with_nms
 
 """Try your function on the given example images and describe your results."""
 
@@ -200,45 +139,7 @@ The following hints may help you:
 - The actual edge following part is most easily implemented as a recursive procedure. In most cases, you will have the option to choose between several possible continuation points. Again, the easiest way is to try all of them in sequence (or even all 8 neighbors) and let the recursive procedure (together with the ``visited`` flags) do the rest.
 """
 
-def my_canny(image, sigma, theta_low, theta_high):
-    # Output image
-    magnitude, direction = image_gradients_polar(image, sigma)
-
-    theta_high *= np.max(magnitude)
-    theta_low *= np.max(magnitude)
-    im_h, im_w = image.shape
-    image_suppressed = nms_for_canny(magnitude, direction)
-
-    im = np.zeros((im_h + 2, im_w + 2))
-    im[1:im_h + 1, 1:im_w + 1] = image_suppressed
-    image_suppressed = im
-    image_out = np.zeros_like(image_suppressed)
-    visited = np.where(image_suppressed < theta_low, True, False)
-
-    def follow_edge(x, y):
-        if visited[y, x]:
-            return
-
-        visited[y, x] = True
-        image_out[y, x] = 255
-
-        # Pre-define pixel index offset along different orientation
-        offsets_x = [-1, -1, 0, 1, 1, 1, 0, -1]
-        offsets_y = [0, -1, -1, -1, 0, 1, 1, 1]
-
-        for ox, oy in zip(offsets_x, offsets_y):
-            # Note: `visited` is already False for points
-            # below the low threshold.
-            if not visited[y + 1 + oy, x + 1 + ox] and image[y + oy, x + ox] >= theta_low:
-                follow_edge(x + ox, y + oy)
-
-    # Your code here
-    for i in range(im_h):
-        for j in range(im_w):
-            if image[i,j] >= theta_high and not visited[i,j]:
-                follow_edge(j, i)
-
-    return image_out[1:im_h + 1, 1:im_w + 1]
+from imgproc.edges import my_canny
 
 """OpenCV already provides built-in function that implements the Canny edge detector.
 https://opencv-python-tutroals.readthedocs.io/en/latest/py_tutorials/py_imgproc/py_canny/py_canny.html
@@ -276,3 +177,34 @@ Extend the function `get_edges` by the following steps in order to do this:
 - Find the threshold for which the cumulative histogram contains the value `num_desired_edge_pixels`.
 """
 
+from imgproc.edges import get_edges_adaptive
+
+"""Try your function on the given example images and describe your results."""
+
+thetas = [0.1, 0.3, 0.6]
+images = []
+titles = []
+for filename in ['gantrycrane.png', 'circuit.png']:
+    image = imread_gray(filename)
+    for theta in thetas:
+        images.append(get_edges_adaptive(image, sigma=2, theta=theta))
+        titles.append(f'{filename}, theta={theta}')
+
+plot_multiple(images, titles, max_columns=3, imsize=4)
+plt.show()
+"""**Describe your results here:**
+    
+----
+"""
+
+"""For a whole set of images, `load_images` decodes the next ones on a thread pool while
+the current one is processed (at most `depth` images are held in memory at a time) and
+yields them in order, so any of the edge functions above can consume it directly."""
+
+filenames = ['gantrycrane.png', 'circuit.png', 'coins1.jpg', 'zebras.jpg', 'grass.jpg']
+paths = [f'../data/{filename}' for filename in filenames]
+start = time.perf_counter()
+edge_counts = [int(get_edges_adaptive(image, sigma=2, theta=0.3).sum())
+               for image in load_images(paths, dtype=np.float32, depth=4)]
+print(f'edge pixels {dict(zip(filenames, edge_counts))} '
+      f'in {1000 * (time.perf_counter() - start):.0f} ms')
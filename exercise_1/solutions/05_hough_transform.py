@@ -36,17 +36,27 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.image as mpimg
 import cv2
+from imgproc.hough import progressive_hough_lines, IncrementalHough
+from imgproc.circles import hough_circles
+from imgproc import peaks
+from imgproc.coins import CoinCounter
+from imgproc.images import imread, cache_info
+from imgproc.profiling import profile
 
 """## Some convenience functions"""
 
 def imread_gray(filename):
     """Read grayscale image from our data directory."""
-    return cv2.imread(f'../data/{filename}', cv2.IMREAD_GRAYSCALE)
+    # Decoded once per file and mode, see imgproc.images (read-only)
+    return imread(f'../data/{filename}', 'gray')
 
 def imread_rgb(filename):
     """Read a color image from our data directory."""
-    im = cv2.imread(f'../data/{filename}', cv2.IMREAD_COLOR)
-    return cv2.cvtColor(im, cv2.COLOR_BGR2RGB)
+    # A copy, since the lines are drawn into it
+    return imread(f'../data/{filename}', 'rgb').copy()
+
+# Gradient magnitude and direction, see imgproc/gradients.py
+from imgproc.gradients import image_gradients_polar
 
 def plot_hough(image, edges, hough_space):
     fig, axes = plt.subplots(1, 3, figsize=(3 * 4, 4))
@@ -93,25 +103,8 @@ Initially, the array should be filled with zeros.
 For each edge pixel in the input image, create the corresponding curve in $(\rho, \theta)$ space by evaluating above line equation for all values of $\theta$ and increment the corresponding cells of the accumulator array.
 """
 
-def hough_transform(edge_image, n_bins_rho, n_bins_theta):
-    # Vote accumulator
-    votes_acc = np.zeros((n_bins_rho, n_bins_theta), dtype=np.int)  
-    
-    # Create bins
-    diag = np.linalg.norm(edge_image.shape)  # Length of image diagonal
-    theta_bins = np.linspace(-np.pi / 2, np.pi / 2, n_bins_theta)
-    rho_bins = np.linspace(-diag, diag, n_bins_rho) 
-    
-    # Implement Hough transform here
-    im_h, im_w = edge_image.shape
-    for i in range(im_h):
-        for j in range(im_w):
-            if edge_image[i,j] == 255 :
-                for theta in theta_bins:
-                    rho = j * np.sin(theta) + i * np.cos(theta)
-                    rho_idx = int(np.floor((n_bins_rho) * (rho+diag) / (2*diag)))
-                    votes_acc[rho_idx, np.where(theta_bins == theta)] += 1
-    return votes_acc, rho_bins, theta_bins
+# Importable without running this notebook, see imgproc/hough.py
+from imgproc.hough import hough_transform
 
 """Test the implementation on an example image. Visualize the resulting Hough space by displaying it as a 2D image."""
 
@@ -134,29 +127,19 @@ This function is simpler than the non-maximum suppression from the Canny Edge De
 """
 
 def nms2d(image):
-    image_out = np.zeros_like(image)
-    offsets_x = [-1, -1, 0, 1, 1, 1, 0, -1]
-    offsets_y = [0, -1, -1, -1, 0, 1, 1, 1]
-    # Your code here
-    im_h, im_w = image.shape
-    for i in range(im_h):
-        for j in range(im_w):
-            for ox, oy in zip(offsets_x, offsets_y):
-                if image[i,j] >= image[i + ox, j + oy]:
-                    image_out[i,j] = image[i,j]
+    # Keep one pixel of every flat top whose 8 neighbours are all smaller,
+    # computed on whole arrays
+    image_out = peaks.nms2d(image)
     return image_out
 
 """Write a function ``find_hough_peaks`` that takes the result of ``hough_transform`` as an argument, finds the extrema in Hough space using ``nms2d`` and returns the index of all points $(\rho_i, \theta_i)$ for which the corresponding Hough value is greater than ``threshold``."""
 
-def find_hough_peaks(hough_space, threshold):
-    rho_max_index = []
-    theta_max_index = []
-    im_h, im_w = hough_space.shape
-    for i in range(im_h):
-        for j in range(im_w):
-            if hough_space[i,j] > threshold:
-                rho_max_index.append(i)
-                theta_max_index.append(j)
+def find_hough_peaks(hough_space, threshold, relative=None, top_k=None, min_distance=0):
+    # Local maxima of `nms2d` above `threshold`, strongest first; optionally
+    # above `relative` times the strongest, at most `top_k` of them and at
+    # least `min_distance` (rho, theta) bins apart
+    rho_max_index, theta_max_index = peaks.find_peaks(
+        hough_space, threshold, relative, top_k, min_distance)
     return rho_max_index, theta_max_index
 
 """Try your implementation on the images ``gantrycrane.png`` and ``circuit.png``.
@@ -175,6 +158,31 @@ image_with_lines = plot_with_hough_lines(color_image, rho_max, theta_max)
 fig, ax = plt.subplots(figsize=(8, 4))
 ax.imshow(image_with_lines)
 plt.show()
+
+# Only the strongest few lines are needed: the progressive probabilistic
+# transform stops after `max_lines` segments instead of voting with every
+# edge pixel first
+segments = progressive_hough_lines(edges, n_bins_rho, n_bins_theta, threshold=40,
+                                   min_length=30, max_lines=10, seed=0)
+print(f'gantrycrane.png: found {len(segments)} segments progressively.')
+color_image = imread_rgb('gantrycrane.png')
+for x0, y0, x1, y1 in segments:
+    cv2.line(color_image, (int(x0), int(y0)), (int(x1), int(y1)), color=(255, 0, 0))
+
+fig, ax = plt.subplots(figsize=(8, 4))
+ax.imshow(color_image)
+plt.show()
+# For a fixed camera, consecutive edge maps differ in few pixels: update the
+# accumulator with the changed pixels only instead of rebuilding it
+incremental = IncrementalHough(edges.shape, n_bins_rho, n_bins_theta, threshold=250)
+incremental.update(edges)
+rng = np.random.default_rng(0)
+for frame in range(5):
+    # Simulated sensor noise flipping a few edge pixels
+    noisy_edges = np.where(rng.random(edges.shape) < 0.0005, 255 - edges, edges)
+    n_changed = incremental.update(noisy_edges)
+    rho_max_idx, theta_max_idx = incremental.peaks()
+    print(f'frame {frame}: {n_changed} changed edge pixels, {len(rho_max_idx)} lines')
 # Try another image
 image = imread_gray('circuit.png')
 
@@ -235,4 +243,74 @@ Can you build an online coin classification and counting system?
 
 You can take a look at the ``Haribo classification`` demo (MATLAB) in the Moodle for some ideas. Use the functions you wrote in the previous questions.
 (Hint: you may need to include a reference shape in the picture in order to obtain the absolute scale).
-"""
\ No newline at end of file
+"""
+
+image = imread_gray('gantrycrane.png')
+blurred = cv2.GaussianBlur(image, (kernel_size, kernel_size), sigma)
+edges = cv2.Canny(blurred, threshold1=30, threshold2=90)
+_, grad_dir = image_gradients_polar(image, sigma)
+
+# One vote per edge pixel, spread over 2 theta bins on either side
+hough_space, rho_bins, theta_bins = hough_transform(
+    edges, n_bins_rho, n_bins_theta, grad_dir, spread=2)
+plot_hough(image, edges, hough_space)
+plt.show()
+
+"""Part c: ``hough_circle`` votes along the gradient direction only, summing all
+radii into a 2D centre accumulator, and then finds the radius of every centre
+from a histogram of its distances to the edge pixels."""
+
+def hough_circle(edge_image, grad_dir, r_min, r_max, min_support=0.3):
+    return hough_circles(edge_image == 255, grad_dir, r_min, r_max, min_support)
+
+image = imread_gray('coins1.jpg')
+blurred = cv2.GaussianBlur(image, (kernel_size, kernel_size), sigma)
+edges = cv2.Canny(blurred, threshold1=30, threshold2=90)
+_, grad_dir = image_gradients_polar(image, sigma)
+
+circles = hough_circle(edges, grad_dir, r_min=15, r_max=80)
+print(f'coins1.jpg: found {len(circles)} coins in the image.')
+color_image = imread_rgb('coins1.jpg')
+for circle in circles:
+    cv2.circle(color_image, (circle.x, circle.y), circle.radius, color=(255, 0, 0))
+
+fig, ax = plt.subplots(figsize=(8, 4))
+ax.imshow(color_image)
+plt.show()
+
+"""Part e: a streaming coin counter. Frames come from a generator (a video
+file, a directory of images or any iterable of frames) and are decoded ahead
+in a background thread; every frame goes through gradient, edges, circle
+Hough and classification by diameter. The largest coin serves as the
+reference for the absolute scale: here one of the quarters (24.26 mm)."""
+
+# Simulate a 640x480 camera looking at the coins. The frames are processed at
+# half resolution (scale=0.5), which is what keeps up with 30 fps; at full
+# resolution the pipeline manages about 10 fps.
+frame = cv2.resize(imread('../data/coins1.jpg', 'bgr'), (640, 480))
+counter = CoinCounter(reference_mm=24.26, count_reference=True,
+                      r_min=30, r_max=120, scale=0.5)
+for result in counter.run(frame for _ in range(30)):
+    pass
+height, width = frame.shape[:2]
+print(f'{width}x{height} frames processed at scale {counter.scale} '
+      f'({int(width * counter.scale)}x{int(height * counter.scale)})')
+print(f'coins: {dict(result.counts)}')
+print('per-stage latency (ms) and throughput:',
+      {stage: round(value, 1) for stage, value in counter.timer.report().items()})
+
+"""Where does the time of a Canny + Hough run go? Inside `profile()`, every stage
+records its time, the memory it allocated and counters such as the number of edge
+pixels and votes; `profiler.save_chrome_trace(path)` writes the timeline for
+chrome://tracing. Outside of it, the instrumentation costs next to nothing."""
+
+from imgproc.edges import my_canny
+
+with profile() as profiler:
+    edges = my_canny(imread_gray('gantrycrane.png'), sigma=2, theta_low=0.1, theta_high=0.3)
+    hough_space, rho_bins, theta_bins = hough_transform(edges, n_bins_rho, n_bins_theta)
+    rho_max_idx, theta_max_idx = find_hough_peaks(hough_space, 250)
+print(profiler.summary())
+
+# gantrycrane.png and coins1.jpg were decoded only once per mode
+print(f'image cache: {cache_info()}')
@@ -0,0 +1,59 @@
+"""Shared image processing engines used by the exercise solutions.
+
+The submodules are only imported when one of their names is first used (or
+imported explicitly, e.g. ``from imgproc.edges import my_canny``), so
+``import imgproc`` is cheap and pulls in neither SciPy nor OpenCV nor
+Matplotlib. The filter, derivative and edge modules import SciPy only in the
+code paths that use it (FFT and direct convolution, labelling); ``peaks``,
+``circles`` and ``spectrum`` need it for every call. The command line
+interface is ``python -m imgproc``.
+"""
+
+import importlib
+
+# Public name -> submodule defining it
+_EXPORTS = {
+    'separable': ('BORDER_MODES', 'correlate1d', 'convolve1d', 'separable_convolve'),
+    'convolution': ('METHODS', 'choose_method', 'convolve', 'convolve_with_two', 'fft_convolve',
+                    'gaussian_blur'),
+    'kernels': ('KernelBank', 'get_kernel', 'cache_info'),
+    'scale_space': ('GaussianScaleSpace', 'ScaleLevel'),
+    'batch': ('bucket_by_shape', 'map_batched'),
+    'tiled': ('process_tiled', 'iter_tiles', 'open_npy', 'create_npy', 'halo_for'),
+    'parallel': ('TileScheduler', 'SharedArray', 'run_parallel'),
+    'derivatives': ('DERIVATIVES', 'gaussian_derivatives'),
+    'policy': ('get_dtype', 'set_dtype', 'use_dtype', 'Workspace'),
+    'nms': ('NMS_MODES', 'non_maximum_suppression'),
+    'hysteresis': ('hysteresis_threshold', 'hysteresis_tiled'),
+    'thresholds': ('adaptive_threshold', 'magnitude_histogram', 'threshold_from_histogram',
+                   'RunningHistogram'),
+    'hough': ('hough_lines', 'hough_lines_directed', 'hough_transform', 'progressive_hough_lines',
+              'line_tables', 'IncrementalHough'),
+    'circles': ('Circle', 'hough_circles'),
+    'peaks': ('local_maxima', 'nms2d', 'find_peaks'),
+    'stream': ('iter_frames', 'prefetch', 'StageTimer'),
+    'coins': ('CoinCounter', 'classify_diameters'),
+    'images': ('ImageCache', 'imread', 'list_images', 'load_images'),
+    'filters': ('gaussian_filter', 'filter_gauss', 'filter_box'),
+    'gradients': ('gauss_derivs', 'gauss_second_derivs', 'image_gradients_polar', 'laplace'),
+    'edges': ('get_edges', 'get_edges_with_nms', 'my_canny', 'get_edges_adaptive'),
+    'plotting': ('plot_multiple',),
+    'spectrum': ('fourier_spectrum', 'log_magnitude_spectrum', 'display_range', 'SpectrumCache'),
+    'profiling': ('Profiler', 'profile', 'profiled'),
+}
+_MODULES = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = sorted(_MODULES)
+
+
+def __getattr__(name):
+    module = _MODULES.get(name)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,7 @@
+"""``python -m imgproc``, see ``imgproc.cli``."""
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
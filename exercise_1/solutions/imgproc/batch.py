@@ -0,0 +1,38 @@
+"""Run stage functions over many images with one vectorized call per shape.
+
+The stage functions accept ``(N, H, W)`` (or ``(N, H, W, C)``) stacks. Images
+of different sizes are bucketed into groups of the same shape, every group is
+stacked and processed in one call, and the results come back in input order.
+"""
+
+import numpy as np
+
+
+def bucket_by_shape(images):
+    """Indices of ``images`` grouped by (shape, dtype), in first-seen order."""
+    buckets = {}
+    for i, image in enumerate(images):
+        image = np.asarray(image)
+        buckets.setdefault((image.shape, image.dtype.str), []).append(i)
+    return buckets
+
+
+def map_batched(fn, images, *args, **kwargs):
+    """Apply ``fn`` to every image, calling it once per stack of equal shapes.
+
+    ``fn`` gets an ``(N, ...)`` stack plus ``args`` and ``kwargs`` and returns
+    an array (or a tuple of arrays) with the batch along the first axis. The
+    result is a list with one entry (array or tuple) per input image.
+    ``images`` may be any iterable, e.g. ``imgproc.images.load_images``.
+    """
+    images = list(images)
+    results = [None] * len(images)
+    for indices in bucket_by_shape(images).values():
+        stack = np.stack([np.asarray(images[i]) for i in indices])
+        out = fn(stack, *args, **kwargs)
+        for k, i in enumerate(indices):
+            if isinstance(out, tuple):
+                results[i] = tuple(o[k] for o in out)
+            else:
+                results[i] = out[k]
+    return results
@@ -0,0 +1,442 @@
+"""Benchmarks of the exercise stages against OpenCV and SciPy.
+
+Every stage runs over a grid of image sizes (256 x 256 up to 4K) and of its
+parameters (sigma, box size or number of Hough bins) on a synthetic image
+with lines, rectangles, discs and noise. For every entry, the best of
+``repeat`` runs of our implementation and of the reference are recorded in
+milliseconds, together with an error against the reference that has to stay
+within the stage's tolerance. Every function is called once untimed first, so
+imports and first-call setup are not measured (except for the slow
+per-pixel reference loop, which runs once).
+
+- ``gaussian_filter``, ``filter_box``, ``gauss_derivs``, ``laplace``: the
+  largest absolute difference, relative to the largest reference value for the
+  derivatives. The exercise samples the derivative kernels of the continuous
+  Gaussian, SciPy differentiates the normalized discrete one, so the first
+  derivatives differ by a few percent. For the second derivatives the
+  difference reaches 15% and depends on the image, which would hide real
+  errors, so ``laplace`` is compared with SciPy's separable correlation with
+  the exercise's own kernels in float64 instead. OpenCV blurs 8-bit images in
+  fixed point, which can round to a neighbouring gray level.
+- ``nms_for_canny``: differing pixels compared with the per-pixel loop of the
+  exercise (``imgproc.nms.nms_loop``, only run up to ``LOOP_MAX_PIXELS``; it
+  has no OpenCV counterpart).
+- ``my_canny``: ``1 - F1`` of the edge pixels against ``cv2.Canny`` with the
+  same relative thresholds, counting pixels within one pixel as matches.
+- ``hough_transform``: the fraction of our strongest peaks without one of the
+  strongest ``cv2.HoughLines`` lines within two bins. OpenCV only compares
+  with the 4 direct neighbours and so returns several lines per peak; it also
+  extracts the lines, which our timing does not include.
+- ``nms2d``: surviving pixels that are not regional maxima (found by
+  morphological reconstruction), plus the difference between their number
+  and the number of maximum plateaus.
+- ``log_magnitude_spectrum``: the largest absolute difference of the log
+  magnitude from the complex128 FFT the exercise started with (float32
+  rounding, largest at the smallest magnitudes). Uncached.
+
+``run_benchmarks`` returns JSON-serializable results, ``compare_results``
+finds the entries that got slower than a baseline run by more than a relative
+tolerance. ``python -m imgproc bench`` runs both.
+"""
+
+import json
+import os
+import platform
+import time
+from collections import namedtuple
+
+import numpy as np
+
+SIZES = ((256, 256), (512, 512), (1024, 1024), (2048, 2048), (2160, 3840))
+SIGMAS = (1.0, 2.0, 4.0)
+BOX_SIZES = (3, 9)
+HOUGH_BINS = (180, 360)
+
+# The per-pixel NMS loop takes seconds beyond this
+LOOP_MAX_PIXELS = 256 * 256
+
+# Baseline entries faster than this are too noisy to flag as regressions
+MIN_COMPARED_MS = 1.0
+
+Stage = namedtuple('Stage', ['name', 'reference_name', 'grid', 'prepare', 'ours', 'reference',
+                             'error', 'tolerance', 'max_reference_pixels'])
+
+
+def synthetic_image(shape, seed=0):
+    """Deterministic uint8 test image: lines, rectangles and discs on a smooth
+    background, plus noise."""
+    import cv2
+    rng = np.random.default_rng(seed)
+    height, width = shape
+    rows, cols = np.mgrid[0:height, 0:width]
+    image = (64 + 48 * np.sin(cols / width * 3 * np.pi) * np.cos(rows / height * 2 * np.pi))
+    image = image.astype(np.uint8)
+    scale = min(height, width)
+    n_shapes = max(8, height * width // 20000)
+    for _ in range(n_shapes):
+        color = int(rng.integers(100, 256))
+        x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+        size = int(rng.integers(scale // 40 + 2, scale // 8 + 4))
+        kind = rng.integers(3)
+        if kind == 0:
+            angle = rng.uniform(0, np.pi)
+            dx, dy = int(4 * size * np.cos(angle)), int(4 * size * np.sin(angle))
+            cv2.line(image, (x - dx, y - dy), (x + dx, y + dy), color, max(1, scale // 256))
+        elif kind == 1:
+            cv2.rectangle(image, (x, y), (x + size, y + size // 2), color, -1)
+        else:
+            cv2.circle(image, (x, y), size // 2, color, -1)
+    noise = rng.normal(0, 4, shape)
+    return np.clip(image + noise, 0, 255).astype(np.uint8)
+
+
+def _kernel_size(sigma):
+    return 2 * int(np.ceil(3 * sigma)) + 1
+
+
+def _max_abs_error(ours, reference):
+    return float(np.max(np.abs(np.asarray(ours, np.float64) - reference)))
+
+
+def _relative_error(ours, reference):
+    ours, reference = np.atleast_1d(ours), np.atleast_1d(reference)
+    scale = max(float(np.max(np.abs(reference))), 1e-12)
+    return max(_max_abs_error(o, r) for o, r in zip(ours, reference)) / scale
+
+
+def _gray(image, params):
+    return {'image': image.astype(np.float32)}
+
+
+def _gaussian_filter(inputs, sigma):
+    from .filters import gaussian_filter
+    return gaussian_filter(inputs['image'], sigma)
+
+
+def _gaussian_filter_cv(inputs, sigma):
+    import cv2
+    size = _kernel_size(sigma)
+    return cv2.GaussianBlur(inputs['image'], (size, size), sigma, borderType=cv2.BORDER_CONSTANT)
+
+
+def _filter_box(inputs, size):
+    from .filters import filter_box
+    return filter_box(inputs['image'], size)
+
+
+def _filter_box_scipy(inputs, size):
+    from scipy import ndimage
+    once = ndimage.uniform_filter(inputs['image'], size, mode='wrap')
+    return ndimage.uniform_filter(once, size, mode='wrap')
+
+
+def _gauss_derivs(inputs, sigma):
+    from .gradients import gauss_derivs
+    return gauss_derivs(inputs['image'], sigma)
+
+
+def _gauss_derivs_scipy(inputs, sigma):
+    from scipy import ndimage
+    truncate = int(3.0 * sigma) / sigma
+    image = inputs['image']
+    return (ndimage.gaussian_filter(image, sigma, order=(0, 1), truncate=truncate),
+            ndimage.gaussian_filter(image, sigma, order=(1, 0), truncate=truncate))
+
+
+def _laplace(inputs, sigma):
+    from .gradients import laplace
+    return laplace(inputs['image'], sigma)
+
+
+def _laplace_scipy(inputs, sigma):
+    from scipy import ndimage
+    from .kernels import make_kernel
+    image = inputs['image'].astype(np.float64)
+    radius = int(3.0 * sigma)
+    # correlate1d does not flip the (symmetric) kernels
+    gauss, gaussdxx = make_kernel('gauss', sigma, radius), make_kernel('gaussdxx', sigma, radius)
+    dyy = ndimage.correlate1d(ndimage.correlate1d(image, gaussdxx, 0), gauss, 1)
+    dxx = ndimage.correlate1d(ndimage.correlate1d(image, gauss, 0), gaussdxx, 1)
+    return dxx + dyy
+
+
+def _gradients(image, params):
+    from .gradients import image_gradients_polar
+    magnitude, direction = image_gradients_polar(image.astype(np.float32), 2.0)
+    return {'magnitude': magnitude, 'direction': direction}
+
+
+def _nms(inputs):
+    from .nms import non_maximum_suppression
+    return non_maximum_suppression(inputs['magnitude'], inputs['direction'])
+
+
+def _nms_loop(inputs):
+    from .nms import nms_loop
+    return nms_loop(inputs['magnitude'], inputs['direction'])
+
+
+def _differing_pixels(ours, reference):
+    return float(np.count_nonzero(ours != reference))
+
+
+CANNY_LOW, CANNY_HIGH = 0.1, 0.3
+
+
+def _canny_inputs(image, params):
+    import cv2
+    sigma = params['sigma']
+    size = _kernel_size(sigma)
+    blurred = cv2.GaussianBlur(image, (size, size), sigma)
+    # The same thresholds relative to the largest (Sobel) gradient magnitude
+    dx = cv2.Sobel(blurred, cv2.CV_32F, 1, 0)
+    dy = cv2.Sobel(blurred, cv2.CV_32F, 0, 1)
+    top = float(np.max(np.hypot(dx, dy)))
+    return {'image': image.astype(np.float32), 'blurred': blurred,
+            'low': CANNY_LOW * top, 'high': CANNY_HIGH * top}
+
+
+def _my_canny(inputs, sigma):
+    from .edges import my_canny
+    return my_canny(inputs['image'], sigma, CANNY_LOW, CANNY_HIGH)
+
+
+def _canny_cv(inputs, sigma):
+    import cv2
+    return cv2.Canny(inputs['blurred'], inputs['low'], inputs['high'], L2gradient=True)
+
+
+def _edge_f1_error(ours, reference):
+    """``1 - F1`` of two edge masks, with a tolerance of one pixel."""
+    from scipy import ndimage
+    ours, reference = np.asarray(ours) > 0, np.asarray(reference) > 0
+    if not ours.any() and not reference.any():
+        return 0.0
+    near = np.ones((3, 3), bool)
+    precision = np.count_nonzero(ours & ndimage.binary_dilation(reference, near))
+    recall = np.count_nonzero(reference & ndimage.binary_dilation(ours, near))
+    precision /= max(np.count_nonzero(ours), 1)
+    recall /= max(np.count_nonzero(reference), 1)
+    if precision + recall == 0:
+        return 1.0
+    return 1.0 - 2 * precision * recall / (precision + recall)
+
+
+def _edges(image, params):
+    import cv2
+    return {'edges': cv2.Canny(image, 50, 150)}
+
+
+def _hough(inputs, bins):
+    from .hough import hough_transform
+    return hough_transform(inputs['edges'], bins, bins)
+
+
+# Our strongest peaks that must be found among the strongest OpenCV lines
+HOUGH_PEAKS, HOUGH_LINES = 10, 30
+
+
+def _hough_cv(inputs, bins):
+    import cv2
+    from .hough import line_tables
+    edges = inputs['edges']
+    diag = line_tables(edges.shape, bins).diag
+    lines = cv2.HoughLinesWithAccumulator(edges, 2 * diag / (bins - 1), np.pi / bins,
+                                          threshold=1)
+    return np.empty((0, 3)) if lines is None else lines.reshape(-1, 3)[:HOUGH_LINES]
+
+
+def _hough_error(ours, reference):
+    from .peaks import find_peaks
+    votes, rho_bins, theta_bins = ours
+    rows, cols = find_peaks(votes, top_k=HOUGH_PEAKS)
+    if len(rows) == 0:
+        return float(len(reference) > 0)
+    rho_step = rho_bins[1] - rho_bins[0]
+    theta_step = theta_bins[1] - theta_bins[0]
+    found = np.zeros(len(rows), bool)
+    for rho, theta, _ in reference:
+        # OpenCV: x cos(t) + y sin(t) = rho with t in [0, pi); ours:
+        # x sin(t') + y cos(t') = rho with t' = pi/2 - t in (-pi/2, pi/2]
+        for sign in (1, -1):
+            found |= ((np.abs(rho_bins[rows] - sign * rho) <= 2 * rho_step)
+                      & (np.abs(theta_bins[cols] - sign * (np.pi / 2 - theta)) <= 2 * theta_step))
+    return 1.0 - np.count_nonzero(found) / len(rows)
+
+
+def _hough_votes(image, params):
+    from .hough import hough_transform
+    edges = _edges(image, params)['edges']
+    bins = params['bins']
+    return {'votes': hough_transform(edges, bins, bins)[0]}
+
+
+def _nms2d(inputs, bins):
+    from .peaks import nms2d
+    return nms2d(inputs['votes'])
+
+
+def _nms2d_scipy(inputs, bins):
+    from scipy import ndimage
+    votes = inputs['votes']
+    # Regional maxima: where the reconstruction by dilation of votes - 1
+    # under votes stays below votes
+    outside = votes.min() - 1
+    marker = votes - 1
+    while True:
+        grown = np.minimum(ndimage.grey_dilation(marker, 3, mode='constant', cval=outside), votes)
+        if np.array_equal(grown, marker):
+            break
+        marker = grown
+    return np.where((votes > marker) & (votes > 0), votes, 0)
+
+
+def _nms2d_error(ours, reference):
+    from scipy import ndimage
+    is_max = reference > 0
+    _, plateaus = ndimage.label(is_max, np.ones((3, 3), bool))
+    kept = ours > 0
+    return float(np.count_nonzero(kept & ~is_max) + abs(np.count_nonzero(kept) - plateaus))
+
+
+def _log_spectrum(inputs):
+    from .spectrum import log_magnitude_spectrum
+    return log_magnitude_spectrum(inputs['image'], cache=None)
+
+
+def _log_spectrum_numpy(inputs):
+    image = inputs['image']
+    spectrum = np.fft.fftshift(np.fft.fft2(image / np.sum(image)))
+    return np.log(np.abs(spectrum) + 1e-8)
+
+
+STAGES = {
+    'gaussian_filter': Stage('gaussian_filter', 'cv2.GaussianBlur', {'sigma': SIGMAS},
+                             lambda image, params: {'image': image}, _gaussian_filter,
+                             _gaussian_filter_cv, _max_abs_error, 2.0, None),
+    'filter_box': Stage('filter_box', 'scipy.ndimage.uniform_filter', {'size': BOX_SIZES},
+                        _gray, _filter_box, _filter_box_scipy, _max_abs_error, 1e-3, None),
+    'gauss_derivs': Stage('gauss_derivs', 'scipy.ndimage.gaussian_filter', {'sigma': SIGMAS},
+                          _gray, _gauss_derivs, _gauss_derivs_scipy, _relative_error, 0.03, None),
+    'laplace': Stage('laplace', 'scipy.ndimage.correlate1d (same kernels)', {'sigma': SIGMAS},
+                     _gray, _laplace, _laplace_scipy, _relative_error, 1e-4, None),
+    'nms_for_canny': Stage('nms_for_canny', 'per-pixel loop', {}, _gradients, _nms, _nms_loop,
+                           _differing_pixels, 0.0, LOOP_MAX_PIXELS),
+    'my_canny': Stage('my_canny', 'cv2.Canny', {'sigma': SIGMAS}, _canny_inputs, _my_canny,
+                      _canny_cv, _edge_f1_error, 0.3, None),
+    'hough_transform': Stage('hough_transform', 'cv2.HoughLinesWithAccumulator',
+                             {'bins': HOUGH_BINS}, _edges, _hough, _hough_cv, _hough_error,
+                             0.3, None),
+    'nms2d': Stage('nms2d', 'scipy.ndimage reconstruction', {'bins': HOUGH_BINS}, _hough_votes,
+                   _nms2d, _nms2d_scipy, _nms2d_error, 0.0, None),
+    'log_magnitude_spectrum': Stage('log_magnitude_spectrum', 'np.fft.fft2 (complex128)', {},
+                                    _gray, _log_spectrum, _log_spectrum_numpy, _max_abs_error,
+                                    0.05, None),
+}
+
+
+def _best_time(fn, repeat, warmup=True):
+    """Best wall-clock time of ``repeat`` calls in milliseconds, and the
+    result of the last call. With ``warmup``, ``fn`` is called once untimed
+    first."""
+    if warmup:
+        fn()
+    best = np.inf
+    for _ in range(max(repeat, 1)):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return 1000 * best, result
+
+
+def _param_grid(grid):
+    names = sorted(grid)
+    for values in np.ndindex(*(len(grid[name]) for name in names)):
+        yield {name: grid[name][i] for name, i in zip(names, values)}
+
+
+def metadata():
+    """Versions and machine of a benchmark run."""
+    import cv2
+    import scipy
+    from .policy import get_dtype
+    return {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(),
+            'numpy': np.__version__, 'scipy': scipy.__version__, 'opencv': cv2.__version__,
+            'machine': platform.machine(), 'processor': platform.processor(),
+            'cpus': os.cpu_count(), 'dtype': str(get_dtype())}
+
+
+def run_benchmarks(stages=None, sizes=SIZES, repeat=3, log=None):
+    """Benchmark ``stages`` (names of ``STAGES``, default all) on images of
+    ``sizes`` (``(height, width)`` pairs).
+
+    Returns ``{'meta': ..., 'results': [...]}``; every result has the stage,
+    reference, shape and parameters, the times ``ours_ms`` and
+    ``reference_ms`` (``None`` where the reference is skipped), the
+    ``speedup`` over the reference and the ``error`` against it, with the
+    ``tolerance`` and whether the error is within it (``accurate``).
+    ``log`` is called with every result as it is measured.
+    """
+    names = list(STAGES) if stages is None else list(stages)
+    for name in names:
+        if name not in STAGES:
+            raise ValueError(f'unknown stage {name!r}, expected one of {tuple(STAGES)}')
+    results = []
+    for shape in sizes:
+        image = synthetic_image(tuple(shape))
+        for name in names:
+            stage = STAGES[name]
+            for params in _param_grid(stage.grid):
+                inputs = stage.prepare(image, params)
+                ours_ms, ours = _best_time(lambda: stage.ours(inputs, **params), repeat)
+                reference_ms = error = None
+                if stage.max_reference_pixels is None or image.size <= stage.max_reference_pixels:
+                    # The slow reference loop is run once, without warm-up
+                    slow = stage.max_reference_pixels is not None
+                    reference_ms, reference = _best_time(
+                        lambda: stage.reference(inputs, **params), 1 if slow else repeat,
+                        warmup=not slow)
+                    error = float(stage.error(ours, reference))
+                result = {
+                    'stage': name, 'reference': stage.reference_name, 'shape': list(shape),
+                    'params': {key: float(value) if isinstance(value, float) else int(value)
+                               for key, value in params.items()},
+                    'ours_ms': ours_ms, 'reference_ms': reference_ms,
+                    'speedup': reference_ms / ours_ms if reference_ms and ours_ms else None,
+                    'error': error, 'tolerance': stage.tolerance,
+                    'accurate': None if error is None else error <= stage.tolerance,
+                }
+                results.append(result)
+                if log is not None:
+                    log(result)
+    return {'meta': metadata(), 'results': results}
+
+
+def _key(result):
+    return (result['stage'], tuple(result['shape']), tuple(sorted(result['params'].items())))
+
+
+def compare_results(current, baseline, tolerance=0.2, min_ms=MIN_COMPARED_MS):
+    """Entries of ``current`` more than ``tolerance`` (relative) slower than
+    the same entry of ``baseline``, as ``(result, baseline_ms, ratio)``.
+    Baseline entries faster than ``min_ms`` are not compared."""
+    before = {_key(result): result['ours_ms'] for result in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        baseline_ms = before.get(_key(result))
+        if baseline_ms is None or baseline_ms < min_ms:
+            continue
+        ratio = result['ours_ms'] / baseline_ms
+        if ratio > 1 + tolerance:
+            regressions.append((result, baseline_ms, ratio))
+    return regressions
+
+
+def save_results(results, path):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=1)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,148 @@
+"""Gradient-guided Hough transform for circles.
+
+An edge pixel ``(x, y)`` with gradient angle ``phi`` lies on a circle of
+radius ``r`` around ``(a, b) = (x + r cos(phi), y + r sin(phi))`` (or around
+the opposite point, depending on whether the circle is brighter or darker
+than its surroundings). Instead of a full ``(b, a, r)`` accumulator, which
+needs ``H * W * R`` cells, the votes of all radii are added into one 2D centre
+accumulator (padded by the largest radius, so no vote needs a bounds check),
+streaming the radii in slabs so that only ``edges * slab_size`` indices exist
+at a time. The radius of every centre candidate is then found
+from the histogram of its distances to the edge pixels whose gradient points
+at it. Memory is ``O(H * W)`` plus ``O(edges)``; with a ``Workspace``, the
+full-frame buffers are reused between calls.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+from scipy import ndimage
+
+from .convolution import gaussian_blur
+from .policy import scratch
+from .profiling import count, profiled
+
+Circle = namedtuple('Circle', ['y', 'x', 'radius', 'support'])
+
+# Radii per voting slab
+DEFAULT_SLAB_SIZE = 16
+
+
+def center_votes(edge_image, grad_dir, radii, signs=(1, -1), slab_size=DEFAULT_SLAB_SIZE,
+                 workspace=None):
+    """2D accumulator of circle centres, summed over ``radii``.
+
+    With sign ``1`` the pixels vote along their gradient (for circles brighter
+    than the background), with ``-1`` against it (for darker circles). The
+    accumulator is a view of a buffer from ``workspace``.
+    """
+    height, width = np.shape(edge_image)
+    rows, cols = np.nonzero(edge_image)
+    phi = np.asarray(grad_dir)[rows, cols]
+    cos, sin = np.cos(phi), np.sin(phi)
+    radii = np.asarray(radii, dtype=np.float64)
+    # The padding is cropped at the end
+    pad = int(np.ceil(np.max(np.abs(radii)))) + 1 if len(radii) else 0
+    padded_width = width + 2 * pad
+    size = (height + 2 * pad) * padded_width
+    offset = pad * padded_width + pad
+    center = (rows * padded_width + cols + offset).astype(np.intp)
+    votes = scratch(workspace, 'circles.votes', (size,), np.int64)
+    votes[...] = 0
+    for start in range(0, len(radii), slab_size):
+        slab = np.concatenate([sign * radii[start:start + slab_size] for sign in signs])
+        a = np.rint(np.multiply.outer(cos, slab)).astype(np.intp)
+        b = np.rint(np.multiply.outer(sin, slab)).astype(np.intp)
+        b *= padded_width
+        b += a
+        b += center[:, np.newaxis]
+        np.add.at(votes, b.ravel(), 1)
+    votes = votes.reshape(height + 2 * pad, padded_width)
+    return votes[pad:pad + height, pad:pad + width]
+
+
+def center_candidates(votes, min_distance, min_votes=None, workspace=None):
+    """Local maxima ``(rows, cols)`` of the (smoothed) centre accumulator with
+    at least ``min_votes`` (default a fifth of the strongest), strongest
+    first."""
+    shape = votes.shape
+    smooth = gaussian_blur(votes, 1.0, out=scratch(workspace, 'circles.smooth', shape),
+                           workspace=workspace)
+    if min_votes is None:
+        min_votes = 0.2 * smooth.max()
+    local_max = ndimage.maximum_filter(smooth, size=2 * min_distance + 1,
+                                       output=scratch(workspace, 'circles.local_max', shape))
+    peaks = np.equal(smooth, local_max, out=scratch(workspace, 'circles.peaks', shape, bool))
+    peaks &= np.greater_equal(smooth, max(min_votes, 1e-6),
+                              out=scratch(workspace, 'circles.strong', shape, bool))
+    rows, cols = np.nonzero(peaks)
+    order = np.argsort(-smooth[rows, cols], kind='stable')
+    return rows[order], cols[order]
+
+
+def _check_radii(r_min, r_max):
+    # the support divides by the circumference, a radius of 0 has none
+    if r_min < 1 or r_max < r_min:
+        raise ValueError(f'expected 1 <= r_min <= r_max, got r_min={r_min}, r_max={r_max}')
+
+
+def radius_support(rows, cols, grad_dir_at, center, r_min, r_max, alignment=0.9):
+    """Best radius around ``center`` and its support.
+
+    Only edge pixels whose gradient is within ``arccos(alignment)`` of the
+    direction to the centre count. The support is the number of such pixels
+    on the ring ``radius +- 1`` divided by its circumference, so ``r_min``
+    must be at least 1.
+    """
+    _check_radii(r_min, r_max)
+    dy, dx = rows - center[0], cols - center[1]
+    distance = np.hypot(dx, dy)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cosine = (dx * np.cos(grad_dir_at) + dy * np.sin(grad_dir_at)) / distance
+    ring = np.rint(distance[np.abs(cosine) >= alignment]).astype(np.intp)
+    ring = ring[(ring >= r_min - 1) & (ring <= r_max + 1)]
+    hist = np.bincount(ring, minlength=r_max + 2)
+    # counts on the ring r - 1, r, r + 1
+    thick = np.convolve(hist, np.ones(3), mode='same')[r_min:r_max + 1]
+    radii = np.arange(r_min, r_max + 1)
+    support = thick / (2 * np.pi * radii)
+    best = int(np.argmax(support))
+    return int(radii[best]), float(support[best])
+
+
+@profiled()
+def hough_circles(edge_image, grad_dir, r_min, r_max, min_support=0.3, min_distance=None,
+                  min_votes=None, max_circles=None, signs=(1, -1), slab_size=DEFAULT_SLAB_SIZE,
+                  workspace=None):
+    """Circles with radius in ``[r_min, r_max]`` in an edge image, ``r_min >= 1``.
+
+    ``grad_dir`` is the gradient angle of ``np.arctan2(dy, dx)``. Centre
+    candidates are the local maxima of the centre accumulator at least
+    ``min_distance`` (default ``r_min``) apart with at least ``min_votes``
+    (default a fifth of the strongest); each keeps its best radius if its
+    support (see ``radius_support``) is at least ``min_support``.
+
+    Returns a list of ``Circle(y, x, radius, support)``, best support first.
+    The full-frame buffers come from ``workspace``.
+    """
+    r_min, r_max = int(r_min), int(r_max)
+    _check_radii(r_min, r_max)
+    votes = center_votes(edge_image, grad_dir, np.arange(r_min, r_max + 1), signs, slab_size,
+                         workspace)
+    if min_distance is None:
+        min_distance = r_min
+    rows, cols = np.nonzero(edge_image)
+    grad_dir_at = np.asarray(grad_dir)[rows, cols]
+
+    circles = []
+    candidates = center_candidates(votes, min_distance, min_votes, workspace)
+    for center in zip(*candidates):
+        radius, support = radius_support(rows, cols, grad_dir_at, center, r_min, r_max)
+        if support >= min_support:
+            circles.append(Circle(int(center[0]), int(center[1]), radius, support))
+    circles.sort(key=lambda c: -c.support)
+    count('edge_pixels', len(rows))
+    count('votes', len(rows) * (r_max - r_min + 1) * len(signs))
+    count('candidates', len(candidates[0]))
+    count('circles', len(circles[:max_circles]))
+    return circles[:max_circles]
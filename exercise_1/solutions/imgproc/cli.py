@@ -0,0 +1,275 @@
+"""Command line interface, ``python -m imgproc {blur,edges,hough} SOURCE...``
+and ``python -m imgproc bench``.
+
+Every ``SOURCE`` is an image file or a directory of images. The images are
+decoded ahead on a thread pool (see ``images.load_images``), processed
+headlessly and written to ``--output`` as PNG images or ``.npy`` arrays named
+after the input, e.g. ``gantrycrane.edges.png``. The time of every image and
+the per-stage latency over all images are printed.
+
+``bench`` runs the benchmarks of ``imgproc.bench``, writes them as JSON and,
+given a baseline run, fails if a stage got slower than the tolerance allows.
+
+The engines are only imported once a command runs, so ``--help`` is fast.
+"""
+
+import argparse
+import importlib
+import os
+import sys
+import time
+
+import numpy as np
+
+from .images import MODES, list_images
+from .separable import BORDER_MODES
+
+FORMATS = ('png', 'npy')
+EDGE_METHODS = ('canny', 'nms', 'adaptive')
+
+
+def blur(image, args):
+    """Gaussian blur of ``image`` (uint8)."""
+    from .filters import gaussian_filter
+    return gaussian_filter(image, args.sigma, args.padding)
+
+
+def edges(image, args):
+    """Edge mask of ``image`` (uint8, 0 or 255)."""
+    from . import edges as detectors
+    if args.method == 'canny':
+        edge = detectors.my_canny(image, args.sigma, args.low, args.high)
+    elif args.method == 'nms':
+        edge = detectors.get_edges_with_nms(image, args.sigma, args.theta)
+    else:
+        edge = detectors.get_edges_adaptive(image, args.sigma, args.theta)
+    return (edge > 0).astype(np.uint8) * 255
+
+
+def hough(image, args):
+    """Line accumulator of the Canny edges of ``image``; prints its peaks."""
+    from .edges import my_canny
+    from .gradients import image_gradients_polar
+    from .hough import hough_transform
+    from .peaks import find_peaks
+    edge = my_canny(image, args.sigma, args.low, args.high)
+    grad_dir = image_gradients_polar(image, args.sigma)[1] if args.directed else None
+    votes, rho_bins, theta_bins = hough_transform(edge, args.rho_bins, args.theta_bins,
+                                                  grad_dir, args.spread)
+    rows, cols = find_peaks(votes, relative=args.relative, top_k=args.lines)
+    for row, col in zip(rows, cols):
+        print(f'    rho={rho_bins[row]:.1f} theta={theta_bins[col]:.3f} votes={votes[row, col]}')
+    return votes
+
+
+COMMANDS = {'blur': blur, 'edges': edges, 'hough': hough}
+# Engines every command imports when it first runs
+COMMAND_MODULES = {
+    'blur': ('filters',),
+    'edges': ('edges',),
+    'hough': ('edges', 'gradients', 'hough', 'peaks'),
+}
+
+
+def import_engines(args):
+    """Import the engines of the command (and OpenCV for PNG output) ahead,
+    so that the time of the first image does not include the imports."""
+    for module in COMMAND_MODULES[args.command]:
+        importlib.import_module(f'.{module}', __package__)
+    if args.format == 'png':
+        importlib.import_module('cv2')
+
+
+def to_uint8(array):
+    """``array`` as an 8-bit image, scaled to its maximum unless already uint8."""
+    if array.dtype == np.uint8:
+        return array
+    top = float(np.max(array)) if array.size else 0.0
+    scale = 255 / top if top > 0 else 0.0
+    return np.clip(np.rint(array * scale), 0, 255).astype(np.uint8)
+
+
+def write(path, array, fmt):
+    """Save ``array`` as ``path`` in format ``fmt``."""
+    if fmt == 'npy':
+        np.save(path, array)
+        return
+    import cv2
+    if not cv2.imwrite(path, to_uint8(array)):
+        raise IOError(f'cannot write image {path!r}')
+
+
+def parse_size(text):
+    """``(height, width)`` of ``'512'``, ``'480x640'`` (height x width) or ``'4k'``."""
+    if text.lower() == '4k':
+        return (2160, 3840)
+    try:
+        sizes = [int(part) for part in text.lower().split('x')]
+    except ValueError:
+        sizes = []
+    if len(sizes) == 1:
+        sizes *= 2
+    if len(sizes) != 2 or min(sizes) < 3:
+        raise argparse.ArgumentTypeError(f'invalid size {text!r}, expected N, HxW or 4k')
+    return tuple(sizes)
+
+
+def bench(args):
+    """Run the benchmarks; 1 if a result is inaccurate or a stage regressed."""
+    from . import bench as benchmarks
+
+    def log(result):
+        reference_ms = result['reference_ms']
+        params = ' '.join(f'{key}={value}' for key, value in result['params'].items())
+        reference = f'{reference_ms:9.2f} ms {result["speedup"]:6.2f}x' if reference_ms else ' ' * 20
+        error = '' if result['error'] is None else f'error {result["error"]:.3g}'
+        flag = ' INACCURATE' if result['accurate'] is False else ''
+        print(f'{result["stage"]:16s} {"x".join(map(str, result["shape"])):>9s} {params:10s} '
+              f'{result["ours_ms"]:9.2f} ms {reference} {error}{flag}', flush=True)
+
+    print(f'{"stage":16s} {"size":>9s} {"params":10s} {"ours":>12s} {"reference":>12s} {"speedup":>7s}')
+    results = benchmarks.run_benchmarks(args.stages, args.sizes or benchmarks.SIZES,
+                                        args.repeat, log)
+    benchmarks.save_results(results, args.output)
+    print(f'results written to {args.output}')
+    failed = sum(result['accurate'] is False for result in results['results'])
+    if args.baseline:
+        baseline = benchmarks.load_results(args.baseline)
+        regressions = benchmarks.compare_results(results, baseline, args.tolerance)
+        for result, baseline_ms, ratio in regressions:
+            print(f'REGRESSION {result["stage"]} {"x".join(map(str, result["shape"]))} '
+                  f'{result["params"]}: {baseline_ms:.2f} -> {result["ours_ms"]:.2f} ms '
+                  f'({ratio:.2f}x)')
+        failed += len(regressions)
+    return 1 if failed else 0
+
+
+def collect_paths(sources):
+    """Image paths of files and directories, in order."""
+    paths = []
+    for source in sources:
+        paths.extend(list_images(source) if os.path.isdir(source) else [source])
+    return paths
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m imgproc',
+                                     description='Process images headlessly.')
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('sources', nargs='+', metavar='SOURCE',
+                        help='image files or directories of images')
+    common.add_argument('-o', '--output', default='.', help='output directory (default: .)')
+    common.add_argument('-f', '--format', choices=FORMATS, default='png',
+                        help='output format (default: png)')
+    common.add_argument('-s', '--sigma', type=float, default=2.0,
+                        help='standard deviation of the Gaussian (default: 2)')
+    common.add_argument('-j', '--workers', type=int, default=4,
+                        help='decoding threads (default: 4)')
+    common.add_argument('--profile', metavar='TRACE',
+                        help='print a per-stage profile and write a Chrome trace (JSON) to TRACE')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    parser_blur = subparsers.add_parser('blur', parents=[common], help='Gaussian blur')
+    parser_blur.add_argument('--padding', choices=BORDER_MODES, default='constant',
+                             help='border mode (default: constant)')
+    parser_blur.add_argument('--mode', choices=MODES, default='bgr',
+                             help='color mode of the images (default: bgr)')
+
+    canny = argparse.ArgumentParser(add_help=False)
+    canny.add_argument('--low', type=float, default=0.1,
+                       help='Canny low threshold, relative to the largest gradient (default: 0.1)')
+    canny.add_argument('--high', type=float, default=0.3,
+                       help='Canny high threshold, relative to the largest gradient (default: 0.3)')
+
+    parser_edges = subparsers.add_parser('edges', parents=[common, canny], help='edge detection')
+    parser_edges.add_argument('--method', choices=EDGE_METHODS, default='canny',
+                              help='detector (default: canny)')
+    parser_edges.add_argument('--theta', type=float, default=0.3,
+                              help='threshold of the nms and adaptive detectors (default: 0.3)')
+
+    parser_hough = subparsers.add_parser('hough', parents=[common, canny],
+                                         help='Hough transform for lines of the Canny edges')
+    parser_hough.add_argument('--rho-bins', type=int, default=300, help='(default: 300)')
+    parser_hough.add_argument('--theta-bins', type=int, default=300, help='(default: 300)')
+    parser_hough.add_argument('--directed', action='store_true',
+                              help='vote along the gradient direction only')
+    parser_hough.add_argument('--spread', type=int, default=2,
+                              help='theta bins voted on either side with --directed (default: 2)')
+    parser_hough.add_argument('--lines', type=int, default=10,
+                              help='number of peaks printed (default: 10)')
+    parser_hough.add_argument('--relative', type=float, default=0.5,
+                              help='minimum peak height relative to the largest (default: 0.5)')
+
+    from .bench import STAGES
+    parser_bench = subparsers.add_parser('bench', help='benchmarks against OpenCV and SciPy')
+    parser_bench.add_argument('--stages', nargs='+', choices=tuple(STAGES),
+                              help='stages to run (default: all)')
+    parser_bench.add_argument('--sizes', nargs='+', type=parse_size, metavar='SIZE',
+                              help='image sizes, N, HxW or 4k (default: 256 to 4k)')
+    parser_bench.add_argument('--repeat', type=int, default=3,
+                              help='runs per entry, the best counts (default: 3)')
+    parser_bench.add_argument('-o', '--output', default='bench.json',
+                              help='JSON results (default: bench.json)')
+    parser_bench.add_argument('--baseline', help='JSON results of an earlier run to compare with')
+    parser_bench.add_argument('--tolerance', type=float, default=0.2,
+                              help='allowed relative slowdown against the baseline (default: 0.2)')
+    return parser
+
+
+def process(args, paths):
+    """Run the command of ``args`` over ``paths``; 1 if an image cannot be read."""
+    from .images import load_images
+    from .stream import StageTimer
+    command = COMMANDS[args.command]
+    if args.command == 'blur':
+        images = load_images(paths, args.mode, workers=args.workers)
+    else:
+        images = load_images(paths, dtype=np.float32, workers=args.workers)
+    os.makedirs(args.output, exist_ok=True)
+
+    timer = StageTimer()
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        out_path = os.path.join(args.output, f'{name}.{args.command}.{args.format}')
+        # Waiting for the decoding threads
+        with timer.stage('load'):
+            try:
+                image = next(images)
+            except IOError as error:
+                print(f'error: {error}', file=sys.stderr)
+                return 1
+        print(f'{path} -> {out_path}')
+        start = time.perf_counter()
+        with timer.stage(args.command):
+            result = command(image, args)
+        with timer.stage('write'):
+            write(out_path, result, args.format)
+        timer.frame_done()
+        print(f'    {image.shape[1]}x{image.shape[0]}, {1000 * (time.perf_counter() - start):.1f} ms')
+
+    report = timer.report()
+    summary = ', '.join(f'{name} {value:.1f} ms' for name, value in report.items() if name != 'fps')
+    print(f'{timer.frames} images, per image: {summary}; {report["fps"]:.1f} images/s')
+    return 0
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == 'bench':
+        return bench(args)
+    paths = collect_paths(args.sources)
+    if not paths:
+        parser.error('no images found')
+    # Outside of the timings and of the profile
+    import_engines(args)
+    if not args.profile:
+        return process(args, paths)
+
+    from .profiling import profile
+    with profile() as profiler:
+        status = process(args, paths)
+    print(profiler.summary())
+    profiler.save_chrome_trace(args.profile)
+    print(f'trace written to {args.profile}')
+    return status
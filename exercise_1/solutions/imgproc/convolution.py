@@ -0,0 +1,259 @@
+"""Convolution backend that picks the cheapest way to apply a kernel.
+
+Three paths give the same result as ``scipy.ndimage.convolve``:
+
+- ``'direct'``: ``scipy.ndimage.convolve`` with the full kernel,
+- ``'separable'``: one vectorized 1D pass per axis (``imgproc.separable``),
+  for kernels that are 1D or the outer product of 1D kernels,
+- ``'fft'``: real-input FFT (``rfftn``) of the image extended by the kernel
+  support with the requested border mode.
+
+``choose_method`` is the decision used by ``convolve`` for ``method='auto'``;
+call it to see which path a given image and kernel will take. SciPy is only
+imported by the ``'direct'`` and ``'fft'`` paths, so a pipeline that stays
+with the separable passes never loads it.
+"""
+
+import threading
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
+
+import numpy as np
+
+from .kernels import get_kernel
+from .policy import get_dtype, scratch
+from .profiling import profiled
+from .separable import BORDER_MODES, border_indices, convolve1d
+
+METHODS = ('direct', 'separable', 'fft')
+LOCAL_METHODS = ('direct', 'separable')
+
+# Per-thread restriction of the methods 'auto' may pick
+_policy = threading.local()
+
+# Rough cost per multiply-add (direct, separable) and per N*log2(N) of one
+# FFT, in nanoseconds, measured with float32 data on a single core.
+# Separable passes along the last (contiguous) axis are slower.
+COST_DIRECT = 2.0
+COST_SEPARABLE = 0.95
+COST_SEPARABLE_LAST_AXIS = 1.8
+COST_FFT = 0.6
+
+
+def separable_factors(kernel, rtol=1e-6):
+    """Split ``kernel`` into one 1D factor per axis, or return ``None``.
+
+    Kernels with at most one non-trivial axis always split; 2D kernels split
+    when they have rank one (checked with an SVD).
+    """
+    kernel = np.asarray(kernel)
+    long_axes = [a for a, n in enumerate(kernel.shape) if n > 1]
+    factors = [np.ones(1) for _ in kernel.shape]
+    if len(long_axes) <= 1:
+        if long_axes:
+            factors[long_axes[0]] = kernel.ravel()
+        else:
+            factors[0] = kernel.ravel()
+        return factors
+    if len(long_axes) > 2:
+        return None
+    a0, a1 = long_axes
+    matrix = kernel.reshape(kernel.shape[a0], kernel.shape[a1])
+    u, s, vt = np.linalg.svd(matrix.astype(np.float64))
+    if s[0] == 0 or s[1] > rtol * s[0]:
+        return None
+    factors[a0] = u[:, 0] * s[0]
+    factors[a1] = vt[0]
+    return factors
+
+
+@lru_cache(maxsize=1024)
+def _next_fast_len(n):
+    """Smallest ``2**a * 3**b * 5**c >= n``, like
+    ``scipy.fft.next_fast_len(n, real=True)``."""
+    best = 1 << (n - 1).bit_length()
+    p5 = 1
+    while p5 < best:
+        p35 = p5
+        while p35 < best:
+            # the smallest power of two times p35 that reaches n
+            best = min(best, p35 << (-(-n // p35) - 1).bit_length())
+            p35 *= 3
+        p5 *= 5
+    return best
+
+
+def _fft_shape(image_shape, kernel_shape):
+    return [_next_fast_len(int(n + k - 1)) for n, k in zip(image_shape, kernel_shape)]
+
+
+def estimate_costs(image_shape, kernel_shape, separable=True):
+    """Estimated cost of every method, in (roughly) nanoseconds."""
+    n_pixels = float(np.prod(image_shape))
+    costs = {'direct': COST_DIRECT * n_pixels * np.prod(kernel_shape)}
+    if separable:
+        last = len(kernel_shape) - 1
+        taps = sum((COST_SEPARABLE_LAST_AXIS if a == last else COST_SEPARABLE) * k
+                   for a, k in enumerate(kernel_shape) if k > 1)
+        costs['separable'] = n_pixels * (taps or COST_SEPARABLE)
+    # The FFT only runs along the axes where the kernel is not trivial
+    axes = [a for a, k in enumerate(kernel_shape) if k > 1]
+    if axes:
+        padded = _fft_shape([image_shape[a] for a in axes], [kernel_shape[a] for a in axes])
+        n_padded = n_pixels / np.prod([image_shape[a] for a in axes]) * np.prod(padded)
+        # forward transform of the image and the kernel, inverse of the product
+        costs['fft'] = 3 * COST_FFT * n_padded * np.log2(max(np.prod(padded), 2))
+    return costs
+
+
+def allowed_methods():
+    """Methods ``choose_method`` may pick in the current thread."""
+    return getattr(_policy, 'methods', METHODS)
+
+
+@contextmanager
+def restrict_methods(methods):
+    """Let ``method='auto'`` only choose among ``methods`` inside the block.
+
+    Tiled processing uses this to stay with the local methods (``'direct'``,
+    ``'separable'``), whose result for a pixel does not depend on the size of
+    the image it is computed in.
+    """
+    previous = allowed_methods()
+    _policy.methods = tuple(methods)
+    try:
+        yield
+    finally:
+        _policy.methods = previous
+
+
+def exact_methods(exact=True):
+    """``restrict_methods(LOCAL_METHODS)`` if ``exact``, else a no-op context.
+
+    The stages take ``exact=True`` to give bit for bit the result of tiled
+    processing (see ``imgproc.tiled``). The FFT path rounds differently
+    depending on the array size, by up to about 1e-6 relative in float32.
+    """
+    return restrict_methods(LOCAL_METHODS) if exact else nullcontext()
+
+
+def choose_method(image_shape, kernel_shape, separable=True):
+    """Name of the cheapest method for convolving an image with a kernel."""
+    costs = estimate_costs(image_shape, kernel_shape, separable)
+    costs = {m: c for m, c in costs.items() if m in allowed_methods()}
+    return min(costs, key=costs.get)
+
+
+def fft_convolve(image, kernel, mode='reflect'):
+    """Convolve ``image`` with ``kernel`` through the real FFT.
+
+    The image is extended by the kernel support with the border mode first, so
+    the circular convolution of the FFT never wraps into the result.
+    """
+    from scipy import fft
+    image = np.asarray(image)
+    dtype = get_dtype()
+    kernel = np.asarray(kernel, dtype=dtype)
+    axes = [a for a, k in enumerate(kernel.shape) if k > 1]
+    if not axes:
+        return image * dtype.type(kernel.ravel()[0])
+
+    extended = image.astype(dtype, copy=False)
+    for a in axes:
+        k = kernel.shape[a]
+        # ndimage centers a kernel of size k (odd or even) at index k // 2
+        before, after = k - 1 - k // 2, k // 2
+        idx = border_indices(np.arange(-before, image.shape[a] + after), image.shape[a], mode)
+        extended = extended.take(np.maximum(idx, 0), axis=a)
+        if mode == 'constant':
+            zero = [slice(None)] * image.ndim
+            zero[a] = idx < 0
+            extended[tuple(zero)] = 0
+
+    shape = _fft_shape([image.shape[a] for a in axes], [kernel.shape[a] for a in axes])
+    spectrum = fft.rfftn(extended, shape, axes=axes)
+    spectrum *= fft.rfftn(kernel, shape, axes=axes)
+    full = fft.irfftn(spectrum, shape, axes=axes)
+
+    crop = [slice(None)] * image.ndim
+    for a in axes:
+        k = kernel.shape[a]
+        crop[a] = slice(k - 1, k - 1 + image.shape[a])
+    return np.ascontiguousarray(full[tuple(crop)], dtype=dtype)
+
+
+def convolve(image, kernel, mode='reflect', method='auto', out=None, workspace=None):
+    """Convolve ``image`` with ``kernel``, like ``scipy.ndimage.convolve``.
+
+    A kernel with fewer axes than ``image`` is applied to the trailing axes,
+    so a 2D kernel filters every image of an ``(N, H, W)`` stack.
+    ``method`` is one of ``'direct'``, ``'separable'``, ``'fft'`` or ``'auto'``
+    (see ``choose_method``). The result has the type of the dtype policy and
+    is written into ``out`` if given; scratch buffers come from ``workspace``.
+    """
+    if mode not in BORDER_MODES:
+        raise ValueError(f'unknown border mode {mode!r}, expected one of {BORDER_MODES}')
+    image = np.asarray(image)
+    kernel = np.asarray(kernel)
+    if kernel.ndim < image.ndim:
+        # Stack of images: the kernel is applied to every image of the stack
+        kernel = kernel.reshape((1,) * (image.ndim - kernel.ndim) + kernel.shape)
+    assert kernel.ndim == image.ndim, 'kernel has more axes than the image'
+    factors = separable_factors(kernel)
+    if method == 'auto':
+        method = choose_method(image.shape, kernel.shape, separable=factors is not None)
+    if method not in METHODS:
+        raise ValueError(f'unknown method {method!r}, expected one of {METHODS}')
+    dtype = get_dtype() if out is None else out.dtype
+
+    if method == 'fft':
+        result = fft_convolve(image, kernel, mode)
+        if out is None:
+            return result
+        out[...] = result
+        return out
+    if method == 'separable':
+        if factors is None:
+            raise ValueError('kernel is not separable')
+        if out is None:
+            out = np.empty(image.shape, dtype)
+        passes = [(axis, f) for axis, f in enumerate(factors) if len(f) > 1 or f[0] != 1]
+        if not passes:
+            out[...] = image
+        src = image
+        for i, (axis, factor) in enumerate(passes):
+            last = i == len(passes) - 1
+            dst = out if last else scratch(workspace, 'convolve', image.shape, dtype)
+            convolve1d(src, factor, axis, mode, out=dst, workspace=workspace)
+            src = dst
+        return out
+    from scipy import ndimage
+    return ndimage.convolve(image.astype(dtype, copy=False), kernel.astype(dtype),
+                            output=out, mode=mode)
+
+
+def convolve_with_two(image, kernel1, kernel2, mode='reflect', method='auto',
+                      out=None, workspace=None):
+    """Apply two filters, one after the other."""
+    image = np.asarray(image)
+    tmp = scratch(workspace, 'convolve_with_two', image.shape)
+    image = convolve(image, kernel1, mode, method, out=tmp, workspace=workspace)
+    return convolve(image, kernel2, mode, method, out=out, workspace=workspace)
+
+
+@profiled()
+def gaussian_blur(image, sigma, radius=None, mode='reflect', method='auto', axes=(0, 1),
+                  out=None, workspace=None, exact=False):
+    """Blur ``image`` with a Gaussian along the two ``axes`` (rows, columns).
+
+    The other axes (e.g. color channels, or the first axis of a stack of
+    images with ``axes=(1, 2)``) are filtered independently. The radius
+    defaults to ``ceil(3 * sigma)``. ``exact`` see ``exact_methods``.
+    """
+    image = np.asarray(image)
+    shape = [1] * image.ndim
+    shape[axes[0]] = -1
+    kernel_col = get_kernel('gauss', sigma, radius).reshape(shape)
+    kernel_row = np.swapaxes(kernel_col, axes[0], axes[1])
+    with exact_methods(exact):
+        return convolve_with_two(image, kernel_col, kernel_row, mode, method, out, workspace)
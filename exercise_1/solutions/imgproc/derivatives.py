@@ -0,0 +1,93 @@
+"""Fused Gaussian derivative engine.
+
+Any subset of the scale-space derivatives ``L, Lx, Ly, Lxx, Lxy, Lyy`` and the
+Laplacian is computed from shared intermediate results: the image is filtered
+once along y with each needed kernel (Gaussian, first and second derivative of
+Gaussian), and every requested output is one more pass along x over one of
+these intermediates. The gradient ``(Lx, Ly)`` costs four 1D passes, the
+Laplacian four, and all derivatives together nine.
+
+y is the second to last axis and x the last one, so ``(N, H, W)`` stacks are
+processed in one call.
+"""
+
+import numpy as np
+
+from .convolution import convolve, exact_methods
+from .kernels import get_kernel
+from .policy import get_dtype, scratch
+from .profiling import profiled
+
+DERIVATIVES = ('L', 'Lx', 'Ly', 'Lxx', 'Lxy', 'Lyy', 'laplacian')
+
+# (y kernel, x kernel) of every output
+_KERNELS = {
+    'L': ('gauss', 'gauss'),
+    'Lx': ('gauss', 'gaussdx'),
+    'Ly': ('gaussdx', 'gauss'),
+    'Lxx': ('gauss', 'gaussdxx'),
+    'Lxy': ('gaussdx', 'gaussdx'),
+    'Lyy': ('gaussdxx', 'gauss'),
+}
+
+
+@profiled()
+def gaussian_derivatives(image, sigma, which=('Lx', 'Ly'), radius=None,
+                         mode='reflect', scale_space=None, out=None, workspace=None,
+                         exact=False):
+    """Gaussian derivatives of ``image`` at scale ``sigma``.
+
+    ``which`` is one name of ``DERIVATIVES`` (returns one array) or a sequence
+    of them (returns a tuple in the same order). The kernel radius defaults to
+    ``ceil(3 * sigma)``. With a ``GaussianScaleSpace`` of ``image``, the
+    derivatives are taken from a cached blur with a small residual sigma.
+
+    ``out`` (an array, or a tuple matching ``which``) receives the results;
+    the intermediate images come from ``workspace`` if given. ``exact`` only
+    allows the local convolution methods (see ``convolution.exact_methods``).
+    """
+    single = isinstance(which, str)
+    names = (which,) if single else tuple(which)
+    unknown = set(names) - set(DERIVATIVES)
+    if unknown:
+        raise ValueError(f'unknown derivatives {sorted(unknown)}, expected some of {DERIVATIVES}')
+    if scale_space is not None:
+        # the radius follows the (smaller) residual sigma
+        image, sigma = scale_space.split(sigma)
+        radius = None
+    image = np.asarray(image)
+    if out is None:
+        out = tuple(np.empty(image.shape, get_dtype()) for _ in names)
+    elif single:
+        out = (out,)
+    targets = dict(zip(names, out))
+
+    needed = set()
+    for name in names:
+        needed.update(('Lxx', 'Lyy') if name == 'laplacian' else (name,))
+
+    def kernel(kind, orientation):
+        return get_kernel(kind, sigma, radius, orientation=orientation)
+
+    with exact_methods(exact):
+        along_y = {}
+        results = {}
+        for name in DERIVATIVES[:-1]:
+            if name not in needed:
+                continue
+            kind_y, kind_x = _KERNELS[name]
+            if kind_y not in along_y:
+                along_y[kind_y] = convolve(
+                    image, kernel(kind_y, 'col'), mode,
+                    out=scratch(workspace, f'derivatives.{kind_y}', image.shape),
+                    workspace=workspace)
+            target = targets.get(name)
+            if target is None:
+                target = scratch(workspace, f'derivatives.{name}', image.shape)
+            results[name] = convolve(along_y[kind_y], kernel(kind_x, 'row'), mode,
+                                     out=target, workspace=workspace)
+    if 'laplacian' in names:
+        results['laplacian'] = np.add(results['Lxx'], results['Lyy'], out=targets['laplacian'])
+
+    result = tuple(results[name] for name in names)
+    return result[0] if single else result
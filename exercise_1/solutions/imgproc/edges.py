@@ -0,0 +1,98 @@
+"""Edge detectors (Question 4): gradient magnitude thresholding, with
+non-maximum suppression, Canny hysteresis and an adaptive threshold.
+
+``theta`` is an absolute magnitude for ``get_edges``, relative to the largest
+gradient magnitude for ``get_edges_with_nms`` and ``my_canny``, and a fraction
+of the edge candidates for ``get_edges_adaptive``.
+
+Every detector writes into ``out`` if given and takes its full-frame scratch
+buffers from ``workspace``, so a video loop allocates them once.
+"""
+
+import numpy as np
+
+from .gradients import image_gradients_polar
+from .hysteresis import hysteresis_threshold
+from .nms import non_maximum_suppression
+from .policy import scratch
+from .profiling import profiled
+from .thresholds import adaptive_threshold
+
+
+@profiled()
+def get_edges(image, sigma, theta, scale_space=None, out=None, workspace=None, exact=False):
+    """uint8 mask of the pixels with gradient magnitude of at least ``theta``
+    (``exact`` see ``imgproc.gradients``)."""
+    shape = np.shape(image)
+    edge, _ = image_gradients_polar(
+        image, sigma, scale_space, workspace=workspace, exact=exact,
+        out=(scratch(workspace, 'magnitude', shape), scratch(workspace, 'direction', shape)))
+    if out is None:
+        out = np.empty(shape, np.uint8)
+    edge = np.greater_equal(edge, theta, out=out)
+    return edge
+
+
+def _suppressed_gradients(image, sigma, nms_mode='fast', workspace=None, exact=False):
+    """Gradient magnitude and its non-maximum suppression, in ``workspace``."""
+    shape = np.shape(image)
+    magnitude, direction = image_gradients_polar(
+        image, sigma, workspace=workspace, exact=exact,
+        out=(scratch(workspace, 'magnitude', shape), scratch(workspace, 'direction', shape)))
+    suppressed = non_maximum_suppression(magnitude, direction, nms_mode,
+                                         out=scratch(workspace, 'suppressed', shape),
+                                         workspace=workspace)
+    return magnitude, suppressed
+
+
+@profiled()
+def get_edges_with_nms(image, sigma, theta, nms_mode='fast', out=None, workspace=None,
+                       exact=False):
+    """``get_edges`` after non-maximum suppression along the gradient, with
+    ``theta`` relative to the largest gradient magnitude."""
+    magnitude, edge = _suppressed_gradients(image, sigma, nms_mode, workspace, exact)
+    if out is None:
+        out = np.empty(np.shape(image), np.uint8)
+    edge = np.greater_equal(edge, theta * np.max(magnitude), out=out)
+    return edge
+
+
+@profiled()
+def my_canny(image, sigma, theta_low, theta_high, connectivity=8, out=None, workspace=None,
+             exact=False):
+    """Canny edges (0 or 255, float32) with hysteresis thresholds relative to
+    the largest gradient magnitude."""
+    magnitude, image_suppressed = _suppressed_gradients(image, sigma, 'fast', workspace, exact)
+
+    theta_high *= np.max(magnitude)
+    theta_low *= np.max(magnitude)
+
+    # Edge following from every pixel above `theta_high` through pixels above
+    # `theta_low` keeps exactly the connected components of the low mask that
+    # contain a high pixel, so label them instead of recursing
+    edges = hysteresis_threshold(image_suppressed, theta_low, theta_high, connectivity,
+                                 out=scratch(workspace, 'edges', np.shape(image), bool),
+                                 workspace=workspace)
+    image_out = np.empty(np.shape(image), np.float32) if out is None else out
+    np.multiply(edges, np.float32(255), out=image_out)
+
+    return image_out
+
+
+@profiled()
+def get_edges_adaptive(image, sigma, theta, bins=256, running_histogram=None, out=None,
+                       workspace=None, exact=False):
+    """uint8 mask of the strongest fraction ``theta`` of the pixels left by
+    non-maximum suppression."""
+    _, suppressed = _suppressed_gradients(image, sigma, 'fast', workspace, exact)
+    # For video, a `RunningHistogram` keeps the threshold stable over frames
+    if running_histogram is not None:
+        threshold = running_histogram.update(suppressed, workspace).threshold(theta)
+    else:
+        threshold = adaptive_threshold(suppressed, theta, bins, workspace)
+    if out is None:
+        out = np.empty(np.shape(image), np.uint8)
+    edge = np.greater_equal(suppressed, threshold, out=out)
+    # The first histogram bin is not counted as edges
+    edge &= np.not_equal(suppressed, 0, out=scratch(workspace, 'nonzero', edge.shape, bool))
+    return edge
@@ -0,0 +1,81 @@
+"""Gaussian filtering of 8-bit images (Question 1) and the Gaussian and box
+filters of the Fourier exercise (Question 2)."""
+
+import numpy as np
+
+from .convolution import convolve_with_two, gaussian_blur
+from .kernels import get_kernel
+from .profiling import profiled
+
+
+@profiled()
+def gaussian_filter(image, sigma, padding=None, scale_space=None, batch=False, exact=False):
+    """Blur ``image`` with two vectorized 1D Gaussian passes.
+
+    ``padding`` is a border mode name (``'constant'``, ``'reflect'``,
+    ``'mirror'``, ``'wrap'``, ``'nearest'``); ``True`` means zero padding,
+    as does ``None`` unless a scale space is given. With a
+    ``GaussianScaleSpace`` of ``image`` the blur continues from the closest
+    level already computed instead of starting from scratch; the border mode
+    and layout are then those of the scale space, and arguments contradicting
+    them raise a ``ValueError``.
+    ``image`` is (H, W) or (H, W, C); with ``batch=True`` it is an (N, H, W)
+    or (N, H, W, C) stack, blurred in one call. ``exact=True`` gives the
+    result of tiled processing bit for bit (no FFT path, see
+    ``imgproc.tiled``). The result is rounded to uint8.
+    """
+    if padding is True or (padding is None and scale_space is None):
+        padding = 'constant'
+    if scale_space is not None:
+        _check_scale_space(scale_space, image, padding, batch, exact)
+        res = scale_space.get(sigma)
+    else:
+        image = np.asarray(image)
+        ndim = image.ndim - batch
+        if ndim not in (2, 3):
+            layout = '(N, H, W[, C])' if batch else '(H, W[, C])'
+            raise ValueError(f'expected an image of shape {layout}, got shape {image.shape}')
+        kernel_size = int(np.ceil(3*sigma))
+        #convolve columns, then rows, all channels at once with the (cached) 1d
+        #gaussian, the 2d filter is its outer product with itself
+        axes = (1, 2) if batch else (0, 1)
+        res = gaussian_blur(image, sigma, kernel_size, mode=padding, axes=axes, exact=exact)
+    res = np.clip(np.rint(res), 0, 255).astype("uint8")
+    return res
+
+
+def _check_scale_space(scale_space, image, padding, batch, exact):
+    # the cached levels are blurs of scale_space.image with its own border
+    # mode and axes, anything else passed alongside would be ignored
+    if image is not scale_space.image:
+        raise ValueError('scale_space was built from a different image than image')
+    if padding is not None and padding != scale_space.mode:
+        raise ValueError(f'padding {padding!r} does not match the scale space mode '
+                         f'{scale_space.mode!r}')
+    axes = (1, 2) if batch else (0, 1)
+    if tuple(scale_space.axes) != axes:
+        raise ValueError(f'batch={batch} does not match the scale space axes {scale_space.axes}')
+    if exact:
+        raise ValueError('exact=True is not supported with a scale_space')
+
+
+@profiled()
+def filter_gauss(image, kernel_factor, sigma, mode='wrap'):
+    """Gaussian blur with kernel half size ``kernel_factor * sigma``.
+
+    The borders wrap around by default, like the periodic image seen by the
+    Fourier transform.
+    """
+    #1d gaussian kernels with half size kernel_factor * sigma (normalized, cached)
+    radius = int(kernel_factor * sigma)
+    flt_row = get_kernel('gauss', sigma, radius, orientation='row')
+    flt_col = get_kernel('gauss', sigma, radius, orientation='col')
+    return convolve_with_two(image, flt_row, flt_col, mode)
+
+
+@profiled()
+def filter_box(image, size, mode='wrap'):
+    """``image`` filtered twice with a ``size`` x ``size`` box (wrapping
+    borders by default)."""
+    flt_box = (1/np.square(size))*np.ones((size, size))
+    return convolve_with_two(image, flt_box, flt_box, mode)
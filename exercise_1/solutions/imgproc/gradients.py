@@ -0,0 +1,63 @@
+"""Gaussian image derivatives, gradient magnitude and direction, and the
+Laplacian of Gaussian (Question 3).
+
+All functions take one (H, W) image or an (N, H, W) stack. ``out`` arrays and
+a ``Workspace`` let a video loop reuse the buffers between frames. With
+``exact=True``, the convolutions avoid the FFT path, so the result equals a
+tiled run bit for bit (see ``imgproc.tiled``).
+"""
+
+import numpy as np
+
+from .derivatives import gaussian_derivatives
+from .policy import scratch
+from .profiling import profiled
+
+
+def gauss_derivs(image, sigma, scale_space=None, out=None, workspace=None, exact=False):
+    """First derivatives ``(dx, dy)`` of ``image`` smoothed with a Gaussian."""
+    kernel_size = int(3.0 * sigma)
+    #gaussian along one axis, derivative of gaussian along the other
+    image_dx, image_dy = gaussian_derivatives(
+        image, sigma, ('Lx', 'Ly'), kernel_size, scale_space=scale_space,
+        out=out, workspace=workspace, exact=exact)
+    return image_dx, image_dy
+
+
+def gauss_second_derivs(image, sigma, scale_space=None, out=None, workspace=None, exact=False):
+    """Second derivatives ``(dxx, dxy, dyy)`` of ``image`` smoothed with a
+    Gaussian."""
+    kernel_size = int(3.0 * sigma)
+    #second derivative of gaussian kernels, the passes along y are shared
+    image_dxx, image_dxy, image_dyy = gaussian_derivatives(
+        image, sigma, ('Lxx', 'Lxy', 'Lyy'), kernel_size, scale_space=scale_space,
+        out=out, workspace=workspace, exact=exact)
+    return image_dxx, image_dxy, image_dyy
+
+
+@profiled()
+def image_gradients_polar(image, sigma, scale_space=None, out=None, workspace=None,
+                          exact=False):
+    """Gradient magnitude and direction (between -pi and +pi)."""
+    kernel_size = int(3.0 * sigma)
+    shape = np.shape(image)
+    #get x,y component of the gradient
+    image_dx, image_dy = gaussian_derivatives(
+        image, sigma, ('Lx', 'Ly'), kernel_size, scale_space=scale_space,
+        out=(scratch(workspace, 'dx', shape), scratch(workspace, 'dy', shape)),
+        workspace=workspace, exact=exact)
+
+    if out is None:
+        out = (None, None)
+    magnitude = np.hypot(image_dx, image_dy, out=out[0])
+    direction = np.arctan2(image_dy, image_dx, out=out[1])
+
+    return magnitude, direction
+
+
+def laplace(image, sigma, scale_space=None, out=None, workspace=None, exact=False):
+    """Laplacian of Gaussian of ``image``."""
+    kernel_size = int(3.0 * sigma)
+    #only dxx and dyy are computed, dxy is not needed
+    return gaussian_derivatives(image, sigma, 'laplacian', kernel_size, scale_space=scale_space,
+                                out=out, workspace=workspace, exact=exact)
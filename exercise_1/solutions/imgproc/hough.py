@@ -0,0 +1,350 @@
+"""Vectorized Hough transform for lines.
+
+The accumulator follows the conventions of the exercise: ``theta`` takes
+``n_bins_theta`` values from ``-pi/2`` to ``pi/2``, ``rho`` is binned over
+``[-D, D]`` with ``D`` the image diagonal, and a pixel in row ``i`` and column
+``j`` votes for ``rho = j * sin(theta) + i * cos(theta)``.
+
+The sine and cosine tables are computed once per (image shape, number of
+theta bins). The edge pixels are gathered with ``np.nonzero``, the rho indices
+of a chunk of edge pixels for all thetas are one (edges x thetas) matrix, and
+the votes are counted with ``np.bincount`` over flattened accumulator
+indices. The arithmetic is the one of the per-pixel reference loop, so the
+votes are identical.
+
+With the gradient direction of the edge pixels (``hough_lines_directed``),
+every pixel only votes for the line orthogonal to its gradient, optionally
+spread over the neighbouring theta bins, instead of for all thetas.
+"""
+
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+from .profiling import count, profiled
+
+# Edge pixels per chunk; bounds the (edges x thetas) index matrix
+DEFAULT_CHUNK_SIZE = 4096
+
+HoughTables = namedtuple('HoughTables', ['diag', 'theta_bins', 'sin', 'cos'])
+
+
+@lru_cache(maxsize=32)
+def line_tables(shape, n_bins_theta):
+    """Image diagonal, theta bins and their sines and cosines (read-only)."""
+    diag = np.linalg.norm(shape)
+    theta_bins = np.linspace(-np.pi / 2, np.pi / 2, n_bins_theta)
+    tables = HoughTables(diag, theta_bins, np.sin(theta_bins), np.cos(theta_bins))
+    for table in tables[1:]:
+        table.setflags(write=False)
+    return tables
+
+
+def rho_bins_for(shape, n_bins_rho):
+    """Lower edges of the rho bins, as returned by the exercise."""
+    diag = np.linalg.norm(shape)
+    return np.linspace(-diag, diag, n_bins_rho)
+
+
+def rho_indices(rows, cols, n_bins_rho, tables, theta_index=None):
+    """Rho bin of every (pixel, theta) pair, shape ``(len(rows), n_bins_theta)``.
+
+    With ``theta_index`` (one row of theta bins per pixel), only these
+    thetas are used and the result has its shape.
+    """
+    sin, cos = tables.sin, tables.cos
+    if theta_index is not None:
+        sin, cos = sin[theta_index], cos[theta_index]
+    rho = cols[:, np.newaxis] * sin + rows[:, np.newaxis] * cos
+    return np.floor(n_bins_rho * (rho + tables.diag) / (2 * tables.diag)).astype(np.intp)
+
+
+def accumulate_lines(votes_acc, rows, cols, tables, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Add the votes of the pixels ``(rows, cols)`` to ``votes_acc`` in place."""
+    n_bins_rho, n_bins_theta = votes_acc.shape
+    theta_index = np.arange(n_bins_theta)
+    flat = votes_acc.reshape(-1)
+    for start in range(0, len(rows), chunk_size):
+        stop = start + chunk_size
+        rho_index = rho_indices(rows[start:stop], cols[start:stop], n_bins_rho, tables)
+        index = rho_index * n_bins_theta + theta_index
+        flat += np.bincount(index.ravel(), minlength=flat.size).astype(flat.dtype, copy=False)
+    return votes_acc
+
+
+def withdraw_lines(votes_acc, rows, cols, tables):
+    """Withdraw the votes of the pixels ``(rows, cols)`` from ``votes_acc`` in
+    place, the inverse of ``accumulate_lines``."""
+    n_bins_rho, n_bins_theta = votes_acc.shape
+    index = rho_indices(rows, cols, n_bins_rho, tables) * n_bins_theta + np.arange(n_bins_theta)
+    flat = votes_acc.reshape(-1)
+    flat -= np.bincount(index.ravel(), minlength=flat.size).astype(flat.dtype, copy=False)
+    return votes_acc
+
+
+@profiled()
+def hough_lines(edge_image, n_bins_rho, n_bins_theta, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Line accumulator of the non-zero pixels of ``edge_image``.
+
+    Returns ``(votes_acc, rho_bins, theta_bins)``.
+    """
+    edge_image = np.asarray(edge_image)
+    shape = tuple(edge_image.shape)
+    tables = line_tables(shape, n_bins_theta)
+    votes_acc = np.zeros((n_bins_rho, n_bins_theta), dtype=np.int64)
+    rows, cols = np.nonzero(edge_image)
+    accumulate_lines(votes_acc, rows, cols, tables, chunk_size)
+    count('edge_pixels', len(rows))
+    count('votes', len(rows) * n_bins_theta)
+    return votes_acc, rho_bins_for(shape, n_bins_rho), tables.theta_bins.copy()
+
+
+def theta_indices(grad_dir, n_bins_theta):
+    """Theta bin of the line through a pixel orthogonal to its gradient.
+
+    ``grad_dir`` is the angle of ``np.arctan2(dy, dx)``. The line normal
+    ``(cos(theta), sin(theta))`` is along (rows, columns), so
+    ``theta = pi/2 - grad_dir``, folded into ``[-pi/2, pi/2)``.
+    """
+    theta = np.mod(np.pi / 2 - grad_dir + np.pi / 2, np.pi) - np.pi / 2
+    index = np.rint((theta + np.pi / 2) / np.pi * (n_bins_theta - 1)).astype(np.intp)
+    return np.minimum(index, n_bins_theta - 1)
+
+
+@profiled()
+def hough_lines_directed(edge_image, grad_dir, n_bins_rho, n_bins_theta, spread=0, weights=None):
+    """Line accumulator with one vote per edge pixel along its gradient.
+
+    Every non-zero pixel of ``edge_image`` votes for the theta bin of its own
+    orientation (see ``theta_indices``) and, with ``spread=k``, for the ``k``
+    bins on either side. Bins past the ends of the theta range continue at
+    the other end: ``theta`` and ``theta +- pi`` are the same line with
+    ``rho`` negated, and the first and last bin (``-pi/2`` and ``pi/2``) are
+    the same angle, so the bins repeat every ``n_bins_theta - 1``. The rho of
+    a wrapped vote comes from its own bin, which does the negation.
+    ``weights`` (length ``2 * k + 1``) weighs these votes, giving a float
+    accumulator; without weights every vote counts one.
+
+    Returns ``(votes_acc, rho_bins, theta_bins)`` like ``hough_lines``.
+    """
+    edge_image = np.asarray(edge_image)
+    shape = tuple(edge_image.shape)
+    tables = line_tables(shape, n_bins_theta)
+    rows, cols = np.nonzero(edge_image)
+    center = theta_indices(np.asarray(grad_dir)[rows, cols], n_bins_theta)
+    period = max(n_bins_theta - 1, 1)
+    theta_index = (center[:, np.newaxis] + np.arange(-spread, spread + 1)) % period
+    # Keep a centre vote in the last bin where it was
+    theta_index[:, spread] = center
+    rho_index = rho_indices(rows, cols, n_bins_rho, tables, theta_index)
+
+    index = (rho_index * n_bins_theta + theta_index).ravel()
+    size = n_bins_rho * n_bins_theta
+    if weights is None:
+        votes_acc = np.bincount(index, minlength=size).astype(np.int64, copy=False)
+    else:
+        weights = np.asarray(weights, dtype=np.float64)
+        if weights.shape != (2 * spread + 1,):
+            raise ValueError(f'expected {2 * spread + 1} weights for spread {spread}, got {weights.shape}')
+        votes_acc = np.bincount(index, np.broadcast_to(weights, theta_index.shape).ravel(), minlength=size)
+    votes_acc = votes_acc.reshape(n_bins_rho, n_bins_theta)
+    count('edge_pixels', len(rows))
+    count('votes', index.size)
+    return votes_acc, rho_bins_for(shape, n_bins_rho), tables.theta_bins.copy()
+
+
+def hough_transform(edge_image, n_bins_rho, n_bins_theta, grad_dir=None, spread=0, weights=None):
+    """Line accumulator of an edge image (Question 5): ``hough_lines``, or
+    ``hough_lines_directed`` if the gradient direction ``grad_dir`` is given.
+
+    Returns ``(votes_acc, rho_bins, theta_bins)``.
+    """
+    if grad_dir is None:
+        return hough_lines(edge_image, n_bins_rho, n_bins_theta)
+    return hough_lines_directed(edge_image, grad_dir, n_bins_rho, n_bins_theta, spread, weights)
+
+
+def _corridor(step, width):
+    """Offsets across the line, along the minor axis of ``step``."""
+    across = np.array([1, 0]) if abs(step[1]) >= abs(step[0]) else np.array([0, 1])
+    return across * np.arange(-width, width + 1)[:, np.newaxis]
+
+
+def _walk(pool, start, step, line_gap, corridor):
+    """Last point with a pool pixel in its corridor from ``start`` along
+    ``step``, stopping after more than ``line_gap`` empty points."""
+    height, width = pool.shape
+    last = start
+    point = np.asarray(start, dtype=np.float64)
+    gap = 0
+    while True:
+        point = point + step
+        center = np.rint(point).astype(np.intp)
+        if not (0 <= center[0] < height and 0 <= center[1] < width):
+            return last
+        pixels = center + corridor
+        pixels = pixels[(pixels[:, 0] >= 0) & (pixels[:, 0] < height)
+                        & (pixels[:, 1] >= 0) & (pixels[:, 1] < width)]
+        if pool[pixels[:, 0], pixels[:, 1]].any():
+            last, gap = tuple(center), 0
+        else:
+            gap += 1
+            if gap > line_gap:
+                return last
+
+
+def _segment_pixels(start, end, step, corridor, shape):
+    """Pixels ``(rows, cols)`` within the corridor from ``start`` to ``end``."""
+    steps = int(round(max(abs(end[0] - start[0]), abs(end[1] - start[1]))))
+    k = np.arange(steps + 1)[:, np.newaxis]
+    points = np.rint(np.asarray(start) + k * step).astype(np.intp)
+    points = (points[:, np.newaxis, :] + corridor).reshape(-1, 2)
+    inside = ((points[:, 0] >= 0) & (points[:, 0] < shape[0])
+              & (points[:, 1] >= 0) & (points[:, 1] < shape[1]))
+    return points[inside, 0], points[inside, 1]
+
+
+@profiled()
+def progressive_hough_lines(edge_image, n_bins_rho, n_bins_theta, threshold,
+                            min_length=20, line_gap=3, line_width=1, max_lines=None, seed=None):
+    """Line segments found by the progressive probabilistic Hough transform.
+
+    Edge pixels vote one at a time, in random order. As soon as a bin reaches
+    ``threshold`` votes, the segment through the voting pixel along the
+    bin's line is followed in both directions across gaps of at most
+    ``line_gap`` pixels, accepting pool pixels up to ``line_width`` pixels
+    beside it. These pixels leave the pool and their votes are withdrawn.
+    The segment is kept if it is at least ``min_length`` long. Stops when
+    the pool is empty or ``max_lines`` segments are found, so the work
+    follows the number of lines rather than the number of edge pixels.
+
+    Returns an int array of shape ``(n, 4)`` with the segments as
+    ``(x0, y0, x1, y1)``, like ``cv2.HoughLinesP``.
+    """
+    edge_image = np.asarray(edge_image)
+    shape = tuple(edge_image.shape)
+    tables = line_tables(shape, n_bins_theta)
+    theta_index = np.arange(n_bins_theta)
+    votes_acc = np.zeros((n_bins_rho, n_bins_theta), dtype=np.int64)
+    pool = edge_image != 0
+    voted = np.zeros(shape, bool)
+    rows, cols = np.nonzero(pool)
+    order = np.random.default_rng(seed).permutation(len(rows))
+
+    segments = []
+    for row, col in zip(rows[order], cols[order]):
+        if not pool[row, col]:
+            continue
+        rho_index = rho_indices(np.array([row]), np.array([col]), n_bins_rho, tables)[0]
+        votes_acc[rho_index, theta_index] += 1
+        voted[row, col] = True
+        best = int(np.argmax(votes_acc[rho_index, theta_index]))
+        if votes_acc[rho_index[best], best] < threshold:
+            continue
+
+        # Direction of the line rho = col * sin + row * cos in (row, col),
+        # scaled to one pixel along the dominant axis
+        step = np.array([-tables.sin[best], tables.cos[best]])
+        step /= np.abs(step).max()
+        corridor = _corridor(step, line_width)
+        start = _walk(pool, (row, col), -step, line_gap, corridor)
+        end = _walk(pool, (row, col), step, line_gap, corridor)
+
+        seg_rows, seg_cols = _segment_pixels(start, end, step, corridor, shape)
+        inside = pool[seg_rows, seg_cols]
+        seg_rows, seg_cols = seg_rows[inside], seg_cols[inside]
+        pool[seg_rows, seg_cols] = False
+        # Withdraw the votes of the removed pixels
+        withdraw = voted[seg_rows, seg_cols]
+        if withdraw.any():
+            w_rows, w_cols = seg_rows[withdraw], seg_cols[withdraw]
+            withdraw_lines(votes_acc, w_rows, w_cols, tables)
+            voted[w_rows, w_cols] = False
+
+        if np.hypot(end[0] - start[0], end[1] - start[1]) >= min_length:
+            segments.append((start[1], start[0], end[1], end[0]))
+            if max_lines is not None and len(segments) >= max_lines:
+                break
+    count('edge_pixels', len(rows))
+    count('segments', len(segments))
+    return np.array(segments, dtype=np.intp).reshape(-1, 4)
+
+
+class IncrementalHough:
+    """Line accumulator kept up to date over the frames of a video.
+
+    For a fixed camera, the edge map changes little between frames. ``update``
+    compares the new edge map with the previous one, withdraws the votes of
+    the vanished edge pixels and adds those of the new ones, so the voting
+    cost is proportional to the number of changed pixels. The peaks are those
+    of ``peaks.find_peaks`` with at least ``threshold`` votes. They are
+    re-checked with ``peaks.update_maxima`` only for the bins whose votes
+    changed, their neighbours and the plateaus around them (or for all bins
+    at once, when most of them changed).
+    """
+
+    def __init__(self, shape, n_bins_rho, n_bins_theta, threshold=1):
+        self.shape = tuple(shape)
+        self.tables = line_tables(self.shape, n_bins_theta)
+        self.rho_bins = rho_bins_for(self.shape, n_bins_rho)
+        self.theta_bins = self.tables.theta_bins.copy()
+        self.threshold = threshold
+        self.votes_acc = np.zeros((n_bins_rho, n_bins_theta), dtype=np.int64)
+        self.edges = np.zeros(self.shape, bool)
+        self._all_peaks()
+
+    def _vote(self, rows, cols, sign):
+        """Add (``sign=1``) or withdraw (``-1``) votes; returns the touched bins."""
+        if len(rows) == 0:
+            return np.zeros(0, np.intp)
+        n_bins_rho, n_bins_theta = self.votes_acc.shape
+        rho_index = rho_indices(rows, cols, n_bins_rho, self.tables)
+        index = (rho_index * n_bins_theta + np.arange(n_bins_theta)).ravel()
+        bins, counts = np.unique(index, return_counts=True)
+        self.votes_acc.reshape(-1)[bins] += sign * counts
+        return bins
+
+    def _all_peaks(self):
+        from .peaks import local_maxima, maxima_candidates
+        # find_peaks excludes its threshold
+        self._candidates = maxima_candidates(self.votes_acc, self.threshold - 1)
+        self._maxima = np.flatnonzero(local_maxima(self.votes_acc, self.threshold - 1))
+
+    def _recheck(self, bins):
+        """Update the peaks after the votes of ``bins`` (flat indices) changed."""
+        if 9 * len(bins) > self.votes_acc.size // 4:
+            # Most bins changed: one pass over the whole accumulator is cheaper
+            self._all_peaks()
+            return
+        from .peaks import update_maxima
+        self._maxima = update_maxima(self.votes_acc, self._candidates, self._maxima, bins,
+                                     self.threshold - 1)
+
+    @profiled('IncrementalHough.update')
+    def update(self, edge_image):
+        """Bring the accumulator to the (non-zero pixels of the) new edge map.
+
+        Returns the number of changed edge pixels.
+        """
+        edges = np.asarray(edge_image) != 0
+        changed = edges != self.edges
+        rows, cols = np.nonzero(changed & edges)
+        added = self._vote(rows, cols, 1)
+        gone_rows, gone_cols = np.nonzero(changed & self.edges)
+        removed = self._vote(gone_rows, gone_cols, -1)
+        self.edges = edges
+        bins = np.union1d(added, removed)
+        if len(bins):
+            self._recheck(bins)
+        count('changed_pixels', len(rows) + len(gone_rows))
+        count('votes', (len(rows) + len(gone_rows)) * self.votes_acc.shape[1])
+        return len(rows) + len(gone_rows)
+
+    def peaks(self):
+        """``(rho_index, theta_index)`` of the current peaks, most votes first."""
+        rho, theta = np.unravel_index(self._maxima, self.votes_acc.shape)
+        from .peaks import descending
+        # ties in row-major order, like find_peaks
+        order = descending(self.votes_acc[rho, theta])
+        return rho[order], theta[order]
@@ -0,0 +1,205 @@
+"""Image loading with an in-process cache and an optional on-disk cache of
+decoded arrays.
+
+Decoded images are kept in a bounded LRU cache keyed by (path, modification
+time, mode), so reading the same file twice decodes it once, and a changed
+file is decoded again, replacing the entry (and the disk file) of the older
+version. With a disk cache directory (``ImageCache(disk_dir=...)`` or the
+``IMGPROC_DISK_CACHE`` environment variable for the shared cache), decoded
+arrays are also stored there as ``.npy`` files and later runs memory-map them
+instead of decoding the JPEG/PNG again.
+
+For directory-scale batch runs, ``load_images`` decodes ahead on a thread pool
+(OpenCV releases the GIL while decoding) with a bounded number of images in
+flight, and yields the arrays in input order.
+
+The returned arrays are read-only, since one instance is handed to every
+caller; copy them (``astype`` does) before modifying them.
+
+Modes: ``'gray'`` (uint8, H x W), ``'rgb'`` and ``'bgr'`` (uint8, H x W x 3).
+"""
+
+import glob
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .profiling import enabled, sample
+
+MODES = ('gray', 'rgb', 'bgr')
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'disk_hits', 'misses', 'maxsize', 'currsize'])
+
+
+def decode(path, mode='gray'):
+    """Decode an image file with OpenCV, without any caching."""
+    import cv2
+    if mode not in MODES:
+        raise ValueError(f'unknown image mode {mode!r}, expected one of {MODES}')
+    flags = cv2.IMREAD_GRAYSCALE if mode == 'gray' else cv2.IMREAD_COLOR
+    image = cv2.imread(os.fspath(path), flags)
+    if image is None:
+        raise IOError(f'cannot read image {os.fspath(path)!r}')
+    if mode == 'rgb':
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    return image
+
+
+class ImageCache:
+    """LRU cache of decoded, read-only images, optionally backed by ``.npy``
+    files in ``disk_dir``."""
+
+    def __init__(self, maxsize=32, disk_dir=None):
+        self.maxsize = maxsize
+        self.disk_dir = disk_dir
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _sidecar(self, key, mtime=None):
+        """Path of the ``.npy`` file of ``key``; ``mtime='*'`` gives the glob
+        pattern of all versions of the image."""
+        path, key_mtime, mode = key
+        digest = hashlib.sha1(path.encode()).hexdigest()[:16]
+        mtime = key_mtime if mtime is None else mtime
+        return os.path.join(self.disk_dir, f'{digest}-{mtime}-{mode}.npy')
+
+    def _remove_stale(self, key):
+        """Delete the ``.npy`` files of older versions of the image of ``key``."""
+        current = self._sidecar(key)
+        for sidecar in glob.glob(self._sidecar(key, '*')):
+            if sidecar != current:
+                try:
+                    os.remove(sidecar)
+                except OSError:
+                    # Removed concurrently, or still mapped on Windows
+                    pass
+
+    def _load(self, key):
+        """Image for ``key`` and whether it came from the disk cache."""
+        path, _, mode = key
+        if self.disk_dir is None:
+            return decode(path, mode), False
+        sidecar = self._sidecar(key)
+        if os.path.exists(sidecar):
+            return np.load(sidecar, mmap_mode='r'), True
+        image = decode(path, mode)
+        os.makedirs(self.disk_dir, exist_ok=True)
+        # Write to a temporary file first, so a concurrent reader never
+        # sees a partial file
+        fd, tmp = tempfile.mkstemp(suffix='.npy', dir=self.disk_dir)
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, image)
+        os.replace(tmp, sidecar)
+        self._remove_stale(key)
+        return np.load(sidecar, mmap_mode='r'), False
+
+    def get(self, path, mode='gray'):
+        """Decoded image at ``path`` (read-only, shared between callers)."""
+        if mode not in MODES:
+            raise ValueError(f'unknown image mode {mode!r}, expected one of {MODES}')
+        path = os.path.abspath(os.fspath(path))
+        key = (path, os.stat(path).st_mtime_ns, mode)
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+                self.hits += 1
+                return image
+
+        image, from_disk = self._load(key)
+        image.setflags(write=False)
+        with self._lock:
+            if from_disk:
+                self.disk_hits += 1
+            else:
+                self.misses += 1
+            # Replaces the entry of any other version of the file
+            path, _, mode = key
+            for stale in [k for k in self._images if k[0] == path and k[2] == mode]:
+                del self._images[stale]
+            self._images[key] = image
+            while len(self._images) > self.maxsize:
+                self._images.popitem(last=False)
+        return image
+
+    def cache_info(self):
+        """Hit and miss counters, like ``functools.lru_cache``."""
+        with self._lock:
+            return CacheInfo(self.hits, self.disk_hits, self.misses, self.maxsize,
+                             len(self._images))
+
+    def cache_clear(self):
+        """Drop all images from memory (the disk cache stays) and reset the
+        counters."""
+        with self._lock:
+            self._images.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+
+# The cache shared by all solutions
+cache = ImageCache(disk_dir=os.environ.get('IMGPROC_DISK_CACHE') or None)
+
+
+def imread(path, mode='gray'):
+    """Image from the shared cache, see ``ImageCache.get``."""
+    return cache.get(path, mode)
+
+
+def cache_info():
+    """Hit and miss counters of the shared cache."""
+    return cache.cache_info()
+
+
+def list_images(directory):
+    """Paths of the image files in ``directory``, sorted by name."""
+    names = sorted(n for n in os.listdir(directory) if n.lower().endswith(IMAGE_EXTENSIONS))
+    return [os.path.join(directory, name) for name in names]
+
+
+def load_images(source, mode='gray', dtype=None, workers=4, depth=16, cache=None):
+    """Decoded images of a directory (see ``list_images``) or a list of paths,
+    in order, decoded ahead on ``workers`` threads.
+
+    At most ``depth`` images are decoded or waiting at any time; the loader
+    only submits more when the consumer takes one (backpressure). ``dtype``
+    converts the images in the worker threads, e.g. to ``np.float32``. With
+    an ``ImageCache`` (e.g. the shared ``cache``), the images go through it,
+    otherwise they are decoded directly.
+    """
+    paths = list_images(source) if isinstance(source, (str, os.PathLike)) else list(source)
+    depth = max(depth, 1)
+
+    def load(path):
+        image = decode(path, mode) if cache is None else cache.get(path, mode)
+        return image if dtype is None else image.astype(dtype)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        remaining = iter(paths)
+        try:
+            for path in remaining:
+                pending.append(pool.submit(load, path))
+                if len(pending) >= depth:
+                    break
+            while pending:
+                if enabled():
+                    # Decoded images waiting for the consumer
+                    sample('load_queue', sum(future.done() for future in pending))
+                image = pending.popleft().result()
+                for path in remaining:
+                    pending.append(pool.submit(load, path))
+                    break
+                yield image
+        finally:
+            # The consumer may stop early; drop what was not started yet
+            for future in pending:
+                future.cancel()
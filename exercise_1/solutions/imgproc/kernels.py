@@ -0,0 +1,129 @@
+"""Shared bank of 1D Gaussian and derivative-of-Gaussian kernels.
+
+Kernels are built once per (kind, sigma, radius, dtype, orientation) and kept
+in a bounded LRU cache. The returned arrays are read-only, so one instance can
+safely be handed to every caller.
+
+Kinds:
+
+- ``'gauss'``: Gaussian, normalized to sum to one,
+- ``'gaussdx'``: first derivative of the Gaussian, normalized so that
+  convolving a unit ramp gives exactly one,
+- ``'gaussdxx'``: second derivative of the Gaussian, normalized so that
+  constants give zero and ``x**2`` gives exactly two.
+
+The kernels are stored in convolution order: pass them straight to
+``convolve`` / ``ndimage.convolve`` without flipping them first.
+
+Orientations: ``'1d'`` gives shape ``(n,)``, ``'row'`` gives ``(1, n)`` (filters
+along x) and ``'col'`` gives ``(n, 1)`` (filters along y).
+"""
+
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from .policy import get_dtype
+
+KINDS = ('gauss', 'gaussdx', 'gaussdxx')
+ORIENTATIONS = ('1d', 'row', 'col')
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+def default_radius(sigma):
+    """Kernel radius from the rule of thumb ``ceil(3 * sigma)``."""
+    # the tolerance keeps rounding noise (e.g. from sqrt) from adding a tap
+    return int(np.ceil(3 * sigma - 1e-9))
+
+
+def make_kernel(kind, sigma, radius=None):
+    """Evaluate a (float64, 1D) kernel without going through the cache."""
+    if radius is None:
+        radius = default_radius(sigma)
+    x = np.arange(-radius, radius + 1, dtype=np.float64)
+    g = np.exp(-x**2 / (2.0 * sigma**2))
+    if kind == 'gauss':
+        return g / np.sum(g)
+    if kind == 'gaussdx':
+        d = -x * g
+        # convolving the ramp f(x) = x gives -sum(x * d)
+        return d / -np.sum(x * d)
+    if kind == 'gaussdxx':
+        dd = (x**2 / sigma**4 - 1 / sigma**2) * g
+        dd -= np.mean(dd)
+        # convolving f(x) = x**2 gives sum(x**2 * dd) for a zero-sum kernel
+        return dd * 2 / np.sum(x**2 * dd)
+    raise ValueError(f'unknown kernel kind {kind!r}, expected one of {KINDS}')
+
+
+class KernelBank:
+    """LRU cache of read-only 1D kernels."""
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._kernels = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, kind, sigma, radius=None, dtype=None, orientation='1d'):
+        """Kernel of the given kind, shared between callers (read-only).
+
+        ``dtype`` defaults to the dtype policy (float32).
+        """
+        if dtype is None:
+            dtype = get_dtype()
+        if orientation not in ORIENTATIONS:
+            raise ValueError(f'unknown orientation {orientation!r}, expected one of {ORIENTATIONS}')
+        if radius is None:
+            radius = default_radius(sigma)
+        key = (kind, float(sigma), int(radius), np.dtype(dtype).str, orientation)
+        with self._lock:
+            kernel = self._kernels.get(key)
+            if kernel is not None:
+                self._kernels.move_to_end(key)
+                self.hits += 1
+                return kernel
+            self.misses += 1
+
+        kernel = make_kernel(kind, sigma, radius).astype(dtype)
+        if orientation == 'row':
+            kernel = kernel[np.newaxis, :]
+        elif orientation == 'col':
+            kernel = kernel[:, np.newaxis]
+        kernel.setflags(write=False)
+
+        with self._lock:
+            self._kernels[key] = kernel
+            self._kernels.move_to_end(key)
+            while len(self._kernels) > self.maxsize:
+                self._kernels.popitem(last=False)
+        return kernel
+
+    def cache_info(self):
+        """Hit and miss counters, like ``functools.lru_cache``."""
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self._kernels))
+
+    def cache_clear(self):
+        """Drop all kernels and reset the counters."""
+        with self._lock:
+            self._kernels.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# The bank shared by all solutions
+bank = KernelBank()
+
+
+def get_kernel(kind, sigma, radius=None, dtype=None, orientation='1d'):
+    """Kernel from the shared bank, see ``KernelBank.get``."""
+    return bank.get(kind, sigma, radius, dtype, orientation)
+
+
+def cache_info():
+    """Hit and miss counters of the shared bank."""
+    return bank.cache_info()
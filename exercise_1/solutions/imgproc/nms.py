@@ -0,0 +1,139 @@
+"""Non-maximum suppression of gradient magnitudes for Canny edge detection.
+
+A pixel survives if its magnitude is strictly larger than the magnitudes one
+step forward and one step backward along the gradient direction. Two ways of
+looking up these neighbours:
+
+- ``'fast'``: the direction is quantized to the 8 neighbours (sector code
+  ``round((d + pi) / (2 * pi) * 8)``, codes 0 and 8 both meaning "left") and
+  every sector is handled with whole-array shifted views. This gives exactly
+  the result of the original per-pixel loop, including the zero border.
+- ``'interpolate'``: the neighbour magnitudes are bilinearly interpolated at
+  ``(x +- cos d, y +- sin d)``. Samples outside the image take the value of
+  the nearest border pixel, so border pixels are kept when they are maxima
+  along their gradient.
+
+The direction is the one of ``np.arctan2(dy, dx)``, in radians. y is the second
+to last axis and x the last one, so ``(N, H, W)`` stacks work as well.
+
+``nms_loop`` is the per-pixel loop itself, kept as the reference of the tests
+and benchmarks.
+"""
+
+import numpy as np
+
+from .policy import scratch
+from .profiling import count, enabled, profiled
+
+NMS_MODES = ('fast', 'interpolate')
+
+# Neighbour offset (x, y) of the sector codes 0..3; code k + 4 is the
+# opposite neighbour, which is compared against anyway
+_SECTOR_OFFSETS = ((-1, 0), (-1, -1), (0, -1), (1, -1))
+
+
+def sector_codes(grad_dir):
+    """Direction quantized to the four neighbour axes (0 to 3)."""
+    code = np.rint((grad_dir + np.pi) / (2 * np.pi) * 8).astype(np.intp)
+    return code % 4
+
+
+def _shifted(array, ox, oy):
+    """View of ``array`` at ``(x + ox, y + oy)`` for all interior pixels."""
+    height, width = array.shape[-2:]
+    return array[..., 1 + oy:height - 1 + oy, 1 + ox:width - 1 + ox]
+
+
+def _nms_fast(grad_mag, grad_dir, out, workspace):
+    out[...] = 0
+    if min(grad_mag.shape[-2:]) < 3:
+        return out
+    center = _shifted(grad_mag, 0, 0)
+    shape = center.shape
+    # sector_codes in place; the rounded values are 0 to 8, so & 3 is % 4
+    sector = scratch(workspace, 'nms.sector', shape, grad_dir.dtype)
+    np.add(_shifted(grad_dir, 0, 0), np.pi, out=sector)
+    sector /= 2 * np.pi
+    sector *= 8
+    np.rint(sector, out=sector)
+    codes = scratch(workspace, 'nms.codes', shape, np.uint8)
+    np.copyto(codes, sector, casting='unsafe')
+    codes &= 3
+    keep = scratch(workspace, 'nms.keep', shape, bool)
+    keep[...] = False
+    is_max = scratch(workspace, 'nms.is_max', shape, bool)
+    test = scratch(workspace, 'nms.test', shape, bool)
+    for code, (ox, oy) in enumerate(_SECTOR_OFFSETS):
+        np.greater(center, _shifted(grad_mag, ox, oy), out=is_max)
+        is_max &= np.greater(center, _shifted(grad_mag, -ox, -oy), out=test)
+        is_max &= np.equal(codes, code, out=test)
+        keep |= is_max
+    np.copyto(_shifted(out, 0, 0), center, where=keep)
+    return out
+
+
+def _bilinear(padded, x, y):
+    """Bilinear samples of an image padded by one pixel, at image coordinates."""
+    height, width = padded.shape[-2:]
+    x = np.clip(x + 1, 0, width - 1)
+    y = np.clip(y + 1, 0, height - 1)
+    x0 = np.minimum(np.floor(x).astype(np.intp), width - 2)
+    y0 = np.minimum(np.floor(y).astype(np.intp), height - 2)
+    fx, fy = x - x0, y - y0
+    top = padded[..., y0, x0] * (1 - fx) + padded[..., y0, x0 + 1] * fx
+    bottom = padded[..., y0 + 1, x0] * (1 - fx) + padded[..., y0 + 1, x0 + 1] * fx
+    return top * (1 - fy) + bottom * fy
+
+
+def _nms_interpolate(grad_mag, grad_dir, out):
+    height, width = grad_mag.shape[-2:]
+    y, x = np.indices((height, width), dtype=grad_mag.dtype)
+    grad_dir = np.broadcast_to(grad_dir, grad_mag.shape)
+    for index in np.ndindex(grad_mag.shape[:-2]):
+        mag = grad_mag[index]
+        padded = np.pad(mag, 1, mode='edge')
+        dx, dy = np.cos(grad_dir[index]), np.sin(grad_dir[index])
+        forward = _bilinear(padded, x + dx, y + dy)
+        backward = _bilinear(padded, x - dx, y - dy)
+        keep = (mag > forward) & (mag > backward)
+        out[index] = 0
+        np.copyto(out[index], mag, where=keep)
+    return out
+
+
+def nms_loop(grad_mag, grad_dir):
+    """The per-pixel ``nms_for_canny`` loop of the exercise, for one image."""
+    result = np.zeros_like(grad_mag)
+    offsets_x = [-1, -1, 0, 1, 1, 1, 0, -1, -1]
+    offsets_y = [0, -1, -1, -1, 0, 1, 1, 1, 0]
+    height, width = grad_mag.shape
+    for y in range(1, height - 1):
+        for x in range(1, width - 1):
+            d = grad_dir[y, x]
+            idx = int(round((d + np.pi) / (2 * np.pi) * 8))
+            ox, oy = offsets_x[idx], offsets_y[idx]
+            if ((grad_mag[y, x] > grad_mag[y + oy, x + ox]) and
+                    (grad_mag[y, x] > grad_mag[y - oy, x - ox])):
+                result[y, x] = grad_mag[y, x]
+    return result
+
+
+@profiled()
+def non_maximum_suppression(grad_mag, grad_dir, mode='fast', out=None, workspace=None):
+    """Gradient magnitudes that are maxima along the gradient direction, zero
+    elsewhere. See the module docstring for the ``mode``s. The scratch
+    buffers of the ``'fast'`` mode come from ``workspace``."""
+    grad_mag = np.asarray(grad_mag)
+    grad_dir = np.asarray(grad_dir)
+    if out is None:
+        out = np.empty_like(grad_mag)
+    if mode == 'fast':
+        out = _nms_fast(grad_mag, grad_dir, out, workspace)
+    elif mode == 'interpolate':
+        out = _nms_interpolate(grad_mag, grad_dir, out)
+    else:
+        raise ValueError(f'unknown NMS mode {mode!r}, expected one of {NMS_MODES}')
+    if enabled():
+        count('pixels', out.size)
+        count('maxima', int(np.count_nonzero(out)))
+    return out
@@ -0,0 +1,171 @@
+"""Multi-core tile scheduler for the filtering and edge pipelines.
+
+The image (or several images of the same height and width, e.g. the gradient
+magnitude and direction for ``nms_for_canny``) is copied once into shared
+memory. Worker processes attach to it by name, run the stage function on
+halo-extended tiles (see ``imgproc.tiled``) and write their part of the result
+straight into shared output arrays, so no pixel data is pickled. As with
+``imgproc.tiled``, the result equals the whole-image run with ``exact=True``
+bit for bit.
+
+Stage functions must be picklable by reference, i.e. defined at module level.
+On Linux the pool forks, so functions of the running script work as well.
+"""
+
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .convolution import LOCAL_METHODS, restrict_methods
+from .tiled import iter_tiles
+
+DEFAULT_TILE_SHAPE = (512, 512)
+
+
+class SharedArray:
+    """Numpy array in shared memory, attachable from other processes by name."""
+
+    def __init__(self, shape, dtype, name=None):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.owner = name is None
+        if self.owner:
+            size = max(int(np.prod(self.shape)) * self.dtype.itemsize, 1)
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            # Workers share the resource tracker of the pool's parent, so
+            # attaching does not register the block a second time
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.array = np.ndarray(self.shape, self.dtype, buffer=self.shm.buf)
+
+    @classmethod
+    def copy_of(cls, array):
+        """New shared array holding a copy of ``array``."""
+        array = np.asarray(array)
+        shared = cls(array.shape, array.dtype)
+        shared.array[...] = array
+        return shared
+
+    @property
+    def spec(self):
+        """What another process needs to attach: ``(shape, dtype, name)``."""
+        return self.shape, self.dtype.str, self.shm.name
+
+    def close(self):
+        """Detach (and free, in the creating process) the shared block."""
+        self.array = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _run_tile(fn, src_specs, out_specs, read, write, crop, args, kwargs):
+    """Worker side: run ``fn`` on one tile of the shared inputs."""
+    srcs = [SharedArray(*spec) for spec in src_specs]
+    outs = [SharedArray(*spec) for spec in out_specs]
+    try:
+        _compute_tile(fn, [s.array for s in srcs], [o.array for o in outs],
+                      read, write, crop, args, kwargs)
+    finally:
+        for shared in srcs + outs:
+            shared.close()
+
+
+def _compute_tile(fn, srcs, outs, read, write, crop, args, kwargs):
+    with restrict_methods(LOCAL_METHODS):
+        result = fn(*(src[read] for src in srcs), *args, **kwargs)
+    results = result if isinstance(result, tuple) else (result,)
+    for out, res in zip(outs, results):
+        out[write] = res[crop]
+    return result
+
+
+class TileScheduler:
+    """Runs stage functions on halo-overlapped tiles in a process pool.
+
+    ``workers`` defaults to the number of CPUs; with one worker the tiles are
+    processed in the calling process.
+    """
+
+    def __init__(self, workers=None, tile_shape=DEFAULT_TILE_SHAPE):
+        self.workers = workers or os.cpu_count() or 1
+        self.tile_shape = tuple(tile_shape)
+        self._pool = None
+
+    def _executor(self):
+        if self._pool is None:
+            methods = mp.get_all_start_methods()
+            context = mp.get_context('fork' if 'fork' in methods else None)
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=context)
+        return self._pool
+
+    def run(self, fn, srcs, halo, args=(), kwargs=None):
+        """Apply ``fn(*tiles, *args, **kwargs)`` over all tiles of ``srcs``.
+
+        ``srcs`` is an array or a tuple of arrays with the same height and
+        width; ``fn`` gets one tile of each. Returns what ``fn`` would return
+        for the whole image (an array or a tuple of arrays).
+        """
+        kwargs = kwargs or {}
+        srcs = tuple(srcs) if isinstance(srcs, (tuple, list)) else (srcs,)
+        srcs = tuple(np.asarray(src) for src in srcs)
+        shape = srcs[0].shape[:2]
+        assert all(src.shape[:2] == shape for src in srcs)
+        assert min(self.tile_shape) >= halo, 'tiles must be at least as large as the halo'
+        tiles = list(iter_tiles(shape, self.tile_shape, halo))
+
+        # The first tile tells the number, type and shape of the outputs
+        read, write, crop = tiles[0]
+        with restrict_methods(LOCAL_METHODS):
+            first = fn(*(src[read] for src in srcs), *args, **kwargs)
+        single = not isinstance(first, tuple)
+        firsts = (first,) if single else first
+
+        if self.workers == 1:
+            outs = [np.empty(shape + f.shape[2:], f.dtype) for f in firsts]
+            for o, f in zip(outs, firsts):
+                o[write] = f[crop]
+            for read, write, crop in tiles[1:]:
+                _compute_tile(fn, srcs, outs, read, write, crop, args, kwargs)
+            return outs[0] if single else tuple(outs)
+
+        shared_srcs = [SharedArray.copy_of(src) for src in srcs]
+        shared_outs = [SharedArray(shape + f.shape[2:], f.dtype) for f in firsts]
+        try:
+            for o, f in zip(shared_outs, firsts):
+                o.array[write] = f[crop]
+            src_specs = [s.spec for s in shared_srcs]
+            out_specs = [o.spec for o in shared_outs]
+            futures = [
+                self._executor().submit(_run_tile, fn, src_specs, out_specs,
+                                        read, write, crop, args, kwargs)
+                for read, write, crop in tiles[1:]]
+            for future in futures:
+                future.result()
+            outs = [o.array.copy() for o in shared_outs]
+        finally:
+            for shared in shared_srcs + shared_outs:
+                shared.close()
+        return outs[0] if single else tuple(outs)
+
+    def close(self):
+        """Shut the worker processes down."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def run_parallel(fn, srcs, halo, workers=None, tile_shape=DEFAULT_TILE_SHAPE,
+                 args=(), kwargs=None):
+    """Run one stage with a temporary ``TileScheduler``."""
+    with TileScheduler(workers, tile_shape) as scheduler:
+        return scheduler.run(fn, srcs, halo, args, kwargs)
@@ -0,0 +1,299 @@
+"""Peak extraction for Hough accumulators.
+
+``nms2d`` keeps the regional maxima: the flat tops (plateaus, 8-connected
+pixels of one value, often a single pixel) whose neighbours are all smaller
+(outside the array counts as smaller). A plateau that touches a higher pixel
+(a shoulder) is no maximum, even where its pixels are as large as all of
+their own neighbours. Only the first pixel of every maximum plateau, in
+row-major order, is kept, so every maximum gives one peak. Values must be
+above a threshold, 0 by default, so a flat zero background is never a peak.
+``update_maxima`` brings the maxima up to date after a few values changed,
+looking only at the changed pixels, their neighbours and the plateaus
+around them.
+
+``find_peaks`` returns the surviving peaks sorted by value, optionally
+limited by an absolute and/or relative threshold, a number of peaks and a
+minimum distance between them. The distance is enforced greedily from the
+highest peak down, in vectorized rounds over the pairs of close peaks
+(found in a grid of cells of that size), not by comparing every peak with
+all the higher ones in Python.
+"""
+
+import numpy as np
+from scipy import ndimage
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from .profiling import count, profiled
+
+_EIGHT_NEIGHBOURS = np.ones((3, 3), bool)
+
+
+def _pad_smallest(image):
+    """``image`` padded by one pixel of the smallest value of its dtype."""
+    if image.dtype.kind == 'f':
+        fill = -np.inf
+    elif image.dtype.kind == 'b':
+        fill = False
+    else:
+        fill = np.iinfo(image.dtype).min
+    return np.pad(image, 1, constant_values=fill)
+
+
+def _neighbourhood_max(padded):
+    """3x3 maximum filter from shifted views of the padded image."""
+    rows = np.maximum(padded[:, :-2], padded[:, 1:-1])
+    np.maximum(rows, padded[:, 2:], out=rows)
+    result = np.maximum(rows[:-2], rows[1:-1])
+    return np.maximum(result, rows[2:], out=result)
+
+
+def _shoulders(padded, mask, index):
+    """Which of the pixels ``index`` (flat) of ``mask`` are next to a pixel of
+    the same value outside of it.
+
+    Adjacent pixels of ``mask`` have the same value, so every component of
+    ``mask`` lies in one plateau. The plateau is a maximum only if all of its
+    pixels are in ``mask``; otherwise, being connected, it has a pixel
+    outside of ``mask`` next to the component.
+    """
+    height, width = mask.shape
+    padded_mask = np.pad(mask, 1, constant_values=True).ravel()
+    padded = padded.ravel()
+    # Flat index into the padded arrays
+    index = (index // width + 1) * (width + 2) + index % width + 1
+    value = padded[index]
+    shoulders = np.zeros(len(index), bool)
+    for d_row in (-1, 0, 1):
+        for d_col in (-1, 0, 1):
+            if not (d_row or d_col):
+                continue
+            neighbour = index + d_row * (width + 2) + d_col
+            shoulders |= (padded[neighbour] == value) & ~padded_mask[neighbour]
+    return shoulders
+
+
+def _candidates(image, padded, threshold):
+    mask = image == _neighbourhood_max(padded)
+    if threshold is not None:
+        mask &= image > threshold
+    return mask
+
+
+def maxima_candidates(image, threshold=0):
+    """Boolean mask of the pixels of ``image`` above ``threshold`` that are as
+    large as their 8 neighbours: the plateaus that ``local_maxima`` reduces."""
+    image = np.asarray(image)
+    return _candidates(image, _pad_smallest(image), threshold)
+
+
+def local_maxima(image, threshold=0):
+    """Boolean mask of the plateau-reduced regional maxima of ``image`` that
+    are above ``threshold`` (``None`` for no bound)."""
+    image = np.asarray(image)
+    padded = _pad_smallest(image)
+    mask = _candidates(image, padded, threshold)
+    index = np.flatnonzero(mask)
+    shoulders = _shoulders(padded, mask, index)
+    labels, n_labels = ndimage.label(mask, _EIGHT_NEIGHBOURS)
+    if n_labels == len(index) and not shoulders.any():
+        return mask
+    flat_labels = labels.ravel()[index]
+    # Drop the plateaus that touch a higher pixel
+    shoulder = np.zeros(n_labels + 1, bool)
+    shoulder[flat_labels[shoulders]] = True
+    index, flat_labels = index[~shoulder[flat_labels]], flat_labels[~shoulder[flat_labels]]
+    # One pixel (the first in row-major order) per plateau
+    _, first = np.unique(flat_labels, return_index=True)
+    mask = np.zeros(image.shape, bool)
+    mask.ravel()[index[first]] = True
+    return mask
+
+
+def _neighbour_pairs(index, shape):
+    """``(position, neighbour)``: positions into the flat indices ``index`` and
+    the flat indices of their 8 neighbours, for the neighbours inside
+    ``shape``."""
+    height, width = shape
+    rows, cols = np.divmod(index, width)
+    positions, neighbours = [], []
+    for d_row in (-1, 0, 1):
+        for d_col in (-1, 0, 1):
+            if not (d_row or d_col):
+                continue
+            row, col = rows + d_row, cols + d_col
+            inside = (row >= 0) & (row < height) & (col >= 0) & (col < width)
+            positions.append(np.flatnonzero(inside))
+            neighbours.append(row[inside] * width + col[inside])
+    return np.concatenate(positions), np.concatenate(neighbours)
+
+
+def _grow(seeds, flat_candidates, shape):
+    """Flat indices (sorted) of the candidate plateaus containing ``seeds``."""
+    grown = frontier = seeds
+    while len(frontier):
+        _, neighbour = _neighbour_pairs(frontier, shape)
+        neighbour = np.unique(neighbour[flat_candidates[neighbour]])
+        frontier = np.setdiff1d(neighbour, grown, assume_unique=True)
+        grown = np.union1d(grown, frontier)
+    return grown
+
+
+def _plateau_maxima(flat_image, flat_candidates, index, shape):
+    """First pixel of every plateau in ``index`` (whole candidate plateaus,
+    sorted) that touches no pixel of the same value outside of it."""
+    if len(index) == 0:
+        return index
+    position, neighbour = _neighbour_pairs(index, shape)
+    in_plateau = flat_candidates[neighbour]
+    shoulder = ~in_plateau & (flat_image[neighbour] == flat_image[index][position])
+    graph = coo_matrix((np.ones(np.count_nonzero(in_plateau), bool),
+                        (position[in_plateau], np.searchsorted(index, neighbour[in_plateau]))),
+                       shape=(len(index), len(index)))
+    n_plateaus, plateau = connected_components(graph, directed=False)
+    has_shoulder = np.bincount(plateau[position[shoulder]], minlength=n_plateaus) > 0
+    _, first = np.unique(plateau, return_index=True)
+    return index[first[~has_shoulder[plateau[first]]]]
+
+
+def update_maxima(image, candidates, maxima, changed, threshold=0):
+    """Flat indices (sorted) of the ``local_maxima`` of ``image`` after its
+    values at the flat indices ``changed`` were modified.
+
+    ``maxima`` are the flat indices before the change and ``candidates`` the
+    ``maxima_candidates`` mask (C-contiguous), which is updated in place. A
+    pixel's candidate status depends on its 3x3 neighbourhood, and every
+    plateau whose status can change has a candidate next to one of those
+    pixels, so only these plateaus are examined again.
+    """
+    shape = image.shape
+    flat_image, flat_candidates = image.reshape(-1), candidates.reshape(-1)
+    changed = np.unique(changed)
+    _, neighbour = _neighbour_pairs(changed, shape)
+    dirty = np.union1d(changed, neighbour)
+    position, neighbour = _neighbour_pairs(dirty, shape)
+    value = flat_image[dirty]
+    neighbourhood_max = value.copy()
+    np.maximum.at(neighbourhood_max, position, flat_image[neighbour])
+    is_candidate = value == neighbourhood_max
+    if threshold is not None:
+        is_candidate &= value > threshold
+    flat_candidates[dirty] = is_candidate
+    seeds = np.union1d(dirty[is_candidate], neighbour[flat_candidates[neighbour]])
+    plateaus = _grow(seeds, flat_candidates, shape)
+    maxima = np.setdiff1d(maxima, np.union1d(dirty, plateaus), assume_unique=True)
+    return np.union1d(maxima, _plateau_maxima(flat_image, flat_candidates, plateaus, shape))
+
+
+def descending(values):
+    """Indices that sort ``values`` from the largest down, ties in their
+    order. Unlike ``argsort(-values)``, this works for unsigned types."""
+    values = np.asarray(values)
+    # A stable ascending sort of the reversed values, reversed again
+    return len(values) - 1 - np.argsort(values[::-1], kind='stable')[::-1]
+
+
+def _close_pairs(rows, cols, min_distance):
+    """``(lower, higher)`` indices of the peaks closer than ``min_distance``
+    along both axes. Close peaks lie in the same or in neighbouring cells of a
+    grid of that size, so only those are compared, every pair of cells once."""
+    d_row, d_col = (int(d) for d in min_distance)
+    # Cells with a margin of one, so that every neighbour exists
+    cell_rows, cell_cols = rows // d_row, cols // d_col + 1
+    n_cell_cols = int(cell_cols.max()) + 2
+    cells = cell_rows * n_cell_cols + cell_cols
+    order = np.argsort(cells, kind='stable')
+    starts = np.concatenate(([0], np.cumsum(np.bincount(
+        cells, minlength=(int(cell_rows.max()) + 2) * n_cell_cols))))
+    lower, higher = [], []
+    for d_cell_row, d_cell_col in ((0, 0), (0, 1), (1, -1), (1, 0), (1, 1)):
+        neighbours = cells + d_cell_row * n_cell_cols + d_cell_col
+        start = starts[neighbours]
+        lengths = starts[neighbours + 1] - start
+        i = np.repeat(np.arange(len(rows)), lengths)
+        # Position within the neighbour cell, then index of the peak
+        within = np.arange(len(i)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        j = order[np.repeat(start, lengths) + within]
+        close = (np.abs(rows[i] - rows[j]) < d_row) & (np.abs(cols[i] - cols[j]) < d_col)
+        if d_cell_row == d_cell_col == 0:
+            close &= j < i
+        i, j = i[close], j[close]
+        lower.append(np.maximum(i, j))
+        higher.append(np.minimum(i, j))
+    return np.concatenate(lower), np.concatenate(higher)
+
+
+_UNDECIDED, _KEPT, _DROPPED = 0, 1, 2
+
+
+def _separate(rows, cols, min_distance):
+    """Indices of the peaks ``(rows, cols)`` (highest first) that are kept
+    when every peak suppresses the lower ones closer than ``min_distance``
+    along both axes, unless it was suppressed itself.
+
+    Every round drops the undecided peaks close to a kept one and keeps those
+    without a close undecided higher one. The highest undecided peak is always
+    decided, and chains of peaks that depend on each other are short in
+    practice; each round costs one pass over the close pairs.
+    """
+    n_peaks = len(rows)
+    lower, higher = _close_pairs(rows, cols, min_distance)
+    state = np.zeros(n_peaks, np.int8)
+    while True:
+        near_kept = np.bincount(lower[state[higher] == _KEPT], minlength=n_peaks) > 0
+        blocked = np.bincount(lower[state[higher] == _UNDECIDED], minlength=n_peaks) > 0
+        undecided = state == _UNDECIDED
+        if not undecided.any():
+            return np.flatnonzero(state == _KEPT)
+        state[undecided & near_kept] = _DROPPED
+        state[undecided & ~near_kept & ~blocked] = _KEPT
+        # Only pairs of an undecided peak and a higher one still in play matter
+        active = (state[lower] == _UNDECIDED) & (state[higher] != _DROPPED)
+        lower, higher = lower[active], higher[active]
+
+
+@profiled()
+def nms2d(image, threshold=0, out=None):
+    """``image`` where it has a local maximum (see ``local_maxima``), zero
+    elsewhere."""
+    image = np.asarray(image)
+    if out is None:
+        out = np.zeros_like(image)
+    else:
+        out[...] = 0
+    np.copyto(out, image, where=local_maxima(image, threshold))
+    return out
+
+
+@profiled()
+def find_peaks(image, threshold=0, relative=None, top_k=None, min_distance=0):
+    """Peaks of ``image`` as ``(rows, cols)``, highest first.
+
+    ``threshold`` is an absolute lower bound on the values (exclusive, ``None``
+    for none), ``relative`` one relative to the maximum of ``image``; both
+    apply if given. ``min_distance`` (one value or one per axis, e.g.
+    ``(d_rho, d_theta)``) drops peaks closer than that along both axes to a
+    higher kept peak. ``top_k`` keeps at most that many peaks.
+    """
+    image = np.asarray(image)
+    bounds = [b for b in (threshold,) if b is not None]
+    if relative is not None:
+        bounds.append(relative * image.max())
+    rows, cols = np.nonzero(local_maxima(image, max(bounds) if bounds else None))
+    order = descending(image[rows, cols])
+    rows, cols = rows[order], cols[order]
+
+    min_distance = np.broadcast_to(min_distance, (2,))
+    if np.all(min_distance > 0) and len(rows) > 1:
+        # Whether a peak is kept only depends on the higher ones, so for the
+        # top k, growing prefixes of the peaks suffice
+        n_peaks = len(rows) if top_k is None else 4 * top_k
+        while True:
+            kept = _separate(rows[:n_peaks], cols[:n_peaks], min_distance)
+            if top_k is None or len(kept) >= top_k or n_peaks >= len(rows):
+                break
+            n_peaks *= 4
+        rows, cols = rows[kept], cols[kept]
+    count('maxima', len(order))
+    count('peaks', len(rows[:top_k]))
+    return rows[:top_k], cols[:top_k]
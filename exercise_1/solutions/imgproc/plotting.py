@@ -0,0 +1,33 @@
+"""Plotting helpers. Matplotlib is only imported when one is called."""
+
+import numpy as np
+
+
+def plot_multiple(images, titles, colormap='gray',
+                  max_columns=np.inf, imsize=4, share_axes=True):
+    """Plot multiple images as subplots on a grid."""
+    import matplotlib.pyplot as plt
+    assert len(images) == len(titles)
+    n_images = len(images)
+    n_cols = min(max_columns, n_images)
+    n_rows = int(np.ceil(n_images / n_cols))
+    fig, axes = plt.subplots(
+        n_rows, n_cols, figsize=(n_cols * imsize, n_rows * imsize),
+        squeeze=False, sharex=share_axes, sharey=share_axes)
+
+    axes = axes.flat
+    # Hide subplots without content
+    for ax in axes[n_images:]:
+        ax.axis('off')
+
+    if not isinstance(colormap, (list, tuple)):
+        colormaps = [colormap]*n_images
+    else:
+        colormaps = colormap
+
+    for ax, image, title, cmap in zip(axes, images, titles, colormaps):
+        ax.imshow(image, cmap=cmap)
+        ax.set_title(title)
+
+    fig.tight_layout()
+    return fig
@@ -0,0 +1,74 @@
+"""Floating point type policy and reusable scratch buffers.
+
+All engines compute in one floating point type, float32 by default, whatever
+the type of the input image (uint8, float32 or float64). Kernels are stored in
+the same type, so no pass silently upcasts to float64.
+
+A ``Workspace`` holds named scratch buffers. Passing the same workspace (and
+``out=`` arrays) to a stage for every frame of a video means the large
+per-frame temporaries are allocated once instead of for every frame.
+"""
+
+from contextlib import contextmanager
+
+import numpy as np
+
+_dtype = np.dtype(np.float32)
+
+
+def get_dtype():
+    """Floating point type used by all engines."""
+    return _dtype
+
+
+def set_dtype(dtype):
+    """Change the floating point type used by all engines."""
+    global _dtype
+    dtype = np.dtype(dtype)
+    if dtype.kind != 'f':
+        raise ValueError(f'the dtype policy must be a floating point type, got {dtype}')
+    _dtype = dtype
+
+
+@contextmanager
+def use_dtype(dtype):
+    """Use ``dtype`` as the floating point type inside the block."""
+    previous = get_dtype()
+    set_dtype(dtype)
+    try:
+        yield
+    finally:
+        set_dtype(previous)
+
+
+class Workspace:
+    """Named scratch buffers, reused between calls with the same shapes."""
+
+    def __init__(self):
+        self._buffers = {}
+
+    def get(self, name, shape, dtype=None):
+        """Uninitialized buffer for ``name``; the same array on every call
+        with the same shape and type."""
+        dtype = np.dtype(dtype or get_dtype())
+        key = (name, tuple(shape), dtype.str)
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = self._buffers[key] = np.empty(shape, dtype)
+        return buffer
+
+    @property
+    def nbytes(self):
+        """Total size of all buffers."""
+        return sum(b.nbytes for b in self._buffers.values())
+
+    def clear(self):
+        """Drop all buffers."""
+        self._buffers.clear()
+
+
+def scratch(workspace, name, shape, dtype=None):
+    """Buffer from ``workspace``, or a new array without one."""
+    if workspace is None:
+        return np.empty(shape, dtype or get_dtype())
+    return workspace.get(name, shape, dtype)
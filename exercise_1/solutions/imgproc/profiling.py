@@ -0,0 +1,245 @@
+"""Per-stage profiling of the pipelines.
+
+The engines mark their stages with ``@profiled(name)`` (or ``with
+stage(name):``) and report domain counters with ``count(name, value)`` (summed
+per stage call, e.g. edge pixels, votes cast, peaks found) and
+``sample(name, value)`` (a time series, e.g. a queue depth). Nothing is
+recorded unless a ``Profiler`` is active::
+
+    with profile() as profiler:
+        my_canny(image, 2, 0.1, 0.3)
+    print(profiler.summary())
+    profiler.save_chrome_trace('trace.json')   # chrome://tracing, Perfetto
+
+Disabled, a stage costs one global lookup, and counters that need extra work
+to compute are guarded by ``enabled()``.
+
+Every stage call records its wall time, the peak of the memory allocated
+(through ``tracemalloc``, which NumPy reports to) above the level at its
+start, and its counters. Stages nest; the memory of threads running at the
+same time is not separated.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager, nullcontext
+
+StageCall = namedtuple('StageCall', ['name', 'start', 'duration', 'thread', 'depth', 'bytes',
+                                     'counters'])
+
+_active = None
+_NULL_STAGE = nullcontext()
+
+
+class _Frame:
+    """An open stage call."""
+
+    __slots__ = ('name', 'start', 'start_bytes', 'peak', 'counters')
+
+    def __init__(self, name, start, start_bytes):
+        self.name = name
+        self.start = start
+        self.start_bytes = start_bytes
+        self.peak = start_bytes
+        self.counters = {}
+
+
+class Profiler:
+    """Records the stage calls, counters and samples while active (see
+    ``profile``). With ``memory=False``, allocations are not traced, which
+    keeps the overhead down to the timing."""
+
+    def __init__(self, memory=True):
+        self.memory = memory
+        self.calls = []
+        self.samples = []
+        self._local = threading.local()
+        self._origin = time.perf_counter()
+        self._started_tracing = False
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def start(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def stop(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _traced(self, stack):
+        """Current traced memory; folds the peak so far into the open stages."""
+        if not self.memory:
+            return 0
+        current, peak = tracemalloc.get_traced_memory()
+        for frame in stack:
+            frame.peak = max(frame.peak, peak)
+        tracemalloc.reset_peak()
+        return current
+
+    @contextmanager
+    def stage(self, name):
+        """Record the block as one call of stage ``name``."""
+        stack = self._stack()
+        frame = _Frame(name, 0.0, self._traced(stack))
+        stack.append(frame)
+        frame.start = time.perf_counter()
+        try:
+            yield frame
+        finally:
+            end = time.perf_counter()
+            self._traced(stack)
+            stack.pop()
+            self.calls.append(StageCall(name, frame.start - self._origin, end - frame.start,
+                                        threading.get_ident(), len(stack),
+                                        frame.peak - frame.start_bytes, frame.counters))
+
+    def count(self, name, value=1):
+        """Add ``value`` to counter ``name`` of the innermost open stage
+        (ignored outside of any stage)."""
+        stack = self._stack()
+        if stack:
+            counters = stack[-1].counters
+            counters[name] = counters.get(name, 0) + value
+
+    def sample(self, name, value):
+        """Record one value of the time series ``name``."""
+        self.samples.append((name, time.perf_counter() - self._origin, threading.get_ident(),
+                             value))
+
+    def report(self):
+        """Per stage (in order of first call): number of calls, nesting depth
+        (of the outermost call), total and mean milliseconds, the largest
+        allocation peak in bytes and the summed counters. Time series are
+        under ``'samples'``, with their count, mean and maximum."""
+        stages = OrderedDict()
+        for call in sorted(self.calls, key=lambda call: call.start):
+            entry = stages.setdefault(call.name, OrderedDict(
+                calls=0, depth=call.depth, total_ms=0.0, mean_ms=0.0, max_bytes=0,
+                counters=OrderedDict()))
+            entry['calls'] += 1
+            entry['depth'] = min(entry['depth'], call.depth)
+            entry['total_ms'] += 1000 * call.duration
+            entry['max_bytes'] = max(entry['max_bytes'], call.bytes)
+            for name, value in call.counters.items():
+                entry['counters'][name] = entry['counters'].get(name, 0) + value
+        for entry in stages.values():
+            entry['mean_ms'] = entry['total_ms'] / entry['calls']
+        samples = OrderedDict()
+        for name, _, _, value in self.samples:
+            samples.setdefault(name, []).append(value)
+        return OrderedDict(stages=stages, samples=OrderedDict(
+            (name, OrderedDict(count=len(values), mean=sum(values) / len(values),
+                               max=max(values)))
+            for name, values in samples.items()))
+
+    def summary(self):
+        """``report`` as a text table."""
+        report = self.report()
+        lines = [f'{"stage":28s} {"calls":>6s} {"total ms":>10s} {"mean ms":>9s} {"peak MB":>8s}'
+                 '  counters']
+        for name, entry in report['stages'].items():
+            counters = ', '.join(f'{key}={value}' for key, value in entry['counters'].items())
+            name = '  ' * entry['depth'] + name
+            lines.append(f'{name:28s} {entry["calls"]:6d} {entry["total_ms"]:10.2f} '
+                         f'{entry["mean_ms"]:9.2f} {entry["max_bytes"] / 2**20:8.1f}  {counters}')
+        for name, entry in report['samples'].items():
+            lines.append(f'{name:28s} {entry["count"]:6d} samples, mean {entry["mean"]:.2f}, '
+                         f'max {entry["max"]}')
+        return '\n'.join(lines)
+
+    def chrome_trace(self):
+        """The calls (complete events, counters and bytes as arguments) and
+        samples (counter events) in the Chrome trace event format."""
+        pid = os.getpid()
+        events = []
+        for call in self.calls:
+            args = dict(call.counters)
+            if self.memory:
+                args['bytes'] = call.bytes
+            events.append({'name': call.name, 'cat': 'imgproc', 'ph': 'X', 'pid': pid,
+                           'tid': call.thread, 'ts': 1e6 * call.start, 'dur': 1e6 * call.duration,
+                           'args': args})
+        for name, start, thread, value in self.samples:
+            events.append({'name': name, 'cat': 'imgproc', 'ph': 'C', 'pid': pid, 'tid': thread,
+                           'ts': 1e6 * start, 'args': {name: value}})
+        events.sort(key=lambda event: event['ts'])
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save_chrome_trace(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f)
+
+
+@contextmanager
+def profile(memory=True):
+    """Activate a new ``Profiler`` inside the block."""
+    global _active
+    previous = _active
+    profiler = Profiler(memory)
+    profiler.start()
+    _active = profiler
+    try:
+        yield profiler
+    finally:
+        _active = previous
+        profiler.stop()
+
+
+def active():
+    """The active ``Profiler``, or ``None``."""
+    return _active
+
+
+def enabled():
+    return _active is not None
+
+
+def stage(name):
+    """Context manager recording the block as stage ``name`` if profiling."""
+    profiler = _active
+    if profiler is None:
+        return _NULL_STAGE
+    return profiler.stage(name)
+
+
+def profiled(name=None):
+    """Decorator recording every call of the function as a stage (named after
+    the function by default)."""
+    def decorate(fn):
+        stage_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            profiler = _active
+            if profiler is None:
+                return fn(*args, **kwargs)
+            with profiler.stage(stage_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name, value=1):
+    """Add ``value`` to counter ``name`` of the current stage if profiling."""
+    profiler = _active
+    if profiler is not None:
+        profiler.count(name, value)
+
+
+def sample(name, value):
+    """Record one value of the time series ``name`` if profiling."""
+    profiler = _active
+    if profiler is not None:
+        profiler.sample(name, value)
@@ -0,0 +1,109 @@
+"""Cascaded Gaussian scale-space.
+
+Blurring with ``sigma_a`` and then with ``sigma_b`` equals one blur with
+``sqrt(sigma_a**2 + sigma_b**2)``. A scale-space keeps the levels it has
+already computed and reaches every new sigma from the closest level below it,
+with a (smaller, cheaper) incremental kernel.
+
+Gaussian derivatives benefit in the same way: the derivative of Gaussian at
+``sigma`` of the image equals the derivative of Gaussian at the residual
+``sqrt(sigma**2 - sigma_level**2)`` of a cached level, see ``split``.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from .convolution import gaussian_blur
+
+ScaleLevel = namedtuple('ScaleLevel', ['sigma', 'step', 'image'])
+
+
+class GaussianScaleSpace:
+    """Gaussian blurs of one image, built incrementally and cached.
+
+    ``sigma0`` is the blur already present in ``image``. With ``decimate``,
+    ``build`` subsamples every octave (doubling of sigma) by two; such levels
+    have ``step > 1`` and are only returned by ``build`` and ``levels``, while
+    ``get`` and ``split`` always work at full resolution. For a stack of
+    images, ``axes`` gives the row and column axes, e.g. ``(1, 2)``.
+    """
+
+    def __init__(self, image, sigma0=0.0, mode='reflect', decimate=False, rtol=0.0, axes=(0, 1)):
+        self.mode = mode
+        self.axes = axes
+        self.decimate = decimate
+        self.rtol = rtol
+        self.image = np.asarray(image)
+        self.levels = [ScaleLevel(float(sigma0), 1, self.image)]
+
+    def _full_resolution(self):
+        return [level for level in self.levels if level.step == 1]
+
+    def _insert(self, level):
+        self.levels.append(level)
+        self.levels.sort(key=lambda lv: (lv.step, lv.sigma))
+        return level
+
+    def nearest(self, sigma):
+        """Full-resolution level with the largest sigma not above ``sigma``
+        (up to the relative tolerance ``rtol``)."""
+        below = [lv for lv in self._full_resolution() if lv.sigma <= sigma * (1 + self.rtol)]
+        if not below:
+            raise ValueError(f'sigma {sigma} is below the blur of the input image')
+        return max(below, key=lambda lv: lv.sigma)
+
+    def level(self, sigma):
+        """Full-resolution ``ScaleLevel`` blurred to ``sigma`` (cached)."""
+        level = self.nearest(sigma)
+        if abs(level.sigma - sigma) <= self.rtol * sigma:
+            return level
+        residual = np.sqrt(sigma**2 - level.sigma**2)
+        image = gaussian_blur(level.image, residual, mode=self.mode, axes=self.axes)
+        return self._insert(ScaleLevel(float(sigma), 1, image))
+
+    def get(self, sigma):
+        """Full-resolution image blurred to ``sigma`` (cached)."""
+        return self.level(sigma).image
+
+    def split(self, sigma, residual=1.0):
+        """Blurred image and residual sigma that together give ``sigma``.
+
+        Applying a Gaussian (or derivative of Gaussian) with the returned
+        residual sigma to the returned image is equivalent to applying it with
+        ``sigma`` to the original image. The level at
+        ``sqrt(sigma**2 - residual**2)`` is built (and cached) if needed, so
+        repeated calls only pay for the small residual kernel.
+        """
+        base = self.levels[0]
+        target = np.sqrt(max(sigma**2 - residual**2, 0.0))
+        level = self.level(target) if target > base.sigma else base
+        return level.image, np.sqrt(max(sigma**2 - level.sigma**2, 0.0))
+
+    def build(self, sigmas):
+        """Levels for increasing ``sigmas``, each blurred from the previous one."""
+        result = []
+        if not self.decimate:
+            for sigma in sorted(sigmas):
+                result.append(self.level(sigma))
+            return result
+        previous = self.levels[0]
+        octave_sigma = None
+        for sigma in sorted(sigmas):
+            image, step = previous.image, previous.step
+            if octave_sigma is None:
+                octave_sigma = sigma
+            elif sigma >= 2 * octave_sigma:
+                # Start a new octave from the previous level, subsampled by two
+                every_other = [slice(None)] * image.ndim
+                for axis in self.axes:
+                    every_other[axis] = slice(None, None, 2)
+                image, step = image[tuple(every_other)], step * 2
+                octave_sigma = sigma
+            # Blur sizes are measured in pixels of the current octave
+            residual = np.sqrt(max(sigma**2 - previous.sigma**2, 0.0)) / step
+            if residual > 0:
+                image = gaussian_blur(image, residual, mode=self.mode, axes=self.axes)
+            previous = self._insert(ScaleLevel(float(sigma), step, image))
+            result.append(previous)
+        return result
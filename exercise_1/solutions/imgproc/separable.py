@@ -0,0 +1,142 @@
+"""Separable filtering built from vectorized 1D passes.
+
+Every pass filters all rows, columns and channels at once by summing shifted
+slices of the input. No padded copy of the whole image is made: only the few
+samples next to each border are gathered (with the requested border mode)
+into a small strip.
+
+Border modes follow the ``scipy.ndimage`` names:
+``'constant'`` (zeros), ``'reflect'``, ``'mirror'``, ``'wrap'`` and ``'nearest'``.
+"""
+
+import numpy as np
+
+from .policy import get_dtype, scratch
+
+BORDER_MODES = ('constant', 'reflect', 'mirror', 'wrap', 'nearest')
+
+
+def border_indices(idx, n, mode):
+    """Map (possibly out of range) indices into ``[0, n)`` for a border mode.
+
+    For ``'constant'`` the out of range indices are returned as ``-1``.
+    """
+    idx = np.asarray(idx)
+    if mode == 'constant':
+        return np.where((idx >= 0) & (idx < n), idx, -1)
+    if mode == 'nearest':
+        return np.clip(idx, 0, n - 1)
+    if mode == 'wrap':
+        return np.mod(idx, n)
+    if mode == 'reflect':
+        m = np.mod(idx, 2 * n)
+        return np.where(m < n, m, 2 * n - 1 - m)
+    if mode == 'mirror':
+        if n == 1:
+            return np.zeros_like(idx)
+        m = np.mod(idx, 2 * n - 2)
+        return np.where(m < n, m, 2 * n - 2 - m)
+    raise ValueError(f'unknown border mode {mode!r}, expected one of {BORDER_MODES}')
+
+
+def _take_extended(image, axis, start, stop, mode):
+    """Samples ``start..stop-1`` of ``image`` along ``axis``, extended past the
+    borders, with ``axis`` moved to the front."""
+    idx = border_indices(np.arange(start, stop), image.shape[axis], mode)
+    # Taking along the original axis is much faster than along a moved view
+    strip = np.moveaxis(image.take(np.maximum(idx, 0), axis=axis), axis, 0)
+    if mode == 'constant':
+        strip[idx < 0] = 0
+    return strip
+
+
+def _shifted_sum(src, weights, out, axis, workspace=None):
+    """``out[i] = sum_j weights[j] * src[i + j]`` along axis 0.
+
+    ``src`` and ``out`` are views with the original ``axis`` moved to the
+    front; the scratch buffer gets the same memory layout as ``out``, since
+    mixing layouts makes every pass much slower.
+    """
+    m = out.shape[0]
+    tmp = scratch(workspace, 'shifted_sum', np.moveaxis(out, 0, axis).shape, out.dtype)
+    tmp = np.moveaxis(tmp, axis, 0)
+    np.multiply(src[0:m], weights[0], out=out)
+    for j in range(1, len(weights)):
+        np.multiply(src[j:j + m], weights[j], out=tmp)
+        out += tmp
+    return out
+
+
+def correlate1d(image, weights, axis=-1, mode='reflect', origin=0, out=None, workspace=None):
+    """Correlate ``image`` with 1D ``weights`` along ``axis``.
+
+    Same semantics as ``scipy.ndimage.correlate1d``. The result has the type
+    of the dtype policy (float32 by default). The scratch buffer comes from
+    ``workspace`` if given.
+    """
+    if mode not in BORDER_MODES:
+        raise ValueError(f'unknown border mode {mode!r}, expected one of {BORDER_MODES}')
+    image = np.asarray(image)
+    dtype = get_dtype() if out is None else out.dtype
+    weights = np.asarray(weights, dtype=dtype).ravel()
+    size = len(weights)
+    lo = size // 2 + origin  # samples needed before the current one
+    hi = size - 1 - lo       # samples needed after the current one
+    if not 0 <= lo < size:
+        raise ValueError('invalid origin')
+
+    if out is None:
+        out = np.empty(image.shape, dtype=dtype)
+    assert out.shape == image.shape
+    assert not np.shares_memory(out, image), 'out must not overlap the input'
+
+    src = np.moveaxis(image, axis, 0)
+    dst = np.moveaxis(out, axis, 0)
+    n = src.shape[0]
+
+    if n - lo - hi <= 0:
+        # Axis shorter than the kernel: extending it completely is cheap.
+        _shifted_sum(_take_extended(image, axis, -lo, n + hi, mode), weights, dst, axis)
+        return out
+
+    _shifted_sum(src, weights, dst[lo:n - hi], axis, workspace)
+    if lo:
+        _shifted_sum(_take_extended(image, axis, -lo, lo + hi, mode), weights, dst[:lo], axis)
+    if hi:
+        _shifted_sum(_take_extended(image, axis, n - hi - lo, n + hi, mode), weights, dst[n - hi:], axis)
+    return out
+
+
+def convolve1d(image, weights, axis=-1, mode='reflect', origin=0, out=None, workspace=None):
+    """Convolve ``image`` with 1D ``weights`` along ``axis``.
+
+    Same semantics as ``scipy.ndimage.convolve1d``.
+    """
+    weights = np.asarray(weights).ravel()[::-1]
+    origin = -origin
+    if not len(weights) & 1:
+        origin -= 1
+    return correlate1d(image, weights, axis, mode, origin, out, workspace)
+
+
+def separable_convolve(image, kernels, axes=(0, 1), mode='reflect', out=None, workspace=None):
+    """Convolve ``image`` with one 1D kernel per axis, one pass per axis.
+
+    Only one intermediate buffer is used regardless of the number of passes.
+    """
+    assert len(kernels) == len(axes)
+    image = np.asarray(image)
+    if len(kernels) == 0:
+        return image.astype(get_dtype())
+    if len(kernels) == 1:
+        return convolve1d(image, kernels[0], axes[0], mode, out=out, workspace=workspace)
+    if out is None:
+        out = np.empty(image.shape, dtype=get_dtype())
+    tmp = scratch(workspace, 'separable_convolve', image.shape, out.dtype)
+    # Ping-pong between the two buffers so the last pass lands in `out`
+    src = image
+    for i, (kernel, axis) in enumerate(zip(kernels, axes)):
+        dst = out if (len(kernels) - 1 - i) % 2 == 0 else tmp
+        convolve1d(src, kernel, axis, mode, out=dst, workspace=workspace)
+        src = dst
+    return out
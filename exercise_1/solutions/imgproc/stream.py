@@ -0,0 +1,130 @@
+"""Frame sources, background prefetching and per-stage timing for streaming
+pipelines.
+
+``iter_frames`` reads a video file, a directory of images or any iterable of
+arrays. ``prefetch`` runs such an iterator (including any per-frame
+preparation mapped over it) in a background thread with a bounded queue, so
+decoding overlaps with processing; OpenCV releases the GIL while decoding.
+``StageTimer`` collects the latency of every pipeline stage.
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from .images import load_images
+from .profiling import enabled, sample, stage
+
+_DONE = object()
+
+
+def iter_frames(source, mode='bgr'):
+    """Frames of a video file, of the images in a directory (sorted by name),
+    or of an iterable of arrays (passed through).
+
+    Images of a directory are decoded ahead in the ``mode`` of
+    ``imgproc.images`` (``'bgr'`` by default, like video frames).
+    """
+    if not isinstance(source, (str, os.PathLike)):
+        yield from source
+        return
+    if os.path.isdir(source):
+        yield from load_images(source, mode)
+        return
+    import cv2
+    capture = cv2.VideoCapture(os.fspath(source))
+    if not capture.isOpened():
+        raise IOError(f'cannot open video {source!r}')
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                return
+            yield frame
+    finally:
+        capture.release()
+
+
+def prefetch(iterable, depth=4):
+    """Iterate ``iterable`` in a background thread, at most ``depth`` items
+    ahead of the consumer. Exceptions are re-raised in the consumer."""
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in iterable:
+                while not stop.is_set():
+                    try:
+                        items.put((item, None), timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+                if stop.is_set():
+                    return
+            items.put((_DONE, None))
+        except BaseException as error:
+            items.put((_DONE, error))
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            if enabled():
+                sample('prefetch_queue', items.qsize())
+            item, error = items.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        # The consumer may stop early; release the producer
+        stop.set()
+        while thread.is_alive():
+            try:
+                items.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        thread.join()
+
+
+class StageTimer:
+    """Accumulated wall-clock time of named pipeline stages."""
+
+    def __init__(self):
+        self.totals = OrderedDict()
+        self.frames = 0
+        self._start = None
+        self._end = None
+
+    @contextmanager
+    def stage(self, name):
+        """Time the block as (part of) stage ``name``."""
+        start = time.perf_counter()
+        if self._start is None:
+            self._start = start
+        try:
+            # Also a stage of an active profiler (see imgproc.profiling)
+            with stage(name):
+                yield
+        finally:
+            self._end = time.perf_counter()
+            self.totals[name] = self.totals.get(name, 0.0) + self._end - start
+
+    def frame_done(self):
+        """Count one processed frame."""
+        self.frames += 1
+
+    def report(self):
+        """Mean milliseconds per frame of every stage, their sum
+        (``'total'``) and the throughput (``'fps'``) over the timed period."""
+        frames = max(self.frames, 1)
+        report = OrderedDict((name, 1000 * total / frames) for name, total in self.totals.items())
+        report['total'] = sum(report.values())
+        elapsed = (self._end - self._start) if self._start is not None else 0.0
+        report['fps'] = self.frames / elapsed if elapsed > 0 else 0.0
+        return report
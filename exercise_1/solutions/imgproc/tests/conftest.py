@@ -0,0 +1,27 @@
+import os
+
+import numpy as np
+import pytest
+
+DATA = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'data')
+
+
+@pytest.fixture(scope='session')
+def gantrycrane():
+    """The gantry crane image as float32."""
+    from imgproc.images import imread
+    return imread(os.path.join(DATA, 'gantrycrane.png')).astype(np.float32)
+
+
+@pytest.fixture(scope='session')
+def circuit():
+    """The circuit image as float32."""
+    from imgproc.images import imread
+    return imread(os.path.join(DATA, 'circuit.png')).astype(np.float32)
+
+
+@pytest.fixture(scope='session')
+def joan():
+    """The Joan of Arc image, gray, as float32."""
+    from imgproc.images import imread
+    return imread(os.path.join(DATA, 'JoanofArc.jpg')).astype(np.float32)
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from imgproc.batch import map_batched
+from imgproc.edges import get_edges
+from imgproc.filters import gaussian_filter
+from imgproc.gradients import gauss_derivs, image_gradients_polar, laplace
+
+
+@pytest.fixture(scope='module')
+def images(gantrycrane, circuit):
+    """Two gray crops of equal shape and one of another shape."""
+    return [gantrycrane[:200, :240], circuit[:200, :240], gantrycrane[100:250, 50:300]]
+
+
+@pytest.mark.parametrize('sigma', [1.0, 2.0])
+def test_gaussian_filter_gray_stack(images, sigma):
+    stack = np.stack(images[:2])
+    batched = gaussian_filter(stack, sigma, batch=True)
+    for image, result in zip(images, batched):
+        np.testing.assert_array_equal(result, gaussian_filter(image, sigma))
+
+
+def test_gaussian_filter_color_stack(images):
+    stack = np.stack([np.dstack([image, image / 2, image / 4]) for image in images[:2]])
+    batched = gaussian_filter(stack, 2.0, batch=True)
+    for image, result in zip(stack, batched):
+        np.testing.assert_array_equal(result, gaussian_filter(image, 2.0))
+
+
+def test_gaussian_filter_needs_batch_for_stacks(images):
+    with pytest.raises(ValueError):
+        gaussian_filter(np.stack([np.dstack([image] * 3) for image in images[:2]]), 2.0)
+    with pytest.raises(ValueError):
+        gaussian_filter(images[0], 2.0, batch=True)
+
+
+@pytest.mark.parametrize('fn', [gauss_derivs, image_gradients_polar, laplace])
+def test_gradients_stack(images, fn):
+    batched = fn(np.stack(images[:2]), 2.0)
+    for k, image in enumerate(images[:2]):
+        single = fn(image, 2.0)
+        if isinstance(single, tuple):
+            for b, s in zip(batched, single):
+                np.testing.assert_array_equal(b[k], s)
+        else:
+            np.testing.assert_array_equal(batched[k], single)
+
+
+def test_get_edges_stack(images):
+    batched = get_edges(np.stack(images[:2]), 2.0, 10.0)
+    for image, result in zip(images, batched):
+        np.testing.assert_array_equal(result, get_edges(image, 2.0, 10.0))
+
+
+def test_map_batched_mixed_shapes(images):
+    results = map_batched(gaussian_filter, images, 2.0, batch=True)
+    assert len(results) == len(images)
+    for image, result in zip(images, results):
+        np.testing.assert_array_equal(result, gaussian_filter(image, 2.0))
@@ -0,0 +1,21 @@
+import pytest
+
+from imgproc import bench
+
+pytest.importorskip('cv2')
+
+
+def test_first_call_is_not_timed():
+    calls = []
+    bench._best_time(lambda: calls.append(len(calls)), 2)
+    assert len(calls) == 3
+    bench._best_time(lambda: calls.append(len(calls)), 1, warmup=False)
+    assert len(calls) == 4
+
+
+@pytest.mark.parametrize('stage', ['laplace', 'gauss_derivs', 'nms_for_canny'])
+def test_small_run_is_accurate(stage):
+    results = bench.run_benchmarks([stage], sizes=[(64, 96)], repeat=1)['results']
+    assert results and all(result['accurate'] for result in results)
+    if stage == 'nms_for_canny':
+        assert results[0]['error'] == 0
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from imgproc.circles import hough_circles
+from imgproc.gradients import image_gradients_polar
+from imgproc.hysteresis import hysteresis_threshold
+from imgproc.nms import non_maximum_suppression
+from imgproc.policy import Workspace
+
+
+def disc_edges(shape, center, radius, sigma=1.5):
+    """Canny-like edges and gradient direction of a bright disc."""
+    y, x = np.indices(shape)
+    image = (np.hypot(y - center[0], x - center[1]) <= radius).astype(np.float32)
+    magnitude, direction = image_gradients_polar(image, sigma)
+    suppressed = non_maximum_suppression(magnitude, direction)
+    top = suppressed.max()
+    return hysteresis_threshold(suppressed, 0.1 * top, 0.3 * top), direction
+
+
+@pytest.mark.parametrize('center, radius', [((60, 70), 25), ((45, 100), 12.5), ((70, 60), 38)])
+def test_disc_center_and_radius(center, radius):
+    edges, direction = disc_edges((120, 160), center, radius)
+    circles = hough_circles(edges, direction, 10, 40)
+    assert len(circles) == 1
+    circle = circles[0]
+    assert abs(circle.y - center[0]) <= 1 and abs(circle.x - center[1]) <= 1
+    assert abs(circle.radius - radius) <= 1
+    assert circle.support > 0.8
+
+
+@pytest.mark.parametrize('r_min, r_max', [(0, 40), (-3, 40), (20, 10)])
+def test_invalid_radius_range(r_min, r_max):
+    edges, direction = disc_edges((120, 160), (60, 70), 25)
+    with pytest.raises(ValueError, match='r_min'):
+        hough_circles(edges, direction, r_min, r_max)
+
+
+def test_workspace_is_reused_between_frames():
+    edges, direction = disc_edges((120, 160), (60, 70), 25)
+    expected = hough_circles(edges, direction, 10, 40)
+    workspace = Workspace()
+    assert hough_circles(edges, direction, 10, 40, workspace=workspace) == expected
+    nbytes = workspace.nbytes
+    assert hough_circles(edges, direction, 10, 40, workspace=workspace) == expected
+    assert workspace.nbytes == nbytes
+
+
+def test_edge_stages_with_workspace_match():
+    edges, direction = disc_edges((120, 160), (60, 70), 25)
+    magnitude = np.random.default_rng(0).random(direction.shape).astype(np.float32)
+    workspace = Workspace()
+    for _ in range(2):
+        np.testing.assert_array_equal(
+            non_maximum_suppression(magnitude, direction, workspace=workspace),
+            non_maximum_suppression(magnitude, direction))
+        np.testing.assert_array_equal(
+            hysteresis_threshold(magnitude, 0.5, 0.9, out=np.empty(magnitude.shape, bool),
+                                 workspace=workspace),
+            hysteresis_threshold(magnitude, 0.5, 0.9))
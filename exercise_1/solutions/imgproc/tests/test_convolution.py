@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from imgproc.convolution import convolve, fft_convolve
+from imgproc.kernels import get_kernel
+from imgproc.separable import BORDER_MODES
+
+ndimage = pytest.importorskip('scipy.ndimage')
+
+RNG = np.random.default_rng(0)
+KERNELS = {
+    'gauss 2d': np.outer(get_kernel('gauss', 1.5), get_kernel('gauss', 1.5)),
+    'derivative 1d': get_kernel('gaussdx', 2.0)[None, :],
+    'even 4x6': RNG.standard_normal((4, 6)),
+    'non-separable 5x5': RNG.standard_normal((5, 5)),
+    # more support than the image has rows, the border modes wrap around
+    'larger than the image 31x3': RNG.standard_normal((31, 3)),
+}
+
+
+def assert_close(result, expected):
+    scale = np.abs(expected).max()
+    np.testing.assert_allclose(result, expected, rtol=0, atol=2e-5 * scale)
+
+
+@pytest.fixture(scope='module')
+def image(circuit):
+    # odd and even sizes, not multiples of the FFT lengths
+    return circuit[101:124, 40:97]
+
+
+@pytest.mark.parametrize('mode', BORDER_MODES)
+@pytest.mark.parametrize('name', KERNELS)
+def test_methods_match_scipy(image, mode, name):
+    kernel = KERNELS[name]
+    expected = ndimage.convolve(image.astype(np.float64), kernel, mode=mode)
+    fft = convolve(image, kernel, mode, method='fft')
+    direct = convolve(image, kernel, mode, method='direct')
+    assert fft.shape == direct.shape == image.shape
+    assert_close(fft, expected)
+    assert_close(direct, expected)
+    assert_close(fft, direct)
+    assert_close(fft_convolve(image, kernel, mode), expected)
+    if name in ('gauss 2d', 'derivative 1d'):
+        assert_close(convolve(image, kernel, mode, method='separable'), expected)
+
+
+@pytest.mark.parametrize('mode', BORDER_MODES)
+def test_stack_matches_scipy(image, mode):
+    stack = np.stack([image, image[::-1], 2 * image])
+    kernel = KERNELS['even 4x6']
+    fft = convolve(stack, kernel, mode, method='fft')
+    direct = convolve(stack, kernel, mode, method='direct')
+    for i, frame in enumerate(stack):
+        expected = ndimage.convolve(frame.astype(np.float64), kernel, mode=mode)
+        assert_close(fft[i], expected)
+        assert_close(direct[i], expected)
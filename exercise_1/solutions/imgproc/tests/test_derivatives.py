@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from imgproc.derivatives import DERIVATIVES, gaussian_derivatives
+from imgproc.gradients import gauss_derivs, gauss_second_derivs, laplace
+from imgproc.kernels import default_radius, make_kernel
+
+ndimage = pytest.importorskip('scipy.ndimage')
+
+# (y kernel, x kernel), written out again rather than taken from the module
+KERNELS = {
+    'L': ('gauss', 'gauss'),
+    'Lx': ('gauss', 'gaussdx'),
+    'Ly': ('gaussdx', 'gauss'),
+    'Lxx': ('gauss', 'gaussdxx'),
+    'Lxy': ('gaussdx', 'gaussdx'),
+    'Lyy': ('gaussdxx', 'gauss'),
+}
+
+
+def separate(image, sigma, name, mode='reflect', radius=None):
+    """One derivative on its own: a y pass and an x pass in float64."""
+    if name == 'laplacian':
+        return sum(separate(image, sigma, n, mode, radius) for n in ('Lxx', 'Lyy'))
+    kind_y, kind_x = KERNELS[name]
+    along_y = ndimage.convolve1d(image.astype(np.float64), make_kernel(kind_y, sigma, radius),
+                                 axis=0, mode=mode)
+    return ndimage.convolve1d(along_y, make_kernel(kind_x, sigma, radius), axis=1, mode=mode)
+
+
+def assert_close(result, expected):
+    np.testing.assert_allclose(result, expected, rtol=0, atol=1e-5 * np.abs(expected).max())
+
+
+@pytest.fixture(scope='module')
+def image(gantrycrane):
+    return gantrycrane[:150, :220]
+
+
+@pytest.mark.parametrize('mode', ['reflect', 'mirror', 'constant'])
+@pytest.mark.parametrize('sigma', [1.0, 2.5])
+def test_fused_matches_separate_convolutions(image, sigma, mode):
+    fused = gaussian_derivatives(image, sigma, DERIVATIVES, mode=mode)
+    for name, result in zip(DERIVATIVES, fused):
+        assert result.shape == image.shape
+        assert_close(result, separate(image, sigma, name, mode))
+
+
+@pytest.mark.parametrize('sigma', [1.0, 2.5])
+def test_mixed_derivative_matches_2d_kernel(image, sigma):
+    dx = make_kernel('gaussdx', sigma)
+    expected = ndimage.convolve(image.astype(np.float64), np.outer(dx, dx), mode='reflect')
+    assert_close(gaussian_derivatives(image, sigma, 'Lxy'), expected)
+
+
+def test_subsets_match_all_together(image):
+    everything = dict(zip(DERIVATIVES, gaussian_derivatives(image, 2.0, DERIVATIVES)))
+    for name in DERIVATIVES:
+        np.testing.assert_array_equal(gaussian_derivatives(image, 2.0, name), everything[name])
+
+
+def test_gradients_module(image):
+    sigma = 2.0
+    radius = int(3.0 * sigma)
+    for fn, names in [(gauss_derivs, ('Lx', 'Ly')), (gauss_second_derivs, ('Lxx', 'Lxy', 'Lyy')),
+                      (laplace, ('laplacian',))]:
+        results = fn(image, sigma)
+        results = results if isinstance(results, tuple) else (results,)
+        for name, result in zip(names, results):
+            assert_close(result, separate(image, sigma, name, radius=radius))
+
+
+def test_polynomials():
+    y, x = np.indices((40, 50), dtype=np.float32)
+    inner = (slice(10, -10), slice(10, -10))
+    sigma = 2.0
+    assert default_radius(sigma) < 10
+    np.testing.assert_allclose(gaussian_derivatives(x, sigma, 'Lx')[inner], 1, atol=1e-4)
+    np.testing.assert_allclose(gaussian_derivatives(y, sigma, 'Ly')[inner], 1, atol=1e-4)
+    np.testing.assert_allclose(gaussian_derivatives(x * y, sigma, 'Lxy')[inner], 1, atol=1e-3)
+    np.testing.assert_allclose(gaussian_derivatives(x**2 + y**2, sigma, 'laplacian')[inner], 4,
+                               atol=1e-2)
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from imgproc.edges import get_edges_adaptive, get_edges_with_nms, my_canny
+from imgproc.gradients import gauss_second_derivs
+from imgproc.policy import Workspace
+from imgproc.thresholds import RunningHistogram
+
+DETECTORS = [(get_edges_with_nms, (2, 0.17)), (my_canny, (2, 0.1, 0.3)),
+             (get_edges_adaptive, (2, 0.3))]
+
+
+@pytest.mark.parametrize('detector, args', DETECTORS)
+def test_workspace_frames_match(gantrycrane, detector, args):
+    expected = detector(gantrycrane, *args)
+    workspace = Workspace()
+    out = np.empty_like(expected)
+    assert detector(gantrycrane, *args, out=out, workspace=workspace) is out
+    np.testing.assert_array_equal(out, expected)
+    nbytes = workspace.nbytes
+    # The next frame reuses every buffer
+    np.testing.assert_array_equal(detector(gantrycrane[::-1], *args, out=out,
+                                           workspace=workspace),
+                                  detector(gantrycrane[::-1], *args))
+    assert workspace.nbytes == nbytes
+
+
+def test_adaptive_running_histogram_workspace(gantrycrane):
+    workspace = Workspace()
+    with_workspace, without = RunningHistogram(), RunningHistogram()
+    for frame in (gantrycrane, gantrycrane[::-1]):
+        np.testing.assert_array_equal(
+            get_edges_adaptive(frame, 2, 0.3, running_histogram=with_workspace,
+                               workspace=workspace),
+            get_edges_adaptive(frame, 2, 0.3, running_histogram=without))
+
+
+def test_second_derivatives_out(gantrycrane):
+    expected = gauss_second_derivs(gantrycrane, 2.0)
+    out = tuple(np.empty_like(e) for e in expected)
+    result = gauss_second_derivs(gantrycrane, 2.0, out=out, workspace=Workspace())
+    for r, o, e in zip(result, out, expected):
+        assert r is o
+        np.testing.assert_array_equal(r, e)
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from imgproc.filters import gaussian_filter
+from imgproc.scale_space import GaussianScaleSpace
+
+
+@pytest.fixture
+def image(joan):
+    return np.clip(joan[:160, :200], 0, 255)
+
+
+def test_scale_space_matches_direct_blur(image):
+    scale_space = GaussianScaleSpace(image, mode='mirror')
+    for sigma in (2.0, 4.0):
+        cached = gaussian_filter(image, sigma, scale_space=scale_space)
+        direct = gaussian_filter(image, sigma, 'mirror')
+        assert np.abs(cached.astype(int) - direct).max() <= 1
+    # the scale space's own mode may be repeated
+    gaussian_filter(image, 4.0, 'mirror', scale_space=scale_space)
+
+
+def test_scale_space_rejects_ignored_arguments(image):
+    scale_space = GaussianScaleSpace(image, mode='mirror')
+    with pytest.raises(ValueError, match='different image'):
+        gaussian_filter(image.copy(), 2.0, scale_space=scale_space)
+    with pytest.raises(ValueError, match='padding'):
+        gaussian_filter(image, 2.0, 'constant', scale_space=scale_space)
+    with pytest.raises(ValueError, match='padding'):
+        gaussian_filter(image, 2.0, True, scale_space=scale_space)
+    with pytest.raises(ValueError, match='batch'):
+        gaussian_filter(image, 2.0, batch=True, scale_space=scale_space)
+    with pytest.raises(ValueError, match='exact'):
+        gaussian_filter(image, 2.0, exact=True, scale_space=scale_space)
@@ -0,0 +1,141 @@
+import numpy as np
+import pytest
+
+from imgproc.edges import my_canny
+from imgproc.hough import (IncrementalHough, accumulate_lines, hough_lines, hough_lines_directed,
+                           line_tables, progressive_hough_lines, withdraw_lines)
+from imgproc.peaks import find_peaks
+
+
+@pytest.fixture(scope='module')
+def crane_edges(gantrycrane):
+    return my_canny(gantrycrane, 2, 0.1, 0.3)
+
+
+def hough_loop(edge_image, n_bins_rho, n_bins_theta):
+    # The per-pixel loop of the original 05 solution; the theta index is
+    # enumerated instead of looked up with np.where
+    votes_acc = np.zeros((n_bins_rho, n_bins_theta), dtype=int)
+    diag = np.linalg.norm(edge_image.shape)
+    theta_bins = np.linspace(-np.pi / 2, np.pi / 2, n_bins_theta)
+    im_h, im_w = edge_image.shape
+    for i in range(im_h):
+        for j in range(im_w):
+            if edge_image[i, j] == 255:
+                for k, theta in enumerate(theta_bins):
+                    rho = j * np.sin(theta) + i * np.cos(theta)
+                    rho_idx = int(np.floor((n_bins_rho) * (rho + diag) / (2 * diag)))
+                    votes_acc[rho_idx, k] += 1
+    return votes_acc
+
+
+@pytest.mark.parametrize('name', ['gantrycrane', 'circuit'])
+def test_hough_lines_matches_loop(name, request):
+    edges = my_canny(request.getfixturevalue(name), 2, 0.1, 0.3)
+    # Every fourth edge pixel keeps the loop fast, with the bins of the exercise
+    rows, cols = np.nonzero(edges)
+    thinned = np.zeros_like(edges)
+    thinned[rows[::4], cols[::4]] = 255
+    votes, rho_bins, theta_bins = hough_lines(thinned, 300, 300)
+    np.testing.assert_array_equal(votes, hough_loop(thinned, 300, 300))
+    diag = np.linalg.norm(edges.shape)
+    np.testing.assert_array_equal(rho_bins, np.linspace(-diag, diag, 300))
+    np.testing.assert_array_equal(theta_bins, np.linspace(-np.pi / 2, np.pi / 2, 300))
+
+
+def test_hough_lines_chunks():
+    edges = np.zeros((30, 40))
+    edges[np.random.default_rng(0).random(edges.shape) < 0.2] = 255
+    np.testing.assert_array_equal(hough_lines(edges, 50, 40, chunk_size=7)[0],
+                                  hough_loop(edges, 50, 40))
+
+
+def test_incremental_matches_rebuild(crane_edges):
+    incremental = IncrementalHough(crane_edges.shape, 300, 300, threshold=100)
+    rng = np.random.default_rng(0)
+    for _ in range(4):
+        edges = np.where(rng.random(crane_edges.shape) < 0.001, 255 - crane_edges, crane_edges)
+        incremental.update(edges)
+        votes = hough_lines(edges, 300, 300)[0]
+        np.testing.assert_array_equal(incremental.votes_acc, votes)
+        rows, cols = incremental.peaks()
+        expected = find_peaks(votes, threshold=99)
+        np.testing.assert_array_equal(rows, expected[0])
+        np.testing.assert_array_equal(cols, expected[1])
+
+
+def test_incremental_ties_follow_find_peaks():
+    incremental = IncrementalHough((20, 20), 50, 50)
+    edges = np.zeros((20, 20))
+    edges[5, 5] = edges[15, 15] = 1
+    incremental.update(edges)
+    rows, cols = incremental.peaks()
+    expected = find_peaks(incremental.votes_acc, threshold=0)
+    np.testing.assert_array_equal(rows, expected[0])
+    np.testing.assert_array_equal(cols, expected[1])
+
+
+@pytest.mark.parametrize('grad_dir, voted_bins', [(0.0, [87, 88, 0, 1, 2]),
+                                                  (np.pi, [87, 88, 0, 1, 2]),
+                                                  (0.02, [86, 87, 88, 0, 1])])
+def test_directed_spread_across_the_seam(grad_dir, voted_bins):
+    # A (near-)vertical line has theta close to -pi/2 = pi/2, the seam of the
+    # theta range, whose first and last bin are the same angle
+    edges = np.zeros((60, 80))
+    edges[5:55, 30] = 255
+    votes = hough_lines_directed(edges, np.full(edges.shape, grad_dir), 200, 90, spread=2)[0]
+    expected = np.zeros(90, np.int64)
+    expected[voted_bins] = 50
+    np.testing.assert_array_equal(votes.sum(axis=0), expected)
+    if grad_dir % np.pi == 0:
+        # One cell with the votes of all pixels, not a second one at pi/2
+        assert np.count_nonzero(votes == 50) == 1
+
+
+def draw_segments(shape, segments):
+    """uint8 edge image with one-pixel wide segments ``(x0, y0, x1, y1)``."""
+    image = np.zeros(shape, np.uint8)
+    for x0, y0, x1, y1 in segments:
+        n = max(abs(x1 - x0), abs(y1 - y0)) + 1
+        image[np.rint(np.linspace(y0, y1, n)).astype(int),
+              np.rint(np.linspace(x0, x1, n)).astype(int)] = 255
+    return image
+
+
+def as_set(segments):
+    """Segments with their endpoints in a fixed order."""
+    return sorted(tuple(sorted([(x0, y0), (x1, y1)])) for x0, y0, x1, y1 in segments)
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_progressive_endpoints(seed):
+    # horizontal, vertical and diagonal, the diagonal crossing the horizontal
+    expected = [(10, 20, 69, 20), (100, 5, 100, 94), (15, 5, 75, 65)]
+    edges = draw_segments((100, 120), expected)
+    found = progressive_hough_lines(edges, 200, 180, threshold=15, min_length=20, seed=seed)
+    assert len(found) == len(expected)
+    for segment, reference in zip(as_set(found), as_set(expected)):
+        np.testing.assert_allclose(segment, reference, atol=2)
+
+
+def test_progressive_gap_and_max_lines():
+    # a gap of 5 pixels is bridged with line_gap=6 but not with line_gap=3
+    edges = draw_segments((60, 120), [(10, 30, 49, 30), (55, 30, 99, 30)])
+    bridged = progressive_hough_lines(edges, 100, 90, 15, line_gap=6, seed=0)
+    np.testing.assert_allclose(as_set(bridged), as_set([(10, 30, 99, 30)]), atol=1)
+    split = progressive_hough_lines(edges, 100, 90, 15, line_gap=3, seed=0)
+    assert len(split) == 2
+    assert len(progressive_hough_lines(edges, 100, 90, 15, line_gap=3, max_lines=1, seed=0)) == 1
+
+
+def test_withdrawn_votes_leave_the_remaining_pixels(crane_edges):
+    n_bins_rho, n_bins_theta = 300, 180
+    tables = line_tables(crane_edges.shape, n_bins_theta)
+    rows, cols = np.nonzero(crane_edges)
+    votes_acc = accumulate_lines(np.zeros((n_bins_rho, n_bins_theta), np.int64), rows, cols,
+                                 tables)
+    removed = np.random.default_rng(0).random(len(rows)) < 0.3
+    withdraw_lines(votes_acc, rows[removed], cols[removed], tables)
+    remaining = crane_edges.copy()
+    remaining[rows[removed], cols[removed]] = 0
+    np.testing.assert_array_equal(votes_acc, hough_lines(remaining, n_bins_rho, n_bins_theta)[0])
@@ -0,0 +1,71 @@
+from collections import deque
+
+import numpy as np
+import pytest
+
+from imgproc.gradients import image_gradients_polar
+from imgproc.hysteresis import hysteresis_threshold, hysteresis_tiled
+from imgproc.nms import non_maximum_suppression
+
+
+def follow_edges(magnitude, low, high, connectivity):
+    # Edge following from every strong pixel, with a queue instead of recursion
+    if connectivity == 4:
+        steps = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+    else:
+        steps = [(dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dy or dx]
+    height, width = magnitude.shape
+    edges = np.zeros(magnitude.shape, bool)
+    queue = deque(zip(*np.nonzero(magnitude >= high)))
+    for y, x in queue:
+        edges[y, x] = True
+    while queue:
+        y, x = queue.popleft()
+        for dy, dx in steps:
+            ny, nx = y + dy, x + dx
+            if (0 <= ny < height and 0 <= nx < width and not edges[ny, nx]
+                    and magnitude[ny, nx] >= low):
+                edges[ny, nx] = True
+                queue.append((ny, nx))
+    return edges
+
+
+@pytest.fixture(scope='module')
+def suppressed(gantrycrane):
+    grad_mag, grad_dir = image_gradients_polar(gantrycrane, 2.0)
+    suppressed = non_maximum_suppression(grad_mag, grad_dir)
+    return suppressed / suppressed.max()
+
+
+@pytest.mark.parametrize('connectivity', [4, 8])
+def test_threshold_matches_edge_following(suppressed, connectivity):
+    np.testing.assert_array_equal(hysteresis_threshold(suppressed, 0.1, 0.3, connectivity),
+                                  follow_edges(suppressed, 0.1, 0.3, connectivity))
+
+
+@pytest.mark.parametrize('connectivity', [4, 8])
+@pytest.mark.parametrize('tile_shape', [(64, 64), (50, 70), (1000, 1000)])
+def test_tiled_matches_whole(suppressed, connectivity, tile_shape):
+    np.testing.assert_array_equal(
+        hysteresis_tiled(suppressed, 0.1, 0.3, connectivity, tile_shape=tile_shape),
+        hysteresis_threshold(suppressed, 0.1, 0.3, connectivity))
+
+
+@pytest.mark.parametrize('connectivity', [4, 8])
+def test_tiled_small_tiles_on_noise(connectivity):
+    # Components winding across many seams, including diagonal-only contacts
+    magnitude = np.random.default_rng(0).random((60, 80))
+    expected = follow_edges(magnitude, 0.5, 0.95, connectivity)
+    for tile_shape in [(1, 1), (3, 5), (7, 4)]:
+        np.testing.assert_array_equal(
+            hysteresis_tiled(magnitude, 0.5, 0.95, connectivity, tile_shape=tile_shape),
+            expected)
+
+
+def test_tiled_memmap_output(suppressed, tmp_path):
+    out = np.lib.format.open_memmap(tmp_path / 'edges.npy', 'w+', bool, suppressed.shape)
+    labels = np.lib.format.open_memmap(tmp_path / 'labels.npy', 'w+', np.int32,
+                                       suppressed.shape)
+    hysteresis_tiled(suppressed, 0.1, 0.3, tile_shape=(64, 64), out=out, labels=labels)
+    np.testing.assert_array_equal(np.load(tmp_path / 'edges.npy'),
+                                  hysteresis_threshold(suppressed, 0.1, 0.3))
@@ -0,0 +1,41 @@
+import os
+
+import cv2
+import numpy as np
+
+from imgproc.images import ImageCache
+
+
+def write_image(path, value, mtime_ns):
+    cv2.imwrite(str(path), np.full((8, 10), value, np.uint8))
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_changed_file_replaces_sidecar(tmp_path):
+    path = tmp_path / 'image.png'
+    disk_dir = tmp_path / 'cache'
+    write_image(path, 10, 10**18)
+    cache = ImageCache(disk_dir=str(disk_dir))
+    assert cache.get(path)[0, 0] == 10
+    assert len(os.listdir(disk_dir)) == 1
+
+    write_image(path, 20, 2 * 10**18)
+    assert cache.get(path)[0, 0] == 20
+    assert len(os.listdir(disk_dir)) == 1
+    assert cache.cache_info().currsize == 1
+
+    # A new process memory-maps the current version
+    fresh = ImageCache(disk_dir=str(disk_dir))
+    assert fresh.get(path)[0, 0] == 20
+    assert fresh.cache_info().disk_hits == 1
+
+
+def test_modes_are_kept_apart(tmp_path):
+    path = tmp_path / 'image.png'
+    disk_dir = tmp_path / 'cache'
+    write_image(path, 10, 10**18)
+    cache = ImageCache(disk_dir=str(disk_dir))
+    cache.get(path, 'gray')
+    cache.get(path, 'rgb')
+    assert len(os.listdir(disk_dir)) == 2
+    assert cache.cache_info().currsize == 2
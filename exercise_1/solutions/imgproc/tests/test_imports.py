@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+SOLUTIONS = os.path.join(os.path.dirname(__file__), '..', '..')
+
+
+def loaded_modules(code):
+    """Top-level modules of interest loaded after running ``code``."""
+    check = code + '\nimport sys\nprint(sorted({m.split(".")[0] for m in sys.modules}' \
+                   ' & {"scipy", "cv2", "matplotlib"}))'
+    result = subprocess.run([sys.executable, '-c', check], cwd=SOLUTIONS, check=True,
+                            capture_output=True, text=True)
+    return result.stdout.strip()
+
+
+@pytest.mark.parametrize('module', ['imgproc', 'imgproc.filters', 'imgproc.gradients',
+                                    'imgproc.edges', 'imgproc.hysteresis'])
+def test_import_loads_no_heavy_dependency(module):
+    assert loaded_modules(f'import {module}') == '[]'
+
+
+def test_separable_path_loads_no_scipy():
+    code = ('import numpy as np\n'
+            'from imgproc.convolution import gaussian_blur\n'
+            'gaussian_blur(np.ones((64, 64), np.float32), 2.0, method="separable")')
+    assert loaded_modules(code) == '[]'
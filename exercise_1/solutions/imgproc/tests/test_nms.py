@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from imgproc.gradients import image_gradients_polar
+# The loop of the original 04 solution
+from imgproc.nms import nms_loop, non_maximum_suppression
+
+
+@pytest.mark.parametrize('name', ['gantrycrane', 'circuit'])
+def test_fast_matches_loop(name, request):
+    image = request.getfixturevalue(name)
+    grad_mag, grad_dir = image_gradients_polar(image, 2.0)
+    np.testing.assert_array_equal(non_maximum_suppression(grad_mag, grad_dir, 'fast'),
+                                  nms_loop(grad_mag, grad_dir))
+
+
+def test_fast_matches_loop_on_sector_boundaries():
+    rng = np.random.default_rng(0)
+    grad_mag = rng.integers(0, 4, (40, 50)).astype(np.float32)
+    # Directions exactly between two sectors, and the ends of the range
+    grad_dir = (rng.integers(-8, 9, grad_mag.shape) * (np.pi / 8)).astype(np.float32)
+    np.testing.assert_array_equal(non_maximum_suppression(grad_mag, grad_dir, 'fast'),
+                                  nms_loop(grad_mag, grad_dir))
+
+
+def test_fast_stack_matches_per_image(gantrycrane, circuit):
+    images = np.stack([gantrycrane[:200, :200], circuit[:200, :200]])
+    grad_mag, grad_dir = image_gradients_polar(images, 2.0)
+    stacked = non_maximum_suppression(grad_mag, grad_dir, 'fast')
+    for index in range(len(images)):
+        np.testing.assert_array_equal(stacked[index], nms_loop(grad_mag[index], grad_dir[index]))
+
+
+def test_interpolate_keeps_a_ridge():
+    # A vertical ridge with a horizontal gradient survives in its center column only
+    grad_mag = np.tile(np.array([0, 1, 2, 3, 2, 1, 0], np.float32), (7, 1))
+    grad_dir = np.zeros_like(grad_mag)
+    expected = np.zeros_like(grad_mag)
+    expected[:, 3] = 3
+    np.testing.assert_array_equal(non_maximum_suppression(grad_mag, grad_dir, 'interpolate'),
+                                  expected)
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError, match='unknown NMS mode'):
+        non_maximum_suppression(np.zeros((3, 3)), np.zeros((3, 3)), 'nearest')
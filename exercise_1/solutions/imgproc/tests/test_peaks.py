@@ -0,0 +1,144 @@
+import time
+
+import numpy as np
+import pytest
+from scipy import ndimage
+
+from imgproc.edges import my_canny
+from imgproc.hough import hough_transform
+from imgproc.peaks import (descending, find_peaks, local_maxima, maxima_candidates, nms2d,
+                           update_maxima)
+
+
+def regional_maxima(image, threshold=0):
+    """Reference: one pixel (the first) of every plateau of equal values
+    whose 8 neighbours are all smaller, by labelling every value."""
+    image = np.asarray(image)
+    mask = np.zeros(image.shape, bool)
+    padded = np.pad(image.astype(float), 1, constant_values=-np.inf)
+    for value in np.unique(image):
+        if threshold is not None and value <= threshold:
+            continue
+        labels, n_labels = ndimage.label(image == value, np.ones((3, 3), bool))
+        for label in range(1, n_labels + 1):
+            plateau = labels == label
+            ring = ndimage.binary_dilation(np.pad(plateau, 1), np.ones((3, 3), bool))
+            ring &= ~np.pad(plateau, 1)
+            if np.all(padded[ring] < value):
+                mask.flat[np.flatnonzero(plateau)[0]] = True
+    return mask
+
+
+def greedy_peaks(image, rows, cols, min_distance):
+    """Reference: the loop over the peaks of the first find_peaks."""
+    kept = []
+    for index, (row, col) in enumerate(zip(rows, cols)):
+        near = ((np.abs(rows[kept] - row) < min_distance[0])
+                & (np.abs(cols[kept] - col) < min_distance[1]))
+        if not near.any():
+            kept.append(index)
+    return rows[kept], cols[kept]
+
+
+@pytest.fixture(scope='module')
+def accumulator(gantrycrane):
+    edges = my_canny(gantrycrane, 2, 0.1, 0.3)
+    return hough_transform(edges, 1000, 1000)[0]
+
+
+def test_shoulder_plateau_is_no_maximum():
+    image = np.array([[0, 0, 0, 0, 0, 0],
+                      [0, 5, 5, 5, 9, 0],
+                      [0, 0, 0, 0, 0, 0]])
+    assert np.argwhere(local_maxima(image)).tolist() == [[1, 4]]
+    image = np.array([[0, 0, 0, 0],
+                      [0, 3, 3, 4],
+                      [0, 0, 0, 0]])
+    assert np.argwhere(local_maxima(image)).tolist() == [[1, 3]]
+
+
+def test_flat_top_gives_one_peak():
+    image = np.array([[0, 0, 0, 0, 0],
+                      [0, 4, 4, 0, 0],
+                      [0, 4, 4, 0, 0],
+                      [0, 0, 0, 0, 2]])
+    assert np.argwhere(local_maxima(image)).tolist() == [[1, 1], [3, 4]]
+
+
+def test_zero_background_is_no_peak():
+    assert not local_maxima(np.zeros((5, 5), int)).any()
+    assert not nms2d(np.zeros((5, 5), int)).any()
+
+
+@pytest.mark.parametrize('threshold', [0, None, 2])
+def test_local_maxima_matches_reference(threshold):
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        image = rng.integers(0, 5, rng.integers(1, 15, 2))
+        np.testing.assert_array_equal(local_maxima(image, threshold),
+                                      regional_maxima(image, threshold))
+
+
+def test_min_distance_matches_greedy_loop():
+    rng = np.random.default_rng(1)
+    for _ in range(100):
+        image = rng.integers(0, 6, rng.integers(1, 30, 2))
+        min_distance = tuple(rng.integers(1, 5, 2))
+        rows, cols = find_peaks(image)
+        expected = greedy_peaks(image, rows, cols, min_distance)
+        for top_k in (None, 3):
+            got = find_peaks(image, min_distance=min_distance, top_k=top_k)
+            np.testing.assert_array_equal(got[0], expected[0][:top_k])
+            np.testing.assert_array_equal(got[1], expected[1][:top_k])
+
+
+def test_min_distance_on_real_accumulator(accumulator):
+    rows, cols = find_peaks(accumulator, threshold=10)
+    assert len(rows) > 10000
+    start = time.perf_counter()
+    got = find_peaks(accumulator, threshold=10, min_distance=3)
+    elapsed = time.perf_counter() - start
+    # The loop over the peaks took a minute
+    assert elapsed < 2.0
+    expected = greedy_peaks(accumulator, rows[:3000], cols[:3000], (3, 3))
+    n_kept = len(expected[0])
+    np.testing.assert_array_equal(got[0][:n_kept], expected[0])
+    np.testing.assert_array_equal(got[1][:n_kept], expected[1])
+
+
+def test_update_maxima_matches_local_maxima():
+    rng = np.random.default_rng(0)
+    # Few values, so that plateaus form, merge and split
+    image = rng.integers(0, 4, (40, 50))
+    candidates = maxima_candidates(image, 1)
+    maxima = np.flatnonzero(local_maxima(image, 1))
+    for n_changed in [1, 5, 30, 200]:
+        changed = rng.choice(image.size, n_changed)
+        image.ravel()[changed] = rng.integers(0, 4, n_changed)
+        maxima = update_maxima(image, candidates, maxima, changed, 1)
+        np.testing.assert_array_equal(candidates, maxima_candidates(image, 1))
+        np.testing.assert_array_equal(maxima, np.flatnonzero(local_maxima(image, 1)))
+
+
+def test_unsigned_peaks():
+    image = np.zeros((5, 7), np.uint16)
+    image[1, 1] = image[3, 5] = 3
+    image[1, 4] = 7
+    assert list(zip(*find_peaks(image, threshold=None))) == [(1, 4), (1, 1), (3, 5)]
+    # Without a threshold, an all-zero accumulator has one zero-valued peak
+    image[...] = 0
+    assert list(zip(*find_peaks(image, threshold=None))) == [(0, 0)]
+
+
+def test_descending_keeps_ties_in_order():
+    # argsort(-values) would put the 0 first
+    values = np.array([2, 5, 0, 5, 2, 9], np.uint8)
+    assert descending(values).tolist() == [5, 1, 3, 0, 4, 2]
+
+
+def test_boolean_input():
+    mask = np.zeros((5, 6), bool)
+    mask[1, 1] = mask[3, 3:5] = True
+    np.testing.assert_array_equal(nms2d(mask), local_maxima(mask.astype(np.uint8)))
+    assert np.argwhere(nms2d(mask)).tolist() == [[1, 1], [3, 3]]
+    assert np.argwhere(local_maxima(mask, threshold=None)).tolist() == [[1, 1], [3, 3]]
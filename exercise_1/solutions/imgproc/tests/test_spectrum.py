@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from imgproc.spectrum import (SpectrumCache, display_range, fourier_spectrum, full_view,
+                              histogram_percentiles, log_magnitude_spectrum)
+
+pytest.importorskip('scipy.fft')
+
+SHAPES = [(64, 64), (63, 64), (64, 63), (63, 65), (1, 8), (7, 1)]
+
+
+def numpy_spectrum(image, normalize=True):
+    image = image.astype(np.float64)
+    if normalize:
+        image = image / np.sum(image)
+    return np.fft.fftshift(np.fft.fft2(image))
+
+
+@pytest.fixture(scope='module')
+def crops(gantrycrane):
+    # textured, so that no frequency is at the floor of the logarithm
+    noise = np.random.default_rng(0).random(gantrycrane.shape, np.float32) * 64
+    textured = gantrycrane + noise
+    return {shape: textured[150:150 + shape[0], 100:100 + shape[1]].copy() for shape in SHAPES}
+
+
+@pytest.mark.parametrize('shape', SHAPES)
+def test_full_view_matches_fft2(crops, shape):
+    image = crops[shape].astype(np.float64)
+    expected = numpy_spectrum(image, normalize=False)
+    half = np.fft.rfft2(image)
+    np.testing.assert_allclose(full_view(half, shape[1]), expected, atol=1e-9 * image.size * 255)
+    np.testing.assert_allclose(full_view(half, shape[1], shift=False), np.fft.fft2(image),
+                               atol=1e-9 * image.size * 255)
+    # a real function of the spectrum is mirrored without conjugation
+    np.testing.assert_allclose(full_view(np.abs(half), shape[1]), np.abs(expected),
+                               atol=1e-9 * image.size * 255)
+
+
+@pytest.mark.parametrize('shape', SHAPES)
+def test_spectra_match_numpy(crops, shape):
+    image = crops[shape]
+    expected = numpy_spectrum(image)
+    spectrum = fourier_spectrum(image, cache=None)
+    assert spectrum.dtype == np.complex64 and spectrum.shape == shape
+    np.testing.assert_allclose(spectrum, expected, rtol=0, atol=1e-6)
+    log_magnitude = log_magnitude_spectrum(image, cache=None)
+    assert log_magnitude.dtype == np.float32
+    np.testing.assert_allclose(log_magnitude, np.log(np.abs(expected) + 1e-8), rtol=0,
+                               atol=1e-3)
+    half = fourier_spectrum(image, full=False, cache=None)
+    np.testing.assert_allclose(half, np.fft.rfft2(image / np.sum(image)), rtol=0, atol=1e-6)
+
+
+@pytest.mark.parametrize('shape', [(64, 64), (63, 65)])
+def test_cached_spectra(crops, shape):
+    image = crops[shape]
+    cache = SpectrumCache(maxsize=2)
+    first = log_magnitude_spectrum(image, cache=cache)
+    assert log_magnitude_spectrum(image, cache=cache) is first
+    assert not first.flags.writeable
+    np.testing.assert_array_equal(first, log_magnitude_spectrum(image, cache=None))
+    # another image of the same shape and the other parameters are other entries
+    other = log_magnitude_spectrum(image.copy(), cache=cache)
+    np.testing.assert_array_equal(other, first)
+    assert other is not first
+    assert fourier_spectrum(image, cache=cache).shape == shape
+    assert cache.cache_info().hits == 1
+    assert cache.cache_info().currsize == 2
+
+
+def test_display_range_matches_percentiles(crops, joan):
+    spectra = [log_magnitude_spectrum(joan, cache=None),
+               log_magnitude_spectrum(crops[(63, 65)], cache=None)]
+    assert spectra[1].min() > np.log(1e-7)
+    lower, upper = display_range(spectra, 0.1, 99.999)
+    for spectrum in spectra:
+        width = (spectrum.max() - spectrum.min()) / 4096
+        estimate = histogram_percentiles(spectrum, (0.1, 50, 99.999))
+        exact = np.percentile(spectrum, (0.1, 50, 99.999), method='inverted_cdf')
+        np.testing.assert_allclose(estimate, exact, atol=width)
+    exact = [np.percentile(spectrum, (0.1, 99.999), method='inverted_cdf') for spectrum in spectra]
+    widths = [(spectrum.max() - spectrum.min()) / 4096 for spectrum in spectra]
+    assert abs(lower - min(low for low, _ in exact)) <= max(widths)
+    assert abs(upper - min(high for _, high in exact)) <= max(widths)
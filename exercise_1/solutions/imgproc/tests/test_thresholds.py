@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from imgproc.gradients import image_gradients_polar
+from imgproc.nms import non_maximum_suppression
+from imgproc.thresholds import (RunningHistogram, adaptive_threshold, magnitude_histogram,
+                                threshold_from_histogram)
+
+
+@pytest.fixture(scope='module')
+def suppressed(circuit):
+    magnitude, direction = image_gradients_polar(circuit, 2.0)
+    return non_maximum_suppression(magnitude, direction)
+
+
+def sorted_threshold(values, fraction, first_edge):
+    """The ``ceil(fraction * n)``-th largest of the ``n`` values outside the
+    first bin, found by sorting."""
+    values = np.sort(values[values >= first_edge])[::-1]
+    return values[int(np.ceil(fraction * len(values))) - 1]
+
+
+@pytest.mark.parametrize('bins', [64, 256, 1024])
+@pytest.mark.parametrize('fraction', [0.001, 0.05, 0.3, 0.75, 1.0])
+def test_matches_sorted_percentile(suppressed, fraction, bins):
+    _, bin_edges = magnitude_histogram(suppressed, bins)
+    width = bin_edges[1]
+    threshold = adaptive_threshold(suppressed, fraction, bins)
+    exact = sorted_threshold(suppressed, fraction, width)
+    # rounded down to the edge of the bin of the exact threshold
+    assert exact - width < threshold <= exact
+    assert np.isclose(threshold / width, np.rint(threshold / width))
+    counted = suppressed[suppressed >= width]
+    assert np.sum(counted >= threshold) >= fraction * len(counted)
+
+
+def test_fraction_zero_keeps_nothing(suppressed):
+    threshold = adaptive_threshold(suppressed, 0)
+    assert not np.any(suppressed >= threshold)
+    running = RunningHistogram().update(suppressed)
+    assert not np.any(suppressed >= running.threshold(0))
+
+
+def test_fraction_one_keeps_everything_outside_the_first_bin(suppressed):
+    _, bin_edges = magnitude_histogram(suppressed)
+    kept = suppressed >= adaptive_threshold(suppressed, 1)
+    np.testing.assert_array_equal(kept, suppressed >= bin_edges[1])
+
+
+def test_rejects_fractions_outside_the_unit_interval():
+    hist, bin_edges = magnitude_histogram(np.arange(10.0), 4)
+    for fraction in (-0.1, 1.5):
+        with pytest.raises(ValueError):
+            threshold_from_histogram(hist, bin_edges, fraction)
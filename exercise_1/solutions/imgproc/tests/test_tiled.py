@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from imgproc.edges import get_edges
+from imgproc.filters import gaussian_filter
+from imgproc.gradients import gauss_derivs, image_gradients_polar, laplace
+from imgproc.nms import non_maximum_suppression
+from imgproc.parallel import run_parallel
+from imgproc.tiled import create_npy, halo_for, process_tiled
+
+TILE_SHAPE = (160, 192)
+
+
+@pytest.fixture(scope='module')
+def image(joan):
+    return np.ascontiguousarray(joan[400:1000, 900:1800])
+
+
+def assert_identical(got, expected):
+    if isinstance(expected, tuple):
+        assert isinstance(got, tuple) and len(got) == len(expected)
+        for g, e in zip(got, expected):
+            np.testing.assert_array_equal(g, e)
+    else:
+        np.testing.assert_array_equal(got, expected)
+
+
+@pytest.mark.parametrize('sigma', [1.5, 8.0])
+@pytest.mark.parametrize('fn, args', [(gaussian_filter, ()), (gauss_derivs, ()),
+                                      (laplace, ()), (get_edges, (5.0,))])
+def test_tiled_equals_exact_whole_image(image, fn, args, sigma):
+    tiled = process_tiled(fn, image, halo_for(sigma), tile_shape=TILE_SHAPE,
+                          args=(sigma,) + args)
+    assert_identical(tiled, fn(image, sigma, *args, exact=True))
+
+
+def test_tiled_memory_mapped(image, tmp_path):
+    src = create_npy(str(tmp_path / 'src.npy'), image.shape)
+    src[:] = image
+    out = process_tiled(gaussian_filter, src, halo_for(8.0), tile_shape=TILE_SHAPE,
+                        out_paths=str(tmp_path / 'out.npy'), args=(8.0,))
+    assert isinstance(out, np.memmap)
+    np.testing.assert_array_equal(out, gaussian_filter(image, 8.0, exact=True))
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_parallel_equals_exact_whole_image(image, workers):
+    sigma = 8.0
+    blurred = run_parallel(gaussian_filter, image, halo_for(sigma), workers, TILE_SHAPE,
+                           args=(sigma,))
+    np.testing.assert_array_equal(blurred, gaussian_filter(image, sigma, exact=True))
+
+    polar = run_parallel(image_gradients_polar, image, halo_for(sigma), workers, TILE_SHAPE,
+                         args=(sigma,))
+    expected = image_gradients_polar(image, sigma, exact=True)
+    assert_identical(polar, expected)
+
+    thin = run_parallel(non_maximum_suppression, expected, 1, workers, TILE_SHAPE)
+    np.testing.assert_array_equal(thin, non_maximum_suppression(*expected))
@@ -0,0 +1,106 @@
+"""Adaptive edge thresholds from magnitude histograms (Part d of the edge
+detection exercise).
+
+Instead of a threshold relative to the largest gradient magnitude, the
+threshold is chosen such that a given fraction of the pixels that survive
+non-maximum suppression become edges. The magnitudes are binned in one
+vectorized pass (``np.bincount``), the first bin (the suppressed zeros and
+tiny magnitudes) is dropped, and the threshold is found with a binary search
+on the cumulative histogram, so no pixels are sorted.
+
+For video, ``RunningHistogram`` keeps an exponentially decayed histogram over
+the frames: the threshold changes smoothly between frames and costs
+``O(bins)`` per frame on top of the binning.
+"""
+
+import numpy as np
+
+from .policy import scratch
+
+DEFAULT_BINS = 256
+
+
+def magnitude_histogram(values, bins=DEFAULT_BINS, max_value=None, workspace=None):
+    """Histogram of ``values`` over ``[0, max_value]`` in ``bins`` equal bins.
+
+    ``max_value`` defaults to the largest value; larger values are counted in
+    the last bin. Returns ``(hist, bin_edges)`` like ``np.histogram``. The bin
+    indices are computed in buffers from ``workspace``.
+    """
+    values = np.asarray(values).ravel()
+    if max_value is None:
+        max_value = float(values.max()) if values.size else 0.0
+    max_value = max_value or 1.0
+    scaled = np.multiply(values, bins / max_value,
+                         out=scratch(workspace, 'histogram.scaled', values.shape, values.dtype))
+    index = scratch(workspace, 'histogram.index', values.shape, np.intp)
+    np.copyto(index, scaled, casting='unsafe')
+    np.clip(index, 0, bins - 1, out=index)
+    hist = np.bincount(index, minlength=bins)
+    return hist, np.linspace(0, max_value, bins + 1)
+
+
+def threshold_from_histogram(hist, bin_edges, fraction):
+    """Threshold such that ``fraction`` of the counts outside the first bin
+    lie at or above it (rounded up to whole bins).
+
+    This is the highest bin edge that keeps at least that fraction; for
+    ``fraction=0`` it is ``inf``, which keeps no pixel at all.
+    """
+    if not 0 <= fraction <= 1:
+        raise ValueError(f'the edge fraction must be between 0 and 1, got {fraction}')
+    if fraction == 0:
+        # any finite edge would still keep the values in the last bin
+        return np.inf
+    cumulative = np.cumsum(hist[1:])
+    total = cumulative[-1]
+    if total == 0:
+        return bin_edges[-1]
+    # Keep the bins above the last one with at most `total - desired` below it
+    below = total - fraction * total
+    first_kept = np.searchsorted(cumulative, below, side='right') + 1
+    return bin_edges[min(first_kept, len(bin_edges) - 1)]
+
+
+def adaptive_threshold(magnitude, fraction, bins=DEFAULT_BINS, workspace=None):
+    """Threshold that keeps ``fraction`` of the (non-suppressed) pixels of
+    ``magnitude`` as edges."""
+    return threshold_from_histogram(*magnitude_histogram(magnitude, bins, workspace=workspace),
+                                    fraction)
+
+
+class RunningHistogram:
+    """Exponentially decayed magnitude histogram over the frames of a video.
+
+    Every ``update`` weighs the previous histogram by ``decay`` and the new
+    frame by ``1 - decay``. The bin range is fixed by ``max_value`` or, if not
+    given, by the largest magnitude of the first frame.
+    """
+
+    def __init__(self, bins=DEFAULT_BINS, max_value=None, decay=0.9):
+        if not 0 <= decay < 1:
+            raise ValueError(f'decay must be in [0, 1), got {decay}')
+        self.bins = bins
+        self.max_value = max_value
+        self.decay = decay
+        self.hist = None
+        self.bin_edges = None
+
+    def update(self, magnitude, workspace=None):
+        """Add one frame's magnitudes."""
+        hist, self.bin_edges = magnitude_histogram(magnitude, self.bins, self.max_value,
+                                                   workspace)
+        self.max_value = self.bin_edges[-1]
+        hist = hist / max(hist.sum(), 1)
+        if self.hist is None:
+            self.hist = hist
+        else:
+            self.hist *= self.decay
+            self.hist += (1 - self.decay) * hist
+        return self
+
+    def threshold(self, fraction):
+        """Threshold for ``fraction`` from the running histogram."""
+        if self.hist is None:
+            raise ValueError('no frame has been added yet')
+        return threshold_from_histogram(self.hist, self.bin_edges, fraction)